@@ -0,0 +1,41 @@
+"""Background curriculum generation jobs.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "curriculum_jobs",
+        sa.Column("id", sa.String(64), primary_key=True),
+        sa.Column("topic", sa.String(512), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False, server_default="queued"),
+        sa.Column("stage", sa.String(32), nullable=False, server_default="queued"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("draft_ids", postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    # Workers look up pending jobs by status, oldest first.
+    op.create_index("ix_curriculum_jobs_status_created_at", "curriculum_jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_curriculum_jobs_status_created_at", table_name="curriculum_jobs")
+    op.drop_table("curriculum_jobs")
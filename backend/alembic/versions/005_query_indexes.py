@@ -0,0 +1,60 @@
+"""Indexes for the hot filters: quizzes/failure facts by concept, progress lookups, roadmap order.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, extra create_index kwargs)
+INDEXES = [
+    # Quiz for a concept (QuizRepository.get_by_concept_id).
+    ("ix_quizzes_concept_id", "quizzes", ["concept_id"], {}),
+    # Coach hints: concept facts and global facts (concept_id IS NULL), each read in id order.
+    ("ix_failure_facts_concept_id_id", "failure_facts", ["concept_id", "id"], {}),
+    # Hint lookup by tag/keyword overlap (&&).
+    ("ix_failure_facts_tags", "failure_facts", ["tags"], {"postgresql_using": "gin"}),
+    ("ix_failure_facts_keywords", "failure_facts", ["keywords"], {"postgresql_using": "gin"}),
+    ("ix_concepts_tags", "concepts", ["tags"], {"postgresql_using": "gin"}),
+    # Default track concepts in sort order (roadmap, /curriculum/me next concept).
+    ("ix_concepts_track_phase_sort_order", "concepts", ["track", "phase", "sort_order"], {}),
+    # /curriculum/me completed concepts: index-only scans keyed by user or by session.
+    (
+        "ix_concept_completions_user_id_concept_id",
+        "concept_completions",
+        ["user_id", "concept_id"],
+        {"postgresql_where": "user_id IS NOT NULL"},
+    ),
+    (
+        "ix_concept_completions_session_id_concept_id",
+        "concept_completions",
+        ["session_id", "concept_id"],
+        {"postgresql_where": "session_id IS NOT NULL"},
+    ),
+    # Admin draft list, newest first.
+    ("ix_curriculum_drafts_updated_at", "curriculum_drafts", ["updated_at"], {}),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so existing tables stay writable while indexes build; it cannot run
+    # inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,31 @@
+"""Segment count and status on ingested_docs (PDFs are inserted as several LightRAG documents).
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ingested_docs", sa.Column("segments", sa.Integer(), nullable=False, server_default="1")
+    )
+    op.add_column(
+        "ingested_docs",
+        sa.Column("status", sa.String(16), nullable=False, server_default="ingested"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("ingested_docs", "status")
+    op.drop_column("ingested_docs", "segments")
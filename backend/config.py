@@ -16,12 +16,121 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost:5432/crucible")
 
 # --- LLM (Gemini) ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# --- LLM provider: "gemini", or "fake" for deterministic offline replies (benchmarks, load tests) ---
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "200"))
+LLM_FAKE_LATENCY_JITTER_MS = float(os.getenv("LLM_FAKE_LATENCY_JITTER_MS", "50"))
+LLM_FAKE_LATENCY_DIST = os.getenv("LLM_FAKE_LATENCY_DIST", "normal").lower()  # fixed|uniform|normal|lognormal
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "0"))
+
+# --- LLM HTTP pool: one keep-alive pool per process, shared by all Gemini calls ---
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "20"))
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+GEMINI_KEEPALIVE_EXPIRY_S = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY_S", "60"))
+GEMINI_TIMEOUT_S = float(os.getenv("GEMINI_TIMEOUT_S", "120"))
+
+# --- LLM scheduler: concurrency caps and request rate shared by coach, curriculum and LightRAG ---
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_BACKGROUND_MAX_CONCURRENCY = int(os.getenv("LLM_BACKGROUND_MAX_CONCURRENCY", "4"))
+LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "0"))  # 0 = unlimited
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+
+# --- LLM request coalescing: identical concurrent requests share one upstream call ---
+LLM_COALESCE_ENABLED = os.getenv("LLM_COALESCE_ENABLED", "true").lower() == "true"
+
+# --- LLM hedging: re-send calls slower than a recent-latency percentile (optionally to a faster model) ---
+LLM_HEDGE_CALL_SITES = [s.strip() for s in os.getenv("LLM_HEDGE_CALL_SITES", "coach").split(",") if s.strip()]
+GEMINI_FALLBACK_MODEL = os.getenv("GEMINI_FALLBACK_MODEL", "")  # empty = hedge to GEMINI_MODEL
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_DELAY_MS = float(os.getenv("LLM_HEDGE_DELAY_MS", "2000"))  # until LLM_HEDGE_MIN_SAMPLES calls seen
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "50"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+
+# --- Coach context budget: recent turns verbatim, older turns folded into a rolling summary ---
+COACH_CONTEXT_TOKEN_BUDGET = int(os.getenv("COACH_CONTEXT_TOKEN_BUDGET", "2000"))
+COACH_CONTEXT_RECENT_TURNS = int(os.getenv("COACH_CONTEXT_RECENT_TURNS", "6"))
+COACH_DESIGN_MAX_TOKENS = int(os.getenv("COACH_DESIGN_MAX_TOKENS", "1000"))
+COACH_SUMMARY_MAX_TOKENS = int(os.getenv("COACH_SUMMARY_MAX_TOKENS", "200"))
+
+# --- Coach sessions: server-side history, bounded count and idle eviction (per worker) ---
+COACH_SESSION_MAX_SESSIONS = int(os.getenv("COACH_SESSION_MAX_SESSIONS", "10000"))
+COACH_SESSION_IDLE_TTL_S = float(os.getenv("COACH_SESSION_IDLE_TTL_S", "1800"))
+
+# --- Coach response cache (exact match on normalized prompt; in-process LRU + TTL) ---
+COACH_CACHE_ENABLED = os.getenv("COACH_CACHE_ENABLED", "true").lower() == "true"
+COACH_CACHE_MAX_ENTRIES = int(os.getenv("COACH_CACHE_MAX_ENTRIES", "1024"))
+COACH_CACHE_TTL_S = float(os.getenv("COACH_CACHE_TTL_S", "3600"))
+COACH_CACHE_MAX_TEMPERATURE = float(os.getenv("COACH_CACHE_MAX_TEMPERATURE", "1.0"))
+
+# --- Coach semantic cache (first-turn answers by design-text embedding similarity; off by default) ---
+COACH_SEMANTIC_CACHE_ENABLED = os.getenv("COACH_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+COACH_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("COACH_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+COACH_SEMANTIC_CACHE_CAPACITY = int(os.getenv("COACH_SEMANTIC_CACHE_CAPACITY", "256"))
+COACH_SEMANTIC_CACHE_MAX_SCOPES = int(os.getenv("COACH_SEMANTIC_CACHE_MAX_SCOPES", "64"))
+
+# --- Failure fact index: in-memory coach hints, reloaded when another worker publishes (version check interval) ---
+FAILURE_FACT_INDEX_ENABLED = os.getenv("FAILURE_FACT_INDEX_ENABLED", "true").lower() == "true"
+FAILURE_FACT_INDEX_REFRESH_S = float(os.getenv("FAILURE_FACT_INDEX_REFRESH_S", "5"))
+FAILURE_FACT_RANKING_ENABLED = os.getenv("FAILURE_FACT_RANKING_ENABLED", "true").lower() == "true"  # BM25 vs id order
+# Embedding matrix (memory-mapped .npy) fused with BM25; rebuilt on publish, needs GEMINI_API_KEY
+FAILURE_FACT_VECTORS_ENABLED = os.getenv("FAILURE_FACT_VECTORS_ENABLED", "false").lower() == "true"
+FAILURE_FACT_VECTORS_DIR = os.getenv("FAILURE_FACT_VECTORS_DIR", "")
+if not FAILURE_FACT_VECTORS_DIR:
+    FAILURE_FACT_VECTORS_DIR = str(Path(__file__).resolve().parent.parent / "fact_vectors")
+FAILURE_FACT_VECTORS_REFRESH_S = float(os.getenv("FAILURE_FACT_VECTORS_REFRESH_S", "5"))
+
+# --- Curriculum jobs: background generation workers per process; running jobs without a heartbeat are requeued (or failed after max attempts) ---
+CURRICULUM_JOB_WORKERS = int(os.getenv("CURRICULUM_JOB_WORKERS", "2"))
+CURRICULUM_JOB_STALE_S = float(os.getenv("CURRICULUM_JOB_STALE_S", "900"))
+CURRICULUM_JOB_POLL_S = float(os.getenv("CURRICULUM_JOB_POLL_S", "30"))  # idle workers poll the DB; stale sweep
+CURRICULUM_JOB_MAX_ATTEMPTS = int(os.getenv("CURRICULUM_JOB_MAX_ATTEMPTS", "3"))
+CURRICULUM_JOB_MAX_TOPICS = int(os.getenv("CURRICULUM_JOB_MAX_TOPICS", "50"))
+
+# --- Curriculum map-reduce: split large contexts, extract chunks concurrently, merge (off = one call on 30k chars) ---
+CURRICULUM_MAP_REDUCE_ENABLED = os.getenv("CURRICULUM_MAP_REDUCE_ENABLED", "true").lower() == "true"
+CURRICULUM_CHUNK_TOKENS = int(os.getenv("CURRICULUM_CHUNK_TOKENS", "6000"))
+CURRICULUM_MAP_CONCURRENCY = int(os.getenv("CURRICULUM_MAP_CONCURRENCY", "4"))
+CURRICULUM_MAX_CHUNKS = int(os.getenv("CURRICULUM_MAX_CHUNKS", "12"))
+
+# --- Curriculum streaming: parse streamed JSON incrementally and save each draft as soon as it is complete ---
+CURRICULUM_STREAMING_ENABLED = os.getenv("CURRICULUM_STREAMING_ENABLED", "true").lower() == "true"
 
 # --- LightRAG: working dir for local storage (vector/graph; no Milvus/Neo4j required for Phase 1) ---
 LIGHTRAG_WORKING_DIR = os.getenv("LIGHTRAG_WORKING_DIR", "")
 if not LIGHTRAG_WORKING_DIR:
     LIGHTRAG_WORKING_DIR = str(Path(__file__).resolve().parent.parent / "lightrag_data")
 
+# --- LightRAG query cache: retrieval results per (question, mode, top_k, only_need_context), dropped on insert ---
+LIGHTRAG_QUERY_CACHE_ENABLED = os.getenv("LIGHTRAG_QUERY_CACHE_ENABLED", "true").lower() == "true"
+LIGHTRAG_QUERY_CACHE_MAX_ENTRIES = int(os.getenv("LIGHTRAG_QUERY_CACHE_MAX_ENTRIES", "256"))
+LIGHTRAG_QUERY_CACHE_TTL_S = float(os.getenv("LIGHTRAG_QUERY_CACHE_TTL_S", "3600"))
+
+# --- LightRAG bulk insert: documents per ainsert call (chunks and embeddings are batched across them) ---
+LIGHTRAG_INSERT_BATCH_SIZE = int(os.getenv("LIGHTRAG_INSERT_BATCH_SIZE", "8"))
+
+# --- Warm-up: open a Gemini connection and build LightRAG in the background at startup (/health/ready waits) ---
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "false").lower() == "true"
+
+# --- URL ingest: fetches share one pooled async client; concurrent URLs per batch and per host ---
+INGEST_URL_CONCURRENCY = int(os.getenv("INGEST_URL_CONCURRENCY", "8"))
+INGEST_URL_PER_HOST_CONCURRENCY = int(os.getenv("INGEST_URL_PER_HOST_CONCURRENCY", "2"))
+INGEST_FETCH_TIMEOUT_S = float(os.getenv("INGEST_FETCH_TIMEOUT_S", "30"))
+# PDF uploads: spool dir for extraction (empty = system temp; use a disk mount where /tmp is RAM-backed)
+# and max characters of text per LightRAG insert
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "")
+INGEST_PDF_SEGMENT_CHARS = int(os.getenv("INGEST_PDF_SEGMENT_CHARS", "200000"))
+
+# --- Extraction: PDF/HTML text extraction in a process pool (0 workers = one per core); per-task limits ---
+EXTRACTION_POOL_ENABLED = os.getenv("EXTRACTION_POOL_ENABLED", "true").lower() == "true"  # false = worker thread
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0"))
+EXTRACTION_TIMEOUT_S = float(os.getenv("EXTRACTION_TIMEOUT_S", "120"))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", "2048"))  # address-space cap per worker, 0 = none
+EXTRACTION_PDF_PAGES_PER_TASK = int(os.getenv("EXTRACTION_PDF_PAGES_PER_TASK", "50"))
+
 # --- Content: backend/content or repo root content/ ---
 _BASE = Path(__file__).resolve().parent
 CONTENT_DIR = _BASE / "content"
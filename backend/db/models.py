@@ -1,6 +1,7 @@
 """SQLAlchemy ORM models for curriculum, admin, progress, and users.
 
-Tables: users, concepts, quizzes, failure_facts, curriculum_drafts, ingested_docs, concept_completions.
+Tables: users, concepts, quizzes, failure_facts, curriculum_drafts, curriculum_jobs, ingested_docs,
+concept_completions, content_versions.
 """
 
 from datetime import datetime
@@ -11,9 +12,11 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    text,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import declarative_base, relationship
@@ -53,6 +56,11 @@ class Concept(Base):
     quizzes = relationship("Quiz", back_populates="concept")
     failure_facts = relationship("FailureFact", back_populates="concept")
 
+    __table_args__ = (
+        Index("ix_concepts_track_phase_sort_order", "track", "phase", "sort_order"),
+        Index("ix_concepts_tags", "tags", postgresql_using="gin"),
+    )
+
 
 class Quiz(Base):
     """Quiz linked to a concept; questions stored as JSONB."""
@@ -68,6 +76,8 @@ class Quiz(Base):
 
     concept = relationship("Concept", back_populates="quizzes")
 
+    __table_args__ = (Index("ix_quizzes_concept_id", "concept_id"),)
+
 
 class FailureFact(Base):
     """Failure-mode fact for coach hints; optional concept_id for scoping."""
@@ -86,6 +96,12 @@ class FailureFact(Base):
 
     concept = relationship("Concept", back_populates="failure_facts")
 
+    __table_args__ = (
+        Index("ix_failure_facts_concept_id_id", "concept_id", "id"),
+        Index("ix_failure_facts_tags", "tags", postgresql_using="gin"),
+        Index("ix_failure_facts_keywords", "keywords", postgresql_using="gin"),
+    )
+
 
 class CurriculumDraft(Base):
     """Draft curriculum item (type: concept | quiz | failure) with JSONB payload."""
@@ -98,6 +114,28 @@ class CurriculumDraft(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (Index("ix_curriculum_drafts_updated_at", "updated_at"),)
+
+
+class CurriculumJob(Base):
+    """Background curriculum generation job for one topic (status: queued | running | succeeded | failed)."""
+
+    __tablename__ = "curriculum_jobs"
+
+    id = Column(String(64), primary_key=True)
+    topic = Column(String(512), nullable=False)
+    status = Column(String(16), nullable=False, default="queued")
+    stage = Column(String(32), nullable=False, default="queued")  # queued | retrieving | generating | saving | done
+    error = Column(Text, nullable=True)
+    draft_ids = Column(ARRAY(String), nullable=True, default=list)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (Index("ix_curriculum_jobs_status_created_at", "status", "created_at"),)
+
 
 class IngestedDoc(Base):
     """Record of an ingested document (PDF or URL) for LightRAG."""
@@ -107,6 +145,10 @@ class IngestedDoc(Base):
     doc_id = Column(String(256), primary_key=True)
     name = Column(String(512), nullable=False)
     type = Column(String(32), nullable=False)  # pdf | url
+    # LightRAG documents inserted: doc_id, then doc_id-1 .. doc_id-(segments - 1).
+    segments = Column(Integer, nullable=False, default=1, server_default="1")
+    # ingesting | ingested | partial (a batch failed; at most the first `segments` are indexed)
+    status = Column(String(16), nullable=False, default="ingested", server_default="ingested")
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -122,3 +164,31 @@ class ConceptCompletion(Base):
     completed_at = Column(DateTime, default=datetime.utcnow)
     quiz_score = Column(Integer, nullable=True)
     design_submitted = Column(Boolean, default=False)
+
+    __table_args__ = (
+        Index(
+            "ix_concept_completions_user_id_concept_id",
+            "user_id",
+            "concept_id",
+            postgresql_where=text("user_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_concept_completions_session_id_concept_id",
+            "session_id",
+            "concept_id",
+            postgresql_where=text("session_id IS NOT NULL"),
+        ),
+    )
+
+
+class ContentVersion(Base):
+    """Version stamp of published content (e.g. failure_facts), bumped on every publish.
+
+    Workers compare it with the version of their in-memory indexes to know when to reload.
+    """
+
+    __tablename__ = "content_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
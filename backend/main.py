@@ -1,12 +1,43 @@
-"""Crucible API: FastAPI app, CORS, and router registration."""
+"""Crucible API: FastAPI app, lifespan, CORS, metrics, and router registration."""
 
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from config import CORS_ORIGINS
 from routers import admin, content, coach, curriculum, design, quiz
+from services import curriculum_jobs as curriculum_jobs_service
+from services import extraction as extraction_service
+from services import fact_vectors as fact_vectors_service
+from services import failure_fact_index as failure_fact_index_service
+from services import ingest as ingest_service
+from services import llm as llm_service
+from services import warmup as warmup_service
+from services.metrics import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open process-wide resources on startup and release them on shutdown."""
+    llm_service.init_gemini_client()
+    await failure_fact_index_service.failure_fact_index.start()
+    await fact_vectors_service.fact_vectors.start()
+    await curriculum_jobs_service.job_runner.start()
+    warmup_service.warmup.start()
+    yield
+    await warmup_service.warmup.stop()
+    await curriculum_jobs_service.job_runner.stop()
+    await fact_vectors_service.fact_vectors.stop()
+    await failure_fact_index_service.failure_fact_index.stop()
+    await ingest_service.close_http_client()
+    extraction_service.extraction_pool.shutdown()
+    await llm_service.close_gemini_client()
+
 
-app = FastAPI(title="Crucible API")
+app = FastAPI(title="Crucible API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +47,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+def _route_label(request: Request) -> str:
+    """Return the matched route template with its router prefix (e.g. /coach/sessions/{session_id})."""
+    route = request.scope.get("route")
+    if route is None or not hasattr(route, "path_regex"):
+        return "unmatched"
+    path = request.url.path
+    # Included routers match on the path after their prefix; find where that suffix starts.
+    for i, ch in enumerate(path):
+        if ch == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency and status per route template (time until response headers)."""
+    started = time.perf_counter()
+    response = await call_next(request)
+    path = _route_label(request)
+    metrics.observe(
+        "http_request_duration_seconds",
+        time.perf_counter() - started,
+        method=request.method,
+        route=path,
+    )
+    metrics.inc("http_requests_total", method=request.method, route=path, status=response.status_code)
+    return response
+
+
 app.include_router(admin.router, prefix="/admin", tags=["admin"])
 app.include_router(content.router, prefix="/content", tags=["content"])
 app.include_router(curriculum.router, prefix="/curriculum", tags=["curriculum"])
@@ -25,6 +86,20 @@ app.include_router(coach.router, prefix="/coach", tags=["coach"])
 
 
 @app.get("/health")
+@app.get("/health/live")
 def health():
-    """Return API health status for readiness checks."""
+    """Liveness: the process is up and serving requests (no dependency checks)."""
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: 200 once startup warm-up has finished, else 503; both report warm-up state and timings."""
+    status = warmup_service.warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Return LLM, cache, scheduler and HTTP metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,14 +1,20 @@
 """Repositories: data access for concepts, quizzes, drafts, and related entities."""
 
+from repositories.concept_completion_repository import ConceptCompletionRepository
 from repositories.concept_repository import ConceptRepository
+from repositories.content_version_repository import ContentVersionRepository
 from repositories.curriculum_draft_repository import CurriculumDraftRepository
+from repositories.curriculum_job_repository import CurriculumJobRepository
 from repositories.failure_fact_repository import FailureFactRepository
 from repositories.ingested_doc_repository import IngestedDocRepository
 from repositories.quiz_repository import QuizRepository
 
 __all__ = [
+    "ConceptCompletionRepository",
     "ConceptRepository",
+    "ContentVersionRepository",
     "CurriculumDraftRepository",
+    "CurriculumJobRepository",
     "FailureFactRepository",
     "IngestedDocRepository",
     "QuizRepository",
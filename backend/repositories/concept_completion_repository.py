@@ -0,0 +1,31 @@
+"""ConceptCompletion repository: completed concepts per user or anonymous session."""
+
+from sqlalchemy.orm import Session
+
+from db.models import ConceptCompletion
+
+
+class ConceptCompletionRepository:
+    """Data access for ConceptCompletion model."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_completed_concept_ids(
+        self,
+        user_id: str | None = None,
+        session_id: str | None = None,
+    ) -> list[str]:
+        """Return concept ids completed by user_id, else by session_id (empty if neither is set).
+
+        Served by ix_concept_completions_user_id_concept_id / ..._session_id_concept_id,
+        which also hold concept_id (index-only scans once the table is vacuumed).
+        """
+        q = self.db.query(ConceptCompletion.concept_id)
+        if user_id:
+            q = q.filter(ConceptCompletion.user_id == user_id)
+        elif session_id:
+            q = q.filter(ConceptCompletion.session_id == session_id)
+        else:
+            return []
+        return [r[0] for r in q.all()]
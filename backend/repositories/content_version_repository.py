@@ -0,0 +1,30 @@
+"""ContentVersion repository: read and bump published-content version stamps."""
+
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from db.models import ContentVersion
+
+
+class ContentVersionRepository:
+    """Data access for ContentVersion model."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, name: str) -> int:
+        """Return the current version of name (0 if it was never bumped)."""
+        row = self.db.get(ContentVersion, name)
+        return row.version if row else 0
+
+    def bump(self, name: str) -> None:
+        """Increment the version of name in the caller's transaction (the caller commits)."""
+        stmt = insert(ContentVersion).values(name=name, version=1, updated_at=datetime.utcnow())
+        self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ContentVersion.name],
+                set_={"version": ContentVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+            )
+        )
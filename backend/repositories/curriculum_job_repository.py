@@ -0,0 +1,151 @@
+"""CurriculumJob repository: create, claim, update and list background generation jobs."""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from db.models import CurriculumJob
+
+
+class CurriculumJobRepository:
+    """Data access for CurriculumJob model."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_many(self, topics: list[str]) -> list[CurriculumJob]:
+        """Insert one queued job per topic in a single transaction."""
+        jobs = [CurriculumJob(id=str(uuid.uuid4()), topic=t, status="queued", stage="queued") for t in topics]
+        self.db.add_all(jobs)
+        self.db.commit()
+        for job in jobs:
+            self.db.refresh(job)
+        return jobs
+
+    def get(self, job_id: str) -> CurriculumJob | None:
+        """Return the job with the given id, or None."""
+        return self.db.get(CurriculumJob, job_id)
+
+    def list_recent(self, status: str | None = None, limit: int = 100) -> list[CurriculumJob]:
+        """Return the newest jobs, optionally filtered by status."""
+        query = self.db.query(CurriculumJob)
+        if status:
+            query = query.filter(CurriculumJob.status == status)
+        return query.order_by(CurriculumJob.created_at.desc()).limit(limit).all()
+
+    def claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if another worker got it first."""
+        now = datetime.utcnow()
+        result = self.db.execute(
+            update(CurriculumJob)
+            .where(CurriculumJob.id == job_id, CurriculumJob.status == "queued")
+            .values(
+                status="running",
+                stage="retrieving",
+                attempts=CurriculumJob.attempts + 1,
+                started_at=now,
+                updated_at=now,
+            )
+        )
+        self.db.commit()
+        return result.rowcount == 1
+
+    def claim_next(self) -> str | None:
+        """Atomically claim the oldest queued job; return its id, or None if none is queued.
+
+        Rows locked by another process's claim are skipped rather than waited on.
+        """
+        job_id = self.db.execute(
+            select(CurriculumJob.id)
+            .where(CurriculumJob.status == "queued")
+            .order_by(CurriculumJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if job_id is None:
+            self.db.rollback()
+            return None
+        return job_id if self.claim(job_id) else None
+
+    def heartbeat(self, job_id: str) -> None:
+        """Refresh a running job's updated_at so it is not requeued as stale."""
+        self.db.execute(
+            update(CurriculumJob)
+            .where(CurriculumJob.id == job_id, CurriculumJob.status == "running")
+            .values(updated_at=datetime.utcnow())
+        )
+        self.db.commit()
+
+    def set_stage(self, job_id: str, stage: str, draft_ids: list[str] | None = None) -> None:
+        """Record the running job's current stage and drafts saved so far.
+
+        Also refreshes updated_at as a heartbeat.
+        """
+        values: dict = {"stage": stage, "updated_at": datetime.utcnow()}
+        if draft_ids is not None:
+            values["draft_ids"] = draft_ids
+        self.db.execute(update(CurriculumJob).where(CurriculumJob.id == job_id).values(**values))
+        self.db.commit()
+
+    def finish(self, job_id: str, draft_ids: list[str] | None = None, error: str | None = None) -> None:
+        """Mark a job succeeded (with draft_ids) or failed (with error).
+
+        draft_ids is only written when given, so a failed job keeps the drafts it saved
+        before the error.
+        """
+        now = datetime.utcnow()
+        values: dict = {
+            "status": "failed" if error else "succeeded",
+            "stage": "done",
+            "error": error,
+            "finished_at": now,
+            "updated_at": now,
+        }
+        if draft_ids is not None:
+            values["draft_ids"] = draft_ids
+        self.db.execute(update(CurriculumJob).where(CurriculumJob.id == job_id).values(**values))
+        self.db.commit()
+
+    def requeue(self, job_id: str) -> None:
+        """Put a running job back in the queue (e.g. on shutdown)."""
+        self.db.execute(
+            update(CurriculumJob)
+            .where(CurriculumJob.id == job_id, CurriculumJob.status == "running")
+            .values(status="queued", stage="queued", updated_at=datetime.utcnow())
+        )
+        self.db.commit()
+
+    def requeue_stale(self, stale_after: timedelta, max_attempts: int = 3) -> list[str]:
+        """Requeue running jobs without a heartbeat for stale_after; return all queued job ids, oldest first.
+
+        A stale job that has already been claimed max_attempts times is marked failed
+        instead, so a job that keeps killing its worker is not retried forever.
+        """
+        now = datetime.utcnow()
+        stale = (CurriculumJob.status == "running", CurriculumJob.updated_at < now - stale_after)
+        self.db.execute(
+            update(CurriculumJob)
+            .where(*stale, CurriculumJob.attempts >= max_attempts)
+            .values(
+                status="failed",
+                stage="done",
+                error=f"exceeded max attempts ({max_attempts})",
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+        self.db.execute(
+            update(CurriculumJob)
+            .where(*stale)
+            .values(status="queued", stage="queued", updated_at=now)
+        )
+        self.db.commit()
+        rows = (
+            self.db.query(CurriculumJob.id)
+            .filter(CurriculumJob.status == "queued")
+            .order_by(CurriculumJob.created_at)
+            .all()
+        )
+        return [r.id for r in rows]
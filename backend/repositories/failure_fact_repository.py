@@ -1,10 +1,22 @@
 """FailureFact repository: query failure_facts for coach hints."""
 
+from sqlalchemy import Select, select, union_all
 from sqlalchemy.orm import Session
 
 from db.models import FailureFact
 
 
+def _to_hint(r: FailureFact) -> dict:
+    """Serialize a failure fact row as a coach hint dict."""
+    return {
+        "id": r.id,
+        "tags": r.tags or [],
+        "keywords": r.keywords or [],
+        "fact": r.fact,
+        "promptHint": r.prompt_hint or "",
+    }
+
+
 class FailureFactRepository:
     """Data access for FailureFact model (coach hints)."""
 
@@ -15,32 +27,87 @@ class FailureFactRepository:
         self,
         concept_id: str | None = None,
         limit: int = 2,
+        terms: list[str] | None = None,
     ) -> list[dict]:
         """Return failure_facts for coach hints: concept_id match or global (concept_id IS NULL).
 
         Args:
             concept_id: Optional concept slug; if set, include facts for this concept or global (NULL).
             limit: Max number of facts to return.
+            terms: Optional lowercase terms; facts whose tags or keywords contain one of them
+                come first (GIN overlap), the rest follow in id order.
 
         Returns:
             List of dicts with id, tags, keywords, fact, promptHint.
         """
-        q = self.db.query(FailureFact)
+        rows: list[FailureFact] = []
+        if terms:
+            # Materialized so the planner answers the overlap from the GIN indexes (a bitmap
+            # OR) instead of walking the primary key in id order hoping to hit matches.
+            matches = (
+                self._scope(select(FailureFact.id), concept_id)
+                .where(FailureFact.tags.overlap(terms) | FailureFact.keywords.overlap(terms))
+                .cte("matches")
+                .prefix_with("MATERIALIZED")
+            )
+            rows = (
+                self.db.query(FailureFact)
+                .join(matches, FailureFact.id == matches.c.id)
+                .order_by(FailureFact.id)
+                .limit(limit)
+                .all()
+            )
+        if len(rows) < limit:
+            seen = {r.id for r in rows}
+            rest = self._in_id_order(concept_id, limit)
+            rows += [r for r in rest if r.id not in seen][: limit - len(rows)]
+        return [_to_hint(r) for r in rows]
+
+    def _scope(self, q: Select, concept_id: str | None) -> Select:
+        """Filter q to facts of concept_id plus global facts (global only if concept_id is None)."""
         if concept_id:
-            q = q.filter(
+            return q.where(
                 (FailureFact.concept_id == concept_id)
                 | (FailureFact.concept_id.is_(None))
             )
+        return q.where(FailureFact.concept_id.is_(None))
+
+    def _in_id_order(self, concept_id: str | None, limit: int) -> list[FailureFact]:
+        """Return the first limit facts of concept_id plus global facts, ordered by id.
+
+        "concept_id = X OR concept_id IS NULL ORDER BY id" cannot walk one index range, so
+        each side takes its first limit rows from ix_failure_facts_concept_id_id (ordered
+        by id within a concept_id) and only those 2 * limit rows are merged.
+        """
+        global_ids = (
+            select(FailureFact.id)
+            .where(FailureFact.concept_id.is_(None))
+            .order_by(FailureFact.id)
+            .limit(limit)
+        )
+        if not concept_id:
+            ids = global_ids.subquery()
         else:
-            q = q.filter(FailureFact.concept_id.is_(None))
-        rows = q.order_by(FailureFact.id).limit(limit).all()
-        return [
-            {
-                "id": r.id,
-                "tags": r.tags or [],
-                "keywords": r.keywords or [],
-                "fact": r.fact,
-                "promptHint": r.prompt_hint or "",
-            }
-            for r in rows
-        ]
+            concept_ids = (
+                select(FailureFact.id)
+                .where(FailureFact.concept_id == concept_id)
+                .order_by(FailureFact.id)
+                .limit(limit)
+            )
+            ids = union_all(global_ids.subquery().select(), concept_ids.subquery().select()).subquery()
+        return (
+            self.db.query(FailureFact)
+            .join(ids, FailureFact.id == ids.c.id)
+            .order_by(FailureFact.id)
+            .limit(limit)
+            .all()
+        )
+
+    def list_all(self) -> list[dict]:
+        """Return every failure fact as a hint dict plus its concept_id, ordered by id.
+
+        Returns:
+            List of dicts with id, concept_id, tags, keywords, fact, promptHint.
+        """
+        rows = self.db.query(FailureFact).order_by(FailureFact.id).all()
+        return [{**_to_hint(r), "concept_id": r.concept_id} for r in rows]
@@ -1,5 +1,6 @@
-"""IngestedDoc repository: list and add ingested documents."""
+"""IngestedDoc repository: list, add and track ingested documents (one or many per transaction)."""
 
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
 
 from db.models import IngestedDoc
@@ -19,8 +20,33 @@ class IngestedDocRepository:
             .all()
         )
 
-    def add(self, doc_id: str, name: str, type: str) -> None:
+    def add(
+        self, doc_id: str, name: str, type: str, segments: int = 1, status: str = "ingested"
+    ) -> None:
         """Add an ingested doc record."""
-        row = IngestedDoc(doc_id=doc_id, name=name, type=type)
+        row = IngestedDoc(doc_id=doc_id, name=name, type=type, segments=segments, status=status)
         self.db.add(row)
         self.db.commit()
+
+    def set_progress(self, doc_id: str, segments: int, status: str) -> None:
+        """Record how many segments of a doc are indexed and its ingest status."""
+        self.db.execute(
+            update(IngestedDoc)
+            .where(IngestedDoc.doc_id == doc_id)
+            .values(segments=segments, status=status)
+        )
+        self.db.commit()
+
+    def delete(self, doc_id: str) -> None:
+        """Remove a doc record (e.g. an ingest that indexed nothing)."""
+        self.db.execute(delete(IngestedDoc).where(IngestedDoc.doc_id == doc_id))
+        self.db.commit()
+
+    def add_many(self, docs: list[tuple[str, str, str]]) -> None:
+        """Add (doc_id, name, type) records in one transaction."""
+        if not docs:
+            return
+        self.db.add_all(
+            [IngestedDoc(doc_id=doc_id, name=name, type=type) for doc_id, name, type in docs]
+        )
+        self.db.commit()
@@ -1,19 +1,20 @@
-"""Admin API: ingest (PDF + URLs) into LightRAG, curriculum generation, drafts, publish."""
+"""Admin API: ingest (PDF + URLs) into LightRAG, curriculum generation jobs, drafts, publish."""
 
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
 
+from config import CURRICULUM_JOB_MAX_TOPICS
 from db import get_db
 from schemas.requests import (
     GenerateCurriculumRequest,
     IngestUrlsRequest,
     PublishCurriculumRequest,
 )
-from services import lightrag as lightrag_service
-from services import curriculum as curriculum_service
 from services import curriculum_draft as curriculum_draft_service
+from services import curriculum_jobs as curriculum_jobs_service
+from services import fact_vectors as fact_vectors_service
 from services import ingest as ingest_service
 
 router = APIRouter()
@@ -53,28 +54,43 @@ def list_ingest_sources(db: Annotated[Session, Depends(get_db)]):
     return {"sources": sources}
 
 
-@router.post("/curriculum/generate")
+@router.post("/curriculum/generate", status_code=202)
 async def generate_curriculum(
     body: GenerateCurriculumRequest,
     db: Annotated[Session, Depends(get_db)],
 ):
-    """Retrieve from LightRAG by topic, synthesize with Gemini, save as curriculum_drafts. Returns draft ids."""
-    topic = (body.topic or "").strip() or "system design fundamentals"
-    question = f"What are the key concepts and tradeoffs for {topic}?"
-    context = await lightrag_service.query(question, only_need_context=True)
-    if not context:
+    """Queue curriculum generation (LightRAG retrieval + Gemini) for one topic or many.
+
+    Returns job ids immediately; poll GET /curriculum/jobs/{job_id} for status. Finished
+    jobs save their output as curriculum_drafts.
+    """
+    topics = body.topics or [body.topic or ""]
+    if len(topics) > CURRICULUM_JOB_MAX_TOPICS:
         raise HTTPException(
-            status_code=503,
-            detail="LightRAG returned no context. Ingest content first and ensure GEMINI_API_KEY is set.",
-        )
-    try:
-        data = curriculum_service.generate_curriculum_from_context(
-            context, topic=topic
+            status_code=400,
+            detail=f"At most {CURRICULUM_JOB_MAX_TOPICS} topics per request",
         )
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    draft_ids = curriculum_draft_service.save_drafts(db, data)
-    return {"draft_ids": draft_ids}
+    jobs = await curriculum_jobs_service.job_runner.submit(db, topics)
+    return {"job_ids": [j["id"] for j in jobs], "jobs": jobs}
+
+
+@router.get("/curriculum/jobs")
+def list_curriculum_jobs(
+    db: Annotated[Session, Depends(get_db)],
+    status: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 100,
+):
+    """List curriculum generation jobs, newest first (optionally filtered by status)."""
+    return {"jobs": curriculum_jobs_service.list_jobs(db, status=status, limit=limit)}
+
+
+@router.get("/curriculum/jobs/{job_id}")
+def get_curriculum_job(job_id: str, db: Annotated[Session, Depends(get_db)]):
+    """Return a curriculum job's status, stage, progress and (when done) draft ids or error."""
+    job = curriculum_jobs_service.get_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @router.get("/curriculum/drafts")
@@ -87,8 +103,25 @@ def list_curriculum_drafts(db: Annotated[Session, Depends(get_db)]):
 @router.post("/curriculum/publish")
 def publish_curriculum(
     body: PublishCurriculumRequest,
+    background_tasks: BackgroundTasks,
     db: Annotated[Session, Depends(get_db)],
 ):
-    """Publish selected drafts into concepts, quizzes, failure_facts tables."""
+    """Publish selected drafts into concepts, quizzes, failure_facts tables.
+
+    Failure fact embeddings (when enabled) are refreshed after the response is sent.
+    """
     published = curriculum_draft_service.publish_drafts(db, body.draft_ids)
+    background_tasks.add_task(fact_vectors_service.rebuild_after_publish)
     return {"published": published}
+
+
+@router.post("/failure-facts/vectors/rebuild")
+async def rebuild_failure_fact_vectors():
+    """Embed new or edited failure facts and publish a new vector matrix to all workers."""
+    if not fact_vectors_service.fact_vectors.enabled:
+        raise HTTPException(status_code=400, detail="FAILURE_FACT_VECTORS_ENABLED is off")
+    try:
+        embedded = await fact_vectors_service.fact_vectors.rebuild()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"embedded": embedded, "version": fact_vectors_service.fact_vectors.version}
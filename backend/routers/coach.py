@@ -1,26 +1,79 @@
-"""Coach API: Socratic feedback on learner designs using LLM and failure-fact hints."""
+"""Coach API: Socratic feedback on learner designs using LLM and failure-fact hints.
 
+Stateless: POST /coach/feedback[/stream] with design and full conversation each call.
+Sessions: POST /coach/sessions once, then POST /coach/sessions/{id}/turns[/stream] with only the new turn.
+"""
+
+import json
+from collections.abc import AsyncIterator
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from db import get_db
-from schemas.requests import CoachFeedbackRequest
-from schemas.responses import CoachFeedbackResponse
-from services.coach import get_coach_feedback
+from schemas.requests import CoachFeedbackRequest, CoachSessionCreateRequest, CoachTurnRequest
+from schemas.responses import CoachFeedbackResponse, CoachSessionResponse, CoachTurnResponse
+from services import coach_session as coach_session_service
+from services.coach import get_coach_feedback, stream_coach_feedback
+from services.coach_session import CoachSession, coach_sessions
 
 router = APIRouter()
 
 
+def _sse_event(data: dict, event: str | None = None) -> str:
+    """Format one Server-Sent Events frame with a JSON data payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def _sse_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Wrap coach text chunks as SSE frames, ending with a done (or error) event."""
+    try:
+        async for chunk in chunks:
+            yield _sse_event({"delta": chunk})
+    except Exception as e:
+        yield _sse_event({"detail": str(e)}, event="error")
+        return
+    yield _sse_event({}, event="done")
+
+
+def _sse_response(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """Return a text/event-stream response for coach text chunks."""
+    return StreamingResponse(
+        _sse_stream(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _get_session(session_id: str) -> CoachSession:
+    """Return the coach session or raise 404 if unknown or evicted."""
+    session = coach_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Coach session not found: {session_id}")
+    return session
+
+
+def _session_response(session: CoachSession) -> CoachSessionResponse:
+    """Map a CoachSession to its API response."""
+    return CoachSessionResponse(
+        session_id=session.id,
+        topic=session.topic,
+        pressure_test=session.pressure_test,
+        turn_count=session.turn_count,
+    )
+
+
 @router.post("/feedback", response_model=CoachFeedbackResponse)
-def coach_feedback(
+async def coach_feedback(
     body: CoachFeedbackRequest,
     db: Annotated[Session, Depends(get_db)],
 ):
     """Return Socratic coach feedback for the given design and conversation context."""
     conversation_context = [{"role": t.role, "text": t.text} for t in body.conversation_context]
-    feedback = get_coach_feedback(
+    feedback = await get_coach_feedback(
         db=db,
         design_text=body.design_text,
         topic=body.topic,
@@ -28,3 +81,83 @@ def coach_feedback(
         conversation_context=conversation_context,
     )
     return CoachFeedbackResponse(feedback=feedback)
+
+
+@router.post("/feedback/stream")
+async def coach_feedback_stream(
+    body: CoachFeedbackRequest,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """Stream Socratic coach feedback as Server-Sent Events.
+
+    Emits `data: {"delta": "..."}` frames as the model produces text, then a final
+    `event: done` frame (or `event: error` if generation fails mid-stream).
+    """
+    conversation_context = [{"role": t.role, "text": t.text} for t in body.conversation_context]
+    chunks = await stream_coach_feedback(
+        db=db,
+        design_text=body.design_text,
+        topic=body.topic,
+        pressure_test=body.pressure_test,
+        conversation_context=conversation_context,
+    )
+    return _sse_response(chunks)
+
+
+@router.post("/sessions", response_model=CoachSessionResponse)
+def create_coach_session(body: CoachSessionCreateRequest):
+    """Create a server-side coach session holding the design, topic and history."""
+    session = coach_sessions.create(
+        design_text=body.design_text,
+        topic=body.topic,
+        pressure_test=body.pressure_test,
+    )
+    return _session_response(session)
+
+
+@router.get("/sessions/{session_id}", response_model=CoachSessionResponse)
+def get_coach_session(session_id: str):
+    """Return coach session metadata.
+
+    Raises:
+        HTTPException: 404 if the session is unknown or was evicted.
+    """
+    return _session_response(_get_session(session_id))
+
+
+@router.delete("/sessions/{session_id}")
+def delete_coach_session(session_id: str):
+    """End a coach session and free its memory."""
+    return {"deleted": coach_sessions.delete(session_id)}
+
+
+@router.post("/sessions/{session_id}/turns", response_model=CoachTurnResponse)
+async def add_coach_turn(
+    session_id: str,
+    body: CoachTurnRequest,
+    db: Annotated[Session, Depends(get_db)],
+):
+    """Append the learner's new turn to the session and return the coach's reply.
+
+    Raises:
+        HTTPException: 404 if the session is unknown or was evicted.
+    """
+    session = _get_session(session_id)
+    feedback = await coach_session_service.add_turn(
+        db, session, text=body.text, design_text=body.design_text
+    )
+    return CoachTurnResponse(session_id=session.id, feedback=feedback)
+
+
+@router.post("/sessions/{session_id}/turns/stream")
+async def add_coach_turn_stream(session_id: str, body: CoachTurnRequest):
+    """Append the learner's new turn and stream the coach's reply as Server-Sent Events.
+
+    Raises:
+        HTTPException: 404 if the session is unknown or was evicted.
+    """
+    session = _get_session(session_id)
+    chunks = await coach_session_service.stream_turn(
+        session, text=body.text, design_text=body.design_text
+    )
+    return _sse_response(chunks)
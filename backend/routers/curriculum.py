@@ -7,8 +7,7 @@ from sqlalchemy.orm import Session
 
 from auth_deps import get_optional_user_id
 from db import get_db
-from db.models import ConceptCompletion
-from repositories import ConceptRepository
+from repositories import ConceptCompletionRepository, ConceptRepository
 from schemas import concept_to_roadmap_item
 from schemas.responses import ConceptRoadmapItem, ProgressResponse, RoadmapResponse
 
@@ -35,23 +34,18 @@ def get_progress(
 
     Keyed by user_id when authenticated (Phase S0), else X-Session-Id for anonymous.
     """
-    q = db.query(ConceptCompletion.concept_id)
-    if user_id:
-        q = q.filter(ConceptCompletion.user_id == user_id)
-    elif x_session_id:
-        q = q.filter(ConceptCompletion.session_id == x_session_id)
-    else:
-        q = q.filter(False)  # no identity
-    completed = q.all()
-    completed_ids = [r[0] for r in completed]
+    completed_ids = ConceptCompletionRepository(db).get_completed_concept_ids(
+        user_id=user_id, session_id=x_session_id
+    )
+    completed = set(completed_ids)
     repo = ConceptRepository(db)
     all_concepts = repo.get_default_track_concepts()
     next_id = None
     for c in all_concepts:
-        if c.id in completed_ids:
+        if c.id in completed:
             continue
         prereqs = c.prerequisite_concept_ids or []
-        if all(pid in completed_ids for pid in prereqs):
+        if all(pid in completed for pid in prereqs):
             next_id = c.id
             break
     return ProgressResponse(
@@ -15,6 +15,7 @@ class GenerateCurriculumRequest(BaseModel):
     """Request body for POST /admin/curriculum/generate."""
 
     topic: str | None = Field(None, description="Topic focus for curriculum generation")
+    topics: list[str] | None = Field(None, description="Several topics to queue at once (one job each)")
 
 
 class PublishCurriculumRequest(BaseModel):
@@ -41,6 +42,25 @@ class CoachFeedbackRequest(BaseModel):
     model_config = {"populate_by_name": True}
 
 
+class CoachSessionCreateRequest(BaseModel):
+    """Request body for POST /coach/sessions."""
+
+    design_text: str = Field("", alias="designText")
+    topic: str | None = Field(None, description="Concept id or topic name")
+    pressure_test: bool = Field(False, alias="pressureTest")
+
+    model_config = {"populate_by_name": True}
+
+
+class CoachTurnRequest(BaseModel):
+    """Request body for POST /coach/sessions/{session_id}/turns."""
+
+    text: str = Field("", description="The learner's new message (empty to review the design)")
+    design_text: str | None = Field(None, alias="designText", description="Replacement design text, if changed")
+
+    model_config = {"populate_by_name": True}
+
+
 class QuizAnswerItem(BaseModel):
     """Single answer in quiz submit."""
 
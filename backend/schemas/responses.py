@@ -60,6 +60,26 @@ class CoachFeedbackResponse(BaseModel):
     feedback: str
 
 
+class CoachSessionResponse(BaseModel):
+    """Response for POST /coach/sessions and GET /coach/sessions/{session_id}."""
+
+    session_id: str = Field(..., alias="sessionId")
+    topic: str | None = None
+    pressure_test: bool = Field(False, alias="pressureTest")
+    turn_count: int = Field(0, alias="turnCount")
+
+    model_config = {"populate_by_name": True, "serialize_by_alias": True}
+
+
+class CoachTurnResponse(BaseModel):
+    """Response for POST /coach/sessions/{session_id}/turns."""
+
+    session_id: str = Field(..., alias="sessionId")
+    feedback: str
+
+    model_config = {"populate_by_name": True, "serialize_by_alias": True}
+
+
 class QuizSubmitResultItem(BaseModel):
     """Per-question result in quiz submit response."""
 
@@ -83,6 +103,8 @@ class IngestSourceItem(BaseModel):
     doc_id: str
     name: str
     type: str
+    segments: int = 1
+    status: str = "ingested"
     created_at: datetime | None = None
 
 
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Benchmark the hot repository queries with and without the migration 005 indexes.
+
+Inserts a synthetic dataset, runs each repository query under EXPLAIN ANALYZE with the
+indexes in place and again after dropping them, and prints plan and execution time side
+by side. Everything runs in one transaction that is rolled back, so the database is left
+unchanged; the DROP INDEX locks the tables until then, so do not run it against a
+database that is serving traffic.
+
+Run from backend dir:
+    python scripts/bench_indexes.py
+    python scripts/bench_indexes.py --facts 500000 --completions 1000000 --json
+Requires DATABASE_URL set and migrations applied (through 005).
+"""
+
+import argparse
+import importlib.util
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+# Add backend to path when run from repo root or backend
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from db import engine
+from repositories import (
+    ConceptCompletionRepository,
+    ConceptRepository,
+    CurriculumDraftRepository,
+    FailureFactRepository,
+    QuizRepository,
+)
+
+# Synthetic rows are created under this id prefix (and rolled back).
+PREFIX = "bench-"
+
+
+def _migration_indexes() -> list[tuple[str, str, list[str], dict]]:
+    """Return the INDEXES list of the 005 migration (single source of index names)."""
+    path = _backend / "alembic" / "versions" / "005_query_indexes.py"
+    spec = importlib.util.spec_from_file_location("query_indexes_005", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.INDEXES
+
+
+def _seed(conn: Any, concepts: int, facts: int, completions: int, drafts: int) -> None:
+    """Insert synthetic rows with generate_series (server-side, no round trips per row)."""
+    params = {
+        "p": PREFIX,
+        "concepts": concepts,
+        "facts": facts,
+        "completions": completions,
+        "drafts": drafts,
+    }
+    conn.execute(
+        text(
+            "INSERT INTO concepts (id, track, phase, sort_order, prerequisite_concept_ids, title, body, tags) "
+            "SELECT :p || 'c' || i, 'track' || (i % 20), 'phase' || (i % 5), i, '{}', 'Concept ' || i, 'body', "
+            "ARRAY['tag' || (i % 50)] FROM generate_series(1, :concepts) i"
+        ),
+        params,
+    )
+    conn.execute(
+        text(
+            "INSERT INTO quizzes (id, concept_id, questions) "
+            "SELECT :p || 'q' || i, :p || 'c' || i, '[]'::jsonb FROM generate_series(1, :concepts) i"
+        ),
+        params,
+    )
+    # Facts are grouped by concept in id order (as published drafts are); one in 50 is global.
+    conn.execute(
+        text(
+            "INSERT INTO failure_facts (id, concept_id, tags, keywords, fact, prompt_hint) "
+            "SELECT :p || 'f' || lpad(i::text, 9, '0'), "
+            "CASE WHEN i % 50 = 0 THEN NULL ELSE :p || 'c' || (1 + (i - 1) * :concepts / :facts) END, "
+            "ARRAY['tag' || (i % 200)], ARRAY['kw' || (i % 5000), 'kw' || (i % 777)], "
+            "'Synthetic failure fact ' || i, 'hint' FROM generate_series(1, :facts) i"
+        ),
+        params,
+    )
+    conn.execute(
+        text(
+            "INSERT INTO concept_completions (user_id, session_id, concept_id, quiz_score) "
+            "SELECT CASE WHEN i % 2 = 0 THEN :p || 'u' || (i % 50000) END, "
+            "CASE WHEN i % 2 = 1 THEN :p || 's' || (i % 50000) END, "
+            ":p || 'c' || (1 + i % :concepts), 80 FROM generate_series(1, :completions) i"
+        ),
+        params,
+    )
+    conn.execute(
+        text(
+            "INSERT INTO curriculum_drafts (id, type, payload, updated_at) "
+            "SELECT :p || 'd' || i, 'concept', '{}'::jsonb, now() - i * interval '1 second' "
+            "FROM generate_series(1, :drafts) i"
+        ),
+        params,
+    )
+
+
+def _analyze(conn: Any) -> None:
+    """Refresh planner statistics for the benchmarked tables."""
+    for table in ("concepts", "quizzes", "failure_facts", "concept_completions", "curriculum_drafts"):
+        conn.execute(text(f"ANALYZE {table}"))
+
+
+def _cases(db: Session, concepts: int) -> dict[str, Any]:
+    """Return name -> zero-arg call of the repository method under test."""
+    facts = FailureFactRepository(db)
+    # The last concept's facts come last in id order (worst case for a primary key walk).
+    concept = f"{PREFIX}c{concepts}"
+    return {
+        "quiz by concept": lambda: QuizRepository(db).get_by_concept_id(concept),
+        "hints by concept": lambda: facts.get_failure_facts(concept, limit=2),
+        "hints global": lambda: facts.get_failure_facts(None, limit=2),
+        "hints by terms": lambda: facts.get_failure_facts(concept, limit=2, terms=["kw42", "tag7"]),
+        "completed (user)": lambda: ConceptCompletionRepository(db).get_completed_concept_ids(
+            user_id=f"{PREFIX}u42"
+        ),
+        "completed (session)": lambda: ConceptCompletionRepository(db).get_completed_concept_ids(
+            session_id=f"{PREFIX}s43"
+        ),
+        "default track concepts": lambda: ConceptRepository(db).get_default_track_concepts(),
+        "drafts newest first": lambda: CurriculumDraftRepository(db).list_all(),
+    }
+
+
+def _explain(conn: Any, db: Session, call: Any) -> dict[str, Any]:
+    """Run call, capture its SQL statements and EXPLAIN ANALYZE each one.
+
+    Returns:
+        Dict with summed execution_ms and the scan nodes of every plan.
+    """
+    statements: list[tuple[str, Any]] = []
+
+    def capture(_conn, _cursor, statement, parameters, _context, _executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        call()
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+    total_ms = 0.0
+    scans: list[str] = []
+    for statement, parameters in statements:
+        row = conn.exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters).scalar()
+        plan = (row if isinstance(row, list) else json.loads(row))[0]
+        total_ms += plan["Execution Time"]
+        scans += _scan_nodes(plan["Plan"])
+    return {"execution_ms": round(total_ms, 3), "scans": scans}
+
+
+def _scan_nodes(node: dict[str, Any]) -> list[str]:
+    """Return "Node Type [index]" for every scan node in a plan tree."""
+    found = []
+    if "Scan" in node["Node Type"]:
+        index = node.get("Index Name")
+        target = f"[{index}]" if index else f"on {node.get('Relation Name')}"
+        found.append(f"{node['Node Type']} {target}")
+    for child in node.get("Plans", []):
+        found += _scan_nodes(child)
+    return found
+
+
+def _run_cases(conn: Any, db: Session, concepts: int, repeat: int) -> dict[str, dict[str, Any]]:
+    """Explain every case repeat times; keep the fastest run (first runs warm the cache)."""
+    results = {}
+    for name, call in _cases(db, concepts).items():
+        runs = [_explain(conn, db, call) for _ in range(repeat)]
+        results[name] = min(runs, key=lambda r: r["execution_ms"])
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concepts", type=int, default=5000)
+    parser.add_argument("--facts", type=int, default=200000)
+    parser.add_argument("--completions", type=int, default=500000)
+    parser.add_argument("--drafts", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (fastest is reported)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    indexes = _migration_indexes()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            missing = [
+                name
+                for name, *_ in indexes
+                if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar() is None
+            ]
+            if missing:
+                sys.exit(f"Indexes missing (run alembic upgrade head): {', '.join(missing)}")
+            _seed(conn, args.concepts, args.facts, args.completions, args.drafts)
+            _analyze(conn)
+            db = Session(bind=conn)
+            indexed = _run_cases(conn, db, args.concepts, args.repeat)
+            for name, *_ in indexes:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+            _analyze(conn)
+            unindexed = _run_cases(conn, db, args.concepts, args.repeat)
+            db.close()
+        finally:
+            trans.rollback()
+
+    report = {name: {"without": unindexed[name], "with": indexed[name]} for name in indexed}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{args.concepts} concepts, {args.facts} failure facts, "
+        f"{args.completions} completions, {args.drafts} drafts"
+    )
+    for name, r in report.items():
+        before, after = r["without"], r["with"]
+        speedup = before["execution_ms"] / after["execution_ms"] if after["execution_ms"] else float("inf")
+        print(f"\n{name}: {before['execution_ms']:.3f} ms -> {after['execution_ms']:.3f} ms ({speedup:.0f}x)")
+        print(f"  without: {', '.join(before['scans'])}")
+        print(f"  with:    {', '.join(after['scans'])}")
+
+
+if __name__ == "__main__":
+    main()
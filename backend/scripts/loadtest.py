@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Load test for the coach and curriculum request paths.
+
+Drives the API with N concurrent virtual users and reports throughput, latency
+percentiles, errors and (in-process runs) threadpool saturation.
+
+Run from backend dir:
+    python scripts/loadtest.py --scenario coach --users 50 --requests 1000
+    python scripts/loadtest.py --scenario coach-stream --users 20 --duration 30
+    python scripts/loadtest.py --scenario curriculum --users 4 --requests 40
+    python scripts/loadtest.py --base-url http://localhost:8000 --scenario coach
+
+Without --base-url the app runs in-process (httpx ASGI transport) with the fake LLM
+provider (override with --provider gemini); LightRAG retrieval for the curriculum
+scenario is replaced by fixed context so only the request path is measured. Curriculum
+requests are timed from submission until the background job finishes. Requires
+DATABASE_URL set and migrations applied (coach reads failure facts; curriculum writes drafts).
+In-process responses are buffered, so time to first chunk is only meaningful with --base-url.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add backend to path when run from repo root or backend
+_backend = Path(__file__).resolve().parent.parent
+if str(_backend) not in sys.path:
+    sys.path.insert(0, str(_backend))
+
+import httpx
+
+SCENARIOS = ("coach", "coach-stream", "curriculum")
+
+# How often the curriculum scenario polls a queued job.
+JOB_POLL_S = 0.05
+
+_DESIGN_TEMPLATE = (
+    "Design {n}: clients call an API gateway that fronts {k} stateless app servers. "
+    "Writes go to a Postgres primary with two async replicas; reads hit a Redis cache "
+    "with a {ttl}s TTL. A Kafka topic fans out events to {k} consumer groups."
+)
+
+_FAKE_CONTEXT = (
+    "Caching reduces read latency but introduces staleness. Replication improves "
+    "availability; async replication can lose acknowledged writes on failover. "
+    "Sharding spreads load but complicates cross-shard queries and rebalancing."
+)
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Return the pct percentile (0-100) of an ascending list, or 0.0 if empty."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Results:
+    """Per-request outcomes collected by the virtual users."""
+
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.first_chunk: list[float] = []
+        self.statuses: Counter[str] = Counter()
+
+    def record(self, status: str, latency: float, first_chunk: float | None = None) -> None:
+        """Record one request outcome."""
+        self.statuses[status] += 1
+        self.latencies.append(latency)
+        if first_chunk is not None:
+            self.first_chunk.append(first_chunk)
+
+
+class ThreadpoolSampler:
+    """Samples the AnyIO default thread limiter used by sync routes and dependencies."""
+
+    def __init__(self, interval_s: float = 0.01):
+        self.interval_s = interval_s
+        self.samples: list[tuple[int, int, int]] = []
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Sample (busy, total, waiting) until stop is set."""
+        import anyio.to_thread
+
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        while not stop.is_set():
+            stats = limiter.statistics()
+            self.samples.append((stats.borrowed_tokens, int(stats.total_tokens), stats.tasks_waiting))
+            await asyncio.sleep(self.interval_s)
+
+    def report(self) -> dict:
+        """Return peak/mean threadpool utilization and the share of samples at capacity."""
+        if not self.samples:
+            return {}
+        total = self.samples[-1][1]
+        busy = [s[0] for s in self.samples]
+        return {
+            "threads": total,
+            "busy_peak": max(busy),
+            "busy_mean": sum(busy) / len(busy),
+            "saturated_share": sum(1 for s in self.samples if s[0] >= s[1]) / len(self.samples),
+            "waiting_peak": max(s[2] for s in self.samples),
+        }
+
+
+def _request_body(scenario: str, n: int, unique_ratio: float, rng: random.Random) -> dict:
+    """Return the JSON body for request n (repeating a small pool of designs per unique_ratio)."""
+    if rng.random() >= unique_ratio:
+        n = rng.randrange(8)
+    if scenario == "curriculum":
+        return {"topic": f"load test topic {n}"}
+    design = _DESIGN_TEMPLATE.format(n=n, k=2 + n % 5, ttl=30 + n % 90)
+    return {"designText": design, "topic": None, "pressureTest": n % 2 == 0}
+
+
+async def _run_job(client: httpx.AsyncClient, body: dict) -> str:
+    """Queue one curriculum job and poll it to completion; returns its final status."""
+    response = await client.post("/admin/curriculum/generate", json=body)
+    if response.status_code != 202:
+        return str(response.status_code)
+    job_id = response.json()["job_ids"][0]
+    while True:
+        await asyncio.sleep(JOB_POLL_S)
+        response = await client.get(f"/admin/curriculum/jobs/{job_id}")
+        if response.status_code != 200:
+            return str(response.status_code)
+        status = response.json()["status"]
+        if status in ("succeeded", "failed"):
+            return status
+
+
+async def _send(client: httpx.AsyncClient, scenario: str, body: dict, results: Results) -> None:
+    """Send one request and record its latency and status."""
+    started = time.perf_counter()
+    try:
+        if scenario == "coach-stream":
+            first_chunk = None
+            async with client.stream("POST", "/coach/feedback/stream", json=body) as response:
+                async for _ in response.aiter_bytes():
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+            results.record(str(response.status_code), time.perf_counter() - started, first_chunk)
+            return
+        if scenario == "curriculum":
+            results.record(await _run_job(client, body), time.perf_counter() - started)
+            return
+        response = await client.post("/coach/feedback", json=body)
+        results.record(str(response.status_code), time.perf_counter() - started)
+    except httpx.HTTPError as e:
+        results.record(type(e).__name__, time.perf_counter() - started)
+
+
+async def _user(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    counter: list[int],
+    deadline: float | None,
+    results: Results,
+    rng: random.Random,
+) -> None:
+    """One virtual user: send requests back to back until the budget is used up."""
+    while True:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return
+        if deadline is None and counter[0] >= args.requests:
+            return
+        n = counter[0]
+        counter[0] += 1
+        await _send(client, args.scenario, _request_body(args.scenario, n, args.unique_ratio, rng), results)
+        if args.think_ms:
+            await asyncio.sleep(args.think_ms / 1000)
+
+
+async def _drive(client: httpx.AsyncClient, args: argparse.Namespace, sampler: ThreadpoolSampler | None) -> tuple[Results, float]:
+    """Run all virtual users against client; returns results and wall time in seconds."""
+    results = Results()
+    counter = [0]
+    rng = random.Random(args.seed)
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop)) if sampler else None
+    started = time.perf_counter()
+    deadline = started + args.duration if args.duration else None
+    await asyncio.gather(
+        *(_user(client, args, counter, deadline, results, rng) for _ in range(args.users))
+    )
+    elapsed = time.perf_counter() - started
+    stop.set()
+    if sampling:
+        await sampling
+    return results, elapsed
+
+
+async def _run_in_process(args: argparse.Namespace) -> tuple[Results, float, dict]:
+    """Run the load test against the app in this process."""
+    os.environ["LLM_PROVIDER"] = args.provider
+    from main import app, lifespan
+    from services import lightrag as lightrag_service
+
+    if args.scenario == "curriculum":
+
+        async def fixed_context(question: str, **kwargs) -> str:
+            return f"{_FAKE_CONTEXT}\n\nQuestion: {question}"
+
+        lightrag_service.query = fixed_context
+
+    sampler = ThreadpoolSampler()
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            results, elapsed = await _drive(client, args, sampler)
+    return results, elapsed, sampler.report()
+
+
+async def _run_remote(args: argparse.Namespace) -> tuple[Results, float, dict]:
+    """Run the load test against a running server at --base-url."""
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        results, elapsed = await _drive(client, args, None)
+    return results, elapsed, {}
+
+
+def _summary(args: argparse.Namespace, results: Results, elapsed: float, threadpool: dict) -> dict:
+    """Build the report dict (latencies in milliseconds)."""
+    latencies = sorted(results.latencies)
+    first_chunk = sorted(results.first_chunk)
+    ok = sum(
+        n for status, n in results.statuses.items() if status.startswith("2") or status == "succeeded"
+    )
+    report = {
+        "scenario": args.scenario,
+        "target": args.base_url or f"in-process ({args.provider})",
+        "users": args.users,
+        "requests": len(latencies),
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "statuses": dict(results.statuses),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(_percentile(latencies, pct) * 1000, 1)
+            for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+        },
+    }
+    if first_chunk:
+        report["first_chunk_ms"] = {
+            name: round(_percentile(first_chunk, pct) * 1000, 1)
+            for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))
+        }
+    if threadpool:
+        report["threadpool"] = threadpool
+    return report
+
+
+def _print_report(report: dict) -> None:
+    """Print the report in a human-readable form."""
+    print(f"scenario   {report['scenario']} -> {report['target']}")
+    print(f"users      {report['users']}")
+    print(f"requests   {report['requests']} ({report['ok']} ok, {report['errors']} errors) {report['statuses']}")
+    print(f"elapsed    {report['elapsed_s']} s")
+    print(f"throughput {report['throughput_rps']} req/s")
+    lat = report["latency_ms"]
+    print(f"latency    p50 {lat['p50']} ms  p95 {lat['p95']} ms  p99 {lat['p99']} ms  max {lat['max']} ms")
+    if "first_chunk_ms" in report:
+        fc = report["first_chunk_ms"]
+        print(f"1st chunk  p50 {fc['p50']} ms  p95 {fc['p95']} ms  p99 {fc['p99']} ms")
+    if "threadpool" in report:
+        tp = report["threadpool"]
+        print(
+            f"threadpool {tp['busy_peak']}/{tp['threads']} peak busy, {tp['busy_mean']:.1f} mean, "
+            f"{tp['saturated_share']:.0%} of samples saturated, {tp['waiting_peak']} peak waiting"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS, default="coach")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Run for this many seconds instead")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause between a user's requests")
+    parser.add_argument("--unique-ratio", type=float, default=1.0, help="Share of requests with a fresh design (rest repeat, hitting caches)")
+    parser.add_argument("--base-url", default="", help="Target a running server instead of in-process")
+    parser.add_argument("--provider", choices=("fake", "gemini"), default="fake", help="LLM provider for in-process runs")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv(_backend / ".env")
+
+    runner = _run_remote if args.base_url else _run_in_process
+    results, elapsed, threadpool = asyncio.run(runner(args))
+    report = _summary(args, results, elapsed, threadpool)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
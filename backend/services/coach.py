@@ -1,9 +1,62 @@
-"""Coach service: build RAG snippet and generate Socratic feedback via LLM."""
+"""Coach service: build RAG snippet and generate Socratic feedback via LLM.
 
+Replies are cached by a hash of the normalized prompt (system prompt with RAG snippet,
+design text, trimmed conversation), so repeated starter designs skip the LLM call.
+First-turn replies can also be served from an optional semantic cache when the design
+text embeds close to one already answered for the same topic and failure-fact hints. Long sessions are kept
+under a token budget by services.coach_context (recent turns verbatim, older summarized).
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections.abc import AsyncIterator
+
+import numpy as np
 from sqlalchemy.orm import Session
 
+from config import (
+    COACH_CACHE_ENABLED,
+    COACH_CACHE_MAX_ENTRIES,
+    COACH_CACHE_MAX_TEMPERATURE,
+    COACH_CACHE_TTL_S,
+    COACH_SEMANTIC_CACHE_CAPACITY,
+    COACH_SEMANTIC_CACHE_ENABLED,
+    COACH_SEMANTIC_CACHE_MAX_SCOPES,
+    COACH_SEMANTIC_CACHE_THRESHOLD,
+)
+from services import lightrag as lightrag_service
+from services import llm as llm_service
 from services import rag as rag_service
-from services.llm import generate_coach_feedback
+from services.coach_context import CoachContext, build_coach_context
+from services.fact_vectors import fact_vectors
+from services.failure_fact_index import failure_fact_index
+from services.llm_cache import InMemoryLRUCache, ResponseCache, make_cache_key
+from services.llm_provider import FALLBACK_MESSAGES
+from services.metrics import metrics, record_cache_hit, track_stage
+from services.semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+# Process-wide coach reply cache (in-process backend; swap for a shared CacheBackend later).
+coach_cache = ResponseCache(
+    backend=InMemoryLRUCache(max_entries=COACH_CACHE_MAX_ENTRIES),
+    ttl_s=COACH_CACHE_TTL_S,
+    max_temperature=COACH_CACHE_MAX_TEMPERATURE,
+    enabled=COACH_CACHE_ENABLED,
+)
+
+# First-turn semantic cache, scoped per topic and hints (disabled unless COACH_SEMANTIC_CACHE_ENABLED).
+coach_semantic_cache = SemanticCache(
+    threshold=COACH_SEMANTIC_CACHE_THRESHOLD,
+    capacity_per_scope=COACH_SEMANTIC_CACHE_CAPACITY,
+    max_scopes=COACH_SEMANTIC_CACHE_MAX_SCOPES,
+    ttl_s=COACH_CACHE_TTL_S,
+    enabled=COACH_SEMANTIC_CACHE_ENABLED,
+)
+
+metrics.register_stats("coach_cache", coach_cache.stats, "Coach exact-match reply cache.")
+metrics.register_stats("coach_semantic_cache", coach_semantic_cache.stats, "Coach first-turn semantic cache.")
 
 
 def _build_rag_snippet(
@@ -11,6 +64,8 @@ def _build_rag_snippet(
     concept_id: str | None,
     pressure_test: bool,
     limit: int = 2,
+    query: str = "",
+    query_vector: np.ndarray | None = None,
 ) -> str:
     """Build a text snippet of failure-fact hints for the coach prompt.
 
@@ -19,6 +74,8 @@ def _build_rag_snippet(
         concept_id: Optional concept slug (or topic name); used when pressure_test or concept_id set.
         pressure_test: If True, include hints even when concept_id is missing (fallback concept used).
         limit: Max number of failure facts to include.
+        query: Learner text the hints are ranked against (see ranking_query).
+        query_vector: Optional embedding of query for semantic ranking.
 
     Returns:
         Newline-separated lines of hint (Fact: ...), or empty string if none.
@@ -26,7 +83,11 @@ def _build_rag_snippet(
     if not concept_id and not pressure_test:
         return ""
     failures = rag_service.get_failure_facts(
-        db, concept_id=concept_id or "caching-basics", limit=limit
+        db,
+        concept_id=concept_id or "caching-basics",
+        limit=limit,
+        query=query,
+        query_vector=query_vector,
     )
     lines = []
     for e in failures:
@@ -36,7 +97,214 @@ def _build_rag_snippet(
     return "\n".join(lines) if lines else ""
 
 
-def get_coach_feedback(
+def ranking_query(ctx: CoachContext) -> str:
+    """Return the text failure facts are ranked against: design, summary and recent turns."""
+    parts = [ctx.design_text, ctx.summary or ""]
+    parts += [t.get("text", "") for t in ctx.recent_turns]
+    return "\n".join(p for p in parts if p)
+
+
+async def load_rag_snippet(
+    db: Session,
+    topic: str | None,
+    pressure_test: bool,
+    query: str = "",
+) -> str:
+    """Build the failure-fact snippet from the in-memory index, or off the event loop via the DB.
+
+    When fact vectors are enabled, the query is embedded first so hints are ranked by
+    meaning as well as by shared terms.
+    """
+    query_vector = None
+    if fact_vectors.enabled and (topic or pressure_test) and query and failure_fact_index.loaded:
+        with track_stage("fact_query_embedding"):
+            query_vector = await fact_vectors.embed_query(query)
+    with track_stage("failure_facts"):
+        if failure_fact_index.loaded:
+            return _build_rag_snippet(
+                db,
+                concept_id=topic,
+                pressure_test=pressure_test,
+                query=query,
+                query_vector=query_vector,
+            )
+        return await asyncio.to_thread(
+            _build_rag_snippet, db, concept_id=topic, pressure_test=pressure_test, query=query
+        )
+
+
+def _coach_cache_key(ctx: CoachContext, rag_snippet: str) -> str:
+    """Return the cache key for a coach call: hash of its normalized prompt and settings."""
+    system, user_content = llm_service.build_coach_prompt(
+        ctx.design_text, ctx.recent_turns, rag_snippet, ctx.summary
+    )
+    return make_cache_key(
+        "coach", system, user_content, llm_service.COACH_MAX_OUTPUT_TOKENS
+    )
+
+
+async def _embed_first_turn(
+    design_text: str,
+    first_turn: bool,
+    pressure_test: bool,
+) -> np.ndarray | None:
+    """Embed the design text when the semantic cache applies (enabled, first turn, no pressure test).
+
+    Embedding failures are logged and treated as "not applicable" so the coach still answers.
+    """
+    if not coach_semantic_cache.enabled or pressure_test or not first_turn:
+        return None
+    if not design_text.strip():
+        return None
+    try:
+        vectors = await lightrag_service.embed_texts([design_text], call_site="coach")
+    except Exception:
+        logger.warning("Coach semantic cache: embedding failed", exc_info=True)
+        return None
+    return None if vectors is None else vectors[0]
+
+
+def _semantic_scope(topic: str | None, rag_snippet: str) -> str:
+    """Return the semantic cache scope: the topic plus a hash of the failure-fact hints.
+
+    Hints are re-ranked against the learner's text, so two similar designs on one topic
+    can get different hints; a reply is only reused for the same hints it was written for.
+    """
+    digest = hashlib.sha256(rag_snippet.encode("utf-8")).hexdigest()[:16]
+    return f"{topic or ''}:{digest}"
+
+
+def _remember(
+    key: str,
+    feedback: str,
+    scope: str,
+    embedding: np.ndarray | None,
+) -> None:
+    """Store a fresh reply in the exact cache and, for first turns, the semantic cache."""
+    if not feedback or feedback in FALLBACK_MESSAGES:
+        return
+    coach_cache.put(key, feedback, temperature=llm_service.COACH_TEMPERATURE)
+    if embedding is not None:
+        coach_semantic_cache.add(scope, embedding, feedback)
+
+
+async def _cached_feedback(
+    key: str,
+    design_text: str,
+    scope: str,
+    pressure_test: bool,
+    first_turn: bool,
+) -> tuple[str | None, np.ndarray | None]:
+    """Look up the exact cache, then the semantic cache.
+
+    Returns:
+        (cached reply or None, design-text embedding to store on a miss or None).
+    """
+    cached = coach_cache.get(key, temperature=llm_service.COACH_TEMPERATURE)
+    if cached is not None:
+        record_cache_hit("coach", "exact")
+        return cached, None
+    embedding = await _embed_first_turn(design_text, first_turn, pressure_test)
+    if embedding is not None:
+        cached = coach_semantic_cache.lookup(scope, embedding)
+        if cached is not None:
+            record_cache_hit("coach", "semantic")
+            return cached, None
+    return None, embedding
+
+
+async def _stream_and_cache(
+    chunks: AsyncIterator[str],
+    key: str,
+    scope: str,
+    embedding: np.ndarray | None,
+) -> AsyncIterator[str]:
+    """Pass chunks through and cache the full reply once the stream completes."""
+    parts: list[str] = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    # Stripped like generate_text's reply, so both paths cache the same string for a key.
+    _remember(key, "".join(parts).strip(), scope, embedding)
+
+
+async def _yield_cached(feedback: str) -> AsyncIterator[str]:
+    """Yield a cached reply as a single chunk."""
+    yield feedback
+
+
+async def respond(
+    ctx: CoachContext,
+    rag_snippet: str,
+    topic: str | None,
+    pressure_test: bool,
+    first_turn: bool,
+) -> str:
+    """Return coach feedback for a budgeted context, from cache when possible.
+
+    Args:
+        ctx: Budgeted prompt inputs (design, summary, recent turns).
+        rag_snippet: Failure-fact hints for the system prompt.
+        topic: Concept id or topic name (semantic cache scope, with the hints).
+        pressure_test: Whether this is a pressure test (never semantically cached).
+        first_turn: True if there is no prior conversation.
+
+    Returns:
+        Coach feedback string.
+    """
+    key = _coach_cache_key(ctx, rag_snippet)
+    scope = _semantic_scope(topic, rag_snippet)
+    cached, embedding = await _cached_feedback(
+        key, ctx.design_text, scope, pressure_test, first_turn
+    )
+    if cached is not None:
+        return cached
+    feedback = await llm_service.generate_coach_feedback(
+        design_text=ctx.design_text,
+        conversation_context=ctx.recent_turns,
+        rag_snippet=rag_snippet,
+        summary=ctx.summary,
+    )
+    _remember(key, feedback, scope, embedding)
+    return feedback
+
+
+async def stream_response(
+    ctx: CoachContext,
+    rag_snippet: str,
+    topic: str | None,
+    pressure_test: bool,
+    first_turn: bool,
+) -> AsyncIterator[str]:
+    """Return a stream of coach feedback for a budgeted context, from cache when possible.
+
+    Args:
+        ctx: Budgeted prompt inputs (design, summary, recent turns).
+        rag_snippet: Failure-fact hints for the system prompt.
+        topic: Concept id or topic name (semantic cache scope, with the hints).
+        pressure_test: Whether this is a pressure test (never semantically cached).
+        first_turn: True if there is no prior conversation.
+
+    Returns:
+        Async iterator of coach feedback text chunks.
+    """
+    key = _coach_cache_key(ctx, rag_snippet)
+    scope = _semantic_scope(topic, rag_snippet)
+    cached, embedding = await _cached_feedback(
+        key, ctx.design_text, scope, pressure_test, first_turn
+    )
+    if cached is not None:
+        return _yield_cached(cached)
+    chunks = llm_service.stream_coach_feedback(
+        design_text=ctx.design_text,
+        conversation_context=ctx.recent_turns,
+        rag_snippet=rag_snippet,
+        summary=ctx.summary,
+    )
+    return _stream_and_cache(chunks, key, scope, embedding)
+
+
+async def get_coach_feedback(
     db: Session,
     design_text: str,
     topic: str | None = None,
@@ -55,11 +323,39 @@ def get_coach_feedback(
     Returns:
         Coach feedback string.
     """
-    rag_snippet = _build_rag_snippet(
-        db, concept_id=topic, pressure_test=pressure_test
+    conversation_context = conversation_context or []
+    ctx = await build_coach_context(design_text, conversation_context)
+    rag_snippet = await load_rag_snippet(db, topic, pressure_test, ranking_query(ctx))
+    return await respond(
+        ctx, rag_snippet, topic, pressure_test, first_turn=not conversation_context
     )
-    return generate_coach_feedback(
-        design_text=design_text,
-        conversation_context=conversation_context or [],
-        rag_snippet=rag_snippet,
+
+
+async def stream_coach_feedback(
+    db: Session,
+    design_text: str,
+    topic: str | None = None,
+    pressure_test: bool = False,
+    conversation_context: list[dict] | None = None,
+) -> AsyncIterator[str]:
+    """Stream Socratic coach feedback for a learner design.
+
+    The failure-fact lookup runs before this returns, so the DB session is no longer
+    needed once the caller starts consuming the stream; only the LLM call is lazy.
+
+    Args:
+        db: SQLAlchemy session (for failure-fact lookup).
+        design_text: The learner's design description.
+        topic: Optional concept id or topic name for RAG hints.
+        pressure_test: If True, include failure-fact hints even when topic is missing.
+        conversation_context: List of {role, text} turns for recent conversation.
+
+    Returns:
+        Async iterator of coach feedback text chunks.
+    """
+    conversation_context = conversation_context or []
+    ctx = await build_coach_context(design_text, conversation_context)
+    rag_snippet = await load_rag_snippet(db, topic, pressure_test, ranking_query(ctx))
+    return await stream_response(
+        ctx, rag_snippet, topic, pressure_test, first_turn=not conversation_context
     )
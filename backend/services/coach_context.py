@@ -0,0 +1,190 @@
+"""Token-budgeted coach context: recent turns verbatim, older turns as a rolling summary.
+
+Keeps the coach prompt under COACH_CONTEXT_TOKEN_BUDGET however long the session gets.
+Summaries are cached by a hash of the turns they cover, so each request folds only the
+turns that newly aged out of the verbatim window into the previous summary (one LLM
+call per new turn at most).
+"""
+
+from dataclasses import dataclass, field
+
+from config import (
+    COACH_CONTEXT_RECENT_TURNS,
+    COACH_CONTEXT_TOKEN_BUDGET,
+    COACH_DESIGN_MAX_TOKENS,
+    COACH_SUMMARY_MAX_TOKENS,
+)
+from services import llm as llm_service
+from services.llm import CHARS_PER_TOKEN, estimate_tokens
+from services.llm_cache import InMemoryLRUCache, ResponseCache, make_cache_key
+from services.llm_provider import FALLBACK_MESSAGES, get_async_llm_provider
+from services.metrics import metrics, record_cache_hit
+
+SUMMARY_TEMPERATURE = 0.2
+
+SUMMARY_SYSTEM = """You maintain a running summary of a conversation between a learner and a System Design Coach.
+
+Given the summary so far and the newest turns, return an updated summary in at most {max_words} words.
+Keep the learner's design decisions, stated assumptions, open questions, and tradeoffs already discussed.
+Drop pleasantries and repetition. Output only the summary text."""
+
+# Summaries keyed by the turns they cover; shared by all sessions in the process.
+_summary_cache = ResponseCache(backend=InMemoryLRUCache(max_entries=4096), ttl_s=6 * 3600)
+metrics.register_stats("coach_summary_cache", _summary_cache.stats, "Coach rolling-summary cache.")
+
+
+@dataclass
+class CoachContext:
+    """Prompt inputs for one coach call after budgeting."""
+
+    design_text: str
+    summary: str = ""
+    recent_turns: list[dict] = field(default_factory=list)
+
+
+def _trim_turn(turn: dict) -> dict:
+    """Return the turn as {role, text} with text cut to the per-turn prompt limit."""
+    return {
+        "role": turn.get("role", "user"),
+        "text": (turn.get("text") or "")[: llm_service.COACH_TURN_MAX_CHARS],
+    }
+
+
+def _turn_tokens(turn: dict) -> int:
+    """Estimate the prompt tokens used by one turn line."""
+    return estimate_tokens(f"{turn['role']}: {turn['text']}") + 1
+
+
+def truncate_design(design_text: str, max_tokens: int = COACH_DESIGN_MAX_TOKENS) -> str:
+    """Cut design text to max_tokens, keeping its beginning and end."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(design_text) <= max_chars:
+        return design_text
+    marker = "\n[...design truncated...]\n"
+    keep = max(0, max_chars - len(marker))
+    head = keep * 2 // 3
+    return design_text[:head] + marker + design_text[len(design_text) - (keep - head):]
+
+
+def _summary_key(turns: list[dict]) -> str:
+    """Return the cache key for a summary covering exactly these turns."""
+    return make_cache_key("coach-summary", *(f"{t['role']}: {t['text']}" for t in turns))
+
+
+def _format_turns(turns: list[dict]) -> str:
+    """Render turns as role: text lines."""
+    return "\n".join(f"{t['role']}: {t['text']}" for t in turns)
+
+
+async def fold_summary(previous: str, new_turns: list[dict]) -> str:
+    """Fold new_turns into the previous summary with one LLM call.
+
+    Args:
+        previous: Summary of earlier turns (may be empty).
+        new_turns: Trimmed turns to add to the summary, oldest first.
+
+    Returns:
+        Updated summary, or previous unchanged if the LLM is unavailable.
+    """
+    if not new_turns:
+        return previous
+    max_words = COACH_SUMMARY_MAX_TOKENS * 3 // 4
+    user_content = (
+        f"Summary so far:\n{previous or '(none)'}\n\n"
+        f"Newest turns:\n{_format_turns(new_turns)}"
+    )
+    summary = await get_async_llm_provider("coach").generate_text(
+        system_instruction=SUMMARY_SYSTEM.format(max_words=max_words),
+        user_content=user_content,
+        max_output_tokens=COACH_SUMMARY_MAX_TOKENS,
+        temperature=SUMMARY_TEMPERATURE,
+    )
+    if not summary or summary in FALLBACK_MESSAGES:
+        return previous
+    return summary
+
+
+async def summarize_turns(older_turns: list[dict]) -> str:
+    """Return a summary of older_turns, extending the longest cached prefix summary.
+
+    Args:
+        older_turns: Trimmed turns that no longer fit in the verbatim window.
+
+    Returns:
+        Summary text, or empty string if there is nothing to summarize or the LLM is unavailable.
+    """
+    if not older_turns:
+        return ""
+    key = _summary_key(older_turns)
+    cached = _summary_cache.get(key, temperature=SUMMARY_TEMPERATURE)
+    if cached is not None:
+        record_cache_hit("coach", "summary")
+        return cached
+    previous, covered = "", 0
+    for j in range(len(older_turns) - 1, 0, -1):
+        hit = _summary_cache.get(_summary_key(older_turns[:j]), temperature=SUMMARY_TEMPERATURE)
+        if hit is not None:
+            previous, covered = hit, j
+            break
+    summary = await fold_summary(previous, older_turns[covered:])
+    if summary and summary != previous:
+        _summary_cache.put(key, summary, temperature=SUMMARY_TEMPERATURE)
+    return summary
+
+
+def split_turns(
+    design_text: str,
+    conversation_context: list[dict],
+    token_budget: int = COACH_CONTEXT_TOKEN_BUDGET,
+    recent_turns: int = COACH_CONTEXT_RECENT_TURNS,
+) -> tuple[list[dict], list[dict]]:
+    """Split trimmed turns into (older, recent) so recent fits the budget verbatim.
+
+    At most recent_turns turns are kept verbatim, fewer if the design text plus
+    verbatim turns plus a full-size summary would exceed token_budget. The newest
+    turn is always kept.
+
+    Returns:
+        Tuple of (older turns to summarize, recent turns to send verbatim).
+    """
+    turns = [_trim_turn(t) for t in conversation_context]
+    recent = turns[-recent_turns:] if recent_turns > 0 else []
+    kept = _fit_turns(recent, estimate_tokens(design_text), token_budget)
+    if len(kept) < len(turns):
+        # Something will be summarized, so leave room for the summary too.
+        kept = _fit_turns(
+            recent, estimate_tokens(design_text) + COACH_SUMMARY_MAX_TOKENS, token_budget
+        )
+    return turns[: len(turns) - len(kept)], kept
+
+
+def _fit_turns(turns: list[dict], used: int, token_budget: int) -> list[dict]:
+    """Return the longest suffix of turns (at least one) that fits in token_budget after used."""
+    kept: list[dict] = []
+    for turn in reversed(turns):
+        cost = _turn_tokens(turn)
+        if kept and used + cost > token_budget:
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+async def build_coach_context(
+    design_text: str,
+    conversation_context: list[dict],
+) -> CoachContext:
+    """Budget the coach prompt inputs: truncated design, rolling summary, recent turns.
+
+    Args:
+        design_text: The learner's design description.
+        conversation_context: Full list of {role, text} turns, oldest first.
+
+    Returns:
+        CoachContext whose parts fit COACH_CONTEXT_TOKEN_BUDGET (approximately).
+    """
+    design = truncate_design(design_text)
+    older, recent = split_turns(design, conversation_context)
+    summary = await summarize_turns(older)
+    return CoachContext(design_text=design, summary=summary, recent_turns=recent)
@@ -0,0 +1,223 @@
+"""Server-side coach sessions: the server keeps design and history per session.
+
+Clients create a session once, then send only each new turn. Sessions live in a
+size-bounded in-process store (LRU) and are evicted after COACH_SESSION_IDLE_TTL_S of
+inactivity. Turns that age out of the verbatim window are folded into the session's
+summary and dropped, so per-session memory stays bounded too. Turns on one session are
+serialized: each holds the session lock from recording the learner's message until the
+coach reply is recorded, so concurrent requests cannot interleave the history.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from config import COACH_SESSION_IDLE_TTL_S, COACH_SESSION_MAX_SESSIONS
+from db import SessionLocal
+from services import coach as coach_service
+from services import llm as llm_service
+from services.coach_context import CoachContext, fold_summary, split_turns, truncate_design
+from services.metrics import metrics
+
+
+@dataclass
+class CoachSession:
+    """One learner's coach conversation held on the server."""
+
+    id: str
+    design_text: str
+    topic: str | None = None
+    pressure_test: bool = False
+    # Turns not yet folded into summary, oldest first.
+    turns: list[dict] = field(default_factory=list)
+    summary: str = ""
+    turn_count: int = 0
+    last_active: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+
+class CoachSessionStore:
+    """Bounded in-process session store with LRU and idle-time eviction."""
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl_s: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self.evicted = 0
+        self._sessions: OrderedDict[str, CoachSession] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        """Drop idle sessions, then least recently used ones beyond max_sessions (lock held)."""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_active < self.idle_ttl_s and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def create(self, design_text: str, topic: str | None, pressure_test: bool) -> CoachSession:
+        """Create and store a new session."""
+        session = CoachSession(
+            id=str(uuid.uuid4()),
+            design_text=design_text,
+            topic=topic,
+            pressure_test=pressure_test,
+        )
+        with self._lock:
+            self._sessions[session.id] = session
+            self._evict(session.last_active)
+        return session
+
+    def get(self, session_id: str) -> CoachSession | None:
+        """Return the session and mark it active, or None if unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.last_active = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session; returns True if it existed."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict[str, Any]:
+        """Return active session count and eviction counter."""
+        with self._lock:
+            self._evict(time.monotonic())
+            return {"active": len(self._sessions), "evicted": self.evicted}
+
+
+# Process-wide session store (per worker; clients should stick to one instance or recreate).
+coach_sessions = CoachSessionStore(
+    max_sessions=COACH_SESSION_MAX_SESSIONS,
+    idle_ttl_s=COACH_SESSION_IDLE_TTL_S,
+)
+metrics.register_stats("coach_sessions", coach_sessions.stats, "Server-side coach sessions.")
+
+
+async def _prepare_turn(
+    db: Session,
+    session: CoachSession,
+    text: str,
+    design_text: str | None,
+) -> tuple[CoachContext, str, bool]:
+    """Record the learner turn and build the budgeted context (caller holds the session lock).
+
+    Returns:
+        Tuple of (context for the coach call, failure-fact hints for this turn, whether
+        this is the first turn).
+    """
+    if design_text is not None:
+        session.design_text = design_text
+    first_turn = session.turn_count == 0 and not text
+    if text:
+        session.turns.append(
+            {"role": "user", "text": text[: llm_service.COACH_TURN_MAX_CHARS]}
+        )
+    design = truncate_design(session.design_text)
+    older, recent = split_turns(design, session.turns)
+    if older:
+        session.summary = await fold_summary(session.summary, older)
+        session.turns = recent
+    ctx = CoachContext(design_text=design, summary=session.summary, recent_turns=list(recent))
+    # Re-ranked every turn so hints follow the conversation.
+    rag_snippet = await coach_service.load_rag_snippet(
+        db, session.topic, session.pressure_test, coach_service.ranking_query(ctx)
+    )
+    return ctx, rag_snippet or "", first_turn
+
+
+def _record_reply(session: CoachSession, feedback: str) -> None:
+    """Append the coach reply to the session history."""
+    session.turns.append(
+        {"role": "coach", "text": feedback[: llm_service.COACH_TURN_MAX_CHARS]}
+    )
+    session.turn_count += 1
+
+
+async def add_turn(
+    db: Session,
+    session: CoachSession,
+    text: str = "",
+    design_text: str | None = None,
+) -> str:
+    """Add a learner turn to the session and return the coach's reply.
+
+    Args:
+        db: SQLAlchemy session (failure-fact lookup, re-ranked every turn).
+        session: The coach session.
+        text: The learner's new message (may be empty to just review the design).
+        design_text: Optional replacement design text.
+
+    Returns:
+        Coach feedback string.
+    """
+    async with session.lock:
+        ctx, rag_snippet, first_turn = await _prepare_turn(db, session, text, design_text)
+        feedback = await coach_service.respond(
+            ctx, rag_snippet, session.topic, session.pressure_test, first_turn
+        )
+        _record_reply(session, feedback)
+    return feedback
+
+
+async def _stream_turn(
+    session: CoachSession,
+    text: str,
+    design_text: str | None,
+) -> AsyncIterator[str]:
+    """Run one streamed turn under the session lock, recording the full reply when the stream ends.
+
+    The lock is taken inside the generator, so a stream that is never iterated (client
+    gone before the response started) does not leave the session locked. The generator
+    runs after the request's DB session is closed, so the failure-fact lookup opens its
+    own session and closes it before the coach reply streams.
+    """
+    async with session.lock:
+        db = SessionLocal()
+        try:
+            ctx, rag_snippet, first_turn = await _prepare_turn(db, session, text, design_text)
+        finally:
+            db.close()
+        chunks = await coach_service.stream_response(
+            ctx, rag_snippet, session.topic, session.pressure_test, first_turn
+        )
+        parts: list[str] = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        _record_reply(session, "".join(parts))
+
+
+async def stream_turn(
+    session: CoachSession,
+    text: str = "",
+    design_text: str | None = None,
+) -> AsyncIterator[str]:
+    """Add a learner turn to the session and stream the coach's reply.
+
+    Unlike add_turn this takes no DB session: the turn runs while the response streams,
+    after the request's session is closed (see _stream_turn).
+
+    Args:
+        session: The coach session.
+        text: The learner's new message (may be empty to just review the design).
+        design_text: Optional replacement design text.
+
+    Returns:
+        Async iterator of coach feedback text chunks. The turn (including context
+        preparation) runs as it is iterated, after any turn already running on the session.
+    """
+    return _stream_turn(session, text, design_text)
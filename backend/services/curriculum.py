@@ -1,10 +1,32 @@
 """Curriculum generation: LightRAG context + Gemini structured output.
 
 Produces concepts, quizzes, and failure_facts. Uses LLM provider (default: Gemini).
+Large contexts are processed map-reduce style: the context is split into token-sized
+chunks, each chunk is extracted concurrently, and the partial results are merged and
+deduplicated into one payload (CURRICULUM_MAP_REDUCE_ENABLED). stream_curriculum parses
+the streamed JSON incrementally and yields each item as soon as it is complete.
 """
 
-from config import GEMINI_API_KEY
-from services.llm_provider import get_llm_provider
+import asyncio
+import copy
+import json
+import logging
+import re
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
+from config import (
+    CURRICULUM_CHUNK_TOKENS,
+    CURRICULUM_MAP_CONCURRENCY,
+    CURRICULUM_MAP_REDUCE_ENABLED,
+    CURRICULUM_MAX_CHUNKS,
+)
+from services.json_stream import ArrayItemParser
+from services.llm import CHARS_PER_TOKEN, estimate_tokens
+from services.llm_provider import get_async_llm_provider, llm_configured
+
+logger = logging.getLogger(__name__)
 
 CURRICULUM_SYSTEM = """You are a curriculum designer for system design learning.
 
@@ -15,10 +37,263 @@ Given retrieved context from a knowledge base, output a JSON object with exactly
 
 Output only valid JSON, no markdown or explanation. Use the context to create 1-3 concepts, 0-1 quiz per concept, and 0-2 failure_facts per concept where relevant."""
 
+# Context sent in single-call mode (map-reduce disabled) is cut to this many characters.
+SINGLE_CALL_MAX_CHARS = 30000
+
+
+def _user_prompt(context: str, topic: str | None, part: str = "") -> str:
+    """Build the curriculum prompt for context (optionally labelled as one part of many)."""
+    user = f"Topic focus: {topic or 'general system design'}\n\n"
+    if part:
+        user += f"This is {part} of the retrieved context; cover only what it contains.\n\n"
+    return user + f"Retrieved context:\n{context}"
+
+
+async def _generate_one(context: str, topic: str | None, part: str = "") -> dict[str, Any]:
+    """Run one curriculum generation call over context."""
+    return await get_async_llm_provider("curriculum").generate_json(
+        system_instruction=CURRICULUM_SYSTEM,
+        user_content=_user_prompt(context, topic, part),
+        max_output_tokens=4096,
+        temperature=0.3,
+    )
+
+
+def split_context(context: str, chunk_tokens: int = CURRICULUM_CHUNK_TOKENS) -> list[str]:
+    """Split context into chunks of about chunk_tokens, on paragraph boundaries where possible.
+
+    Args:
+        context: Retrieved knowledge-base context.
+        chunk_tokens: Target chunk size in (estimated) tokens.
+
+    Returns:
+        Non-empty chunks in document order.
+    """
+    max_chars = max(1, chunk_tokens) * CHARS_PER_TOKEN
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for para in re.split(r"\n\s*\n", context):
+        para = para.strip()
+        if not para:
+            continue
+        # Hard-split paragraphs that alone exceed the chunk size.
+        pieces = [para[i : i + max_chars] for i in range(0, len(para), max_chars)]
+        for piece in pieces:
+            if current and size + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _slug(text: str) -> str:
+    """Return a lowercase hyphenated slug used to match duplicate ids and titles."""
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-")
+
+
+def _merge_list(*lists: list | None) -> list:
+    """Concatenate lists, dropping duplicates while keeping first-seen order."""
+    merged: list = []
+    for items in lists:
+        for item in items or []:
+            if item not in merged:
+                merged.append(item)
+    return merged
+
+
+# Payload keys and the curriculum_drafts type each item is saved as.
+DRAFT_TYPES = {"concepts": "concept", "quizzes": "quiz", "failure_facts": "failure"}
+
+
+class CurriculumMerger:
+    """Incremental merge of curriculum items, deduplicating overlapping items as they arrive.
+
+    Concepts are matched by id or title slug (the longer body wins; tags and prerequisites
+    are unioned). Quizzes are kept one per concept with questions merged by text. Failure
+    facts are matched by fact text. Quiz and fact ids are made unique when first added, so
+    an item keeps its id from the first upsert to the final result.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._concepts: dict[str, dict[str, Any]] = {}
+        self._alias: dict[str, str] = {}
+        self._quizzes: dict[str, dict[str, Any]] = {}
+        self._facts: dict[str, dict[str, Any]] = {}
+        self._ids: set[str] = set()
+
+    def resolve(self, concept_id: str | None) -> str | None:
+        """Map a concept id or title to the surviving concept id (unknown ids pass through)."""
+        if not concept_id:
+            return concept_id
+        return self._alias.get(_slug(concept_id), concept_id)
+
+    def _unique_id(self, item: dict[str, Any]) -> str:
+        """Return item's id, suffixed if already taken (chunks may reuse ids like quiz-1)."""
+        base = item.get("id") or str(uuid.uuid4())
+        item_id, n = base, 1
+        while item_id in self._ids:
+            n += 1
+            item_id = f"{base}-{n}"
+        self._ids.add(item_id)
+        return item_id
+
+    def add(self, key: str, item: Any) -> tuple[str, dict[str, Any]] | None:
+        """Merge one item.
+
+        Args:
+            key: Payload key the item belongs to (concepts, quizzes, failure_facts).
+            item: The item object.
+
+        Returns:
+            (draft type, merged item) when the item was added or changed an existing one,
+            or None for duplicates and unusable items.
+        """
+        if key not in DRAFT_TYPES or not isinstance(item, dict):
+            return None
+        self.count += 1
+        if key == "concepts":
+            merged = self._add_concept(item)
+        elif key == "quizzes":
+            merged = self._add_quiz(item)
+        else:
+            merged = self._add_fact(item)
+        return (DRAFT_TYPES[key], merged) if merged is not None else None
+
+    def _add_concept(self, c: dict[str, Any]) -> dict[str, Any]:
+        keys = {k for k in (_slug(c.get("id", "")), _slug(c.get("title", ""))) if k}
+        canonical = next((self._alias[k] for k in keys if k in self._alias), None)
+        if canonical is None:
+            canonical = c.get("id") or _slug(c.get("title", "")) or f"concept-{len(self._concepts) + 1}"
+            kept = self._concepts[canonical] = {**c, "id": canonical}
+            kept["sort_order"] = len(self._concepts)
+        else:
+            kept = self._concepts[canonical]
+            tags = _merge_list(kept.get("tags"), c.get("tags"))
+            prerequisites = _merge_list(
+                kept.get("prerequisite_concept_ids"), c.get("prerequisite_concept_ids")
+            )
+            if len(c.get("body") or "") > len(kept.get("body") or ""):
+                kept.update({k: v for k, v in c.items() if k not in ("id", "sort_order")})
+            kept["tags"] = tags
+            kept["prerequisite_concept_ids"] = prerequisites
+        for k in keys | {canonical}:
+            self._alias.setdefault(_slug(k), canonical)
+        return kept
+
+    def _add_quiz(self, q: dict[str, Any]) -> dict[str, Any] | None:
+        concept_id = self.resolve(q.get("conceptId") or q.get("concept_id")) or ""
+        kept = self._quizzes.get(concept_id)
+        if kept is None:
+            kept = self._quizzes[concept_id] = {**q, "conceptId": concept_id}
+            kept["id"] = self._unique_id(q)
+            return kept
+        seen = {_slug(x.get("text", "")) for x in kept.get("questions") or [] if isinstance(x, dict)}
+        added = False
+        for question in q.get("questions") or []:
+            if isinstance(question, dict) and _slug(question.get("text", "")) not in seen:
+                kept.setdefault("questions", []).append(question)
+                seen.add(_slug(question.get("text", "")))
+                added = True
+        return kept if added else None
+
+    def _add_fact(self, f: dict[str, Any]) -> dict[str, Any] | None:
+        key = _slug(f.get("fact", "")) or _slug(f.get("id", ""))
+        if not key or key in self._facts:
+            return None
+        kept = self._facts[key] = {**f, "concept_id": self.resolve(f.get("concept_id"))}
+        kept["id"] = self._unique_id(f)
+        return kept
+
+    def result(self) -> dict[str, Any]:
+        """Return the merged payload, rewriting concept references to the surviving ids.
 
-def generate_curriculum_from_context(context: str, topic: str | None = None) -> dict:
+        References added before the concept they name are resolved here; a quiz that only
+        then turns out to share a concept with another quiz is kept as a separate quiz.
+
+        Returns:
+            Dict with keys concepts, quizzes, failure_facts.
+        """
+        for c in self._concepts.values():
+            c["prerequisite_concept_ids"] = [
+                p
+                for p in _merge_list([self.resolve(p) for p in c.get("prerequisite_concept_ids") or []])
+                if p != c["id"]
+            ]
+        for q in self._quizzes.values():
+            q["conceptId"] = self.resolve(q["conceptId"]) or ""
+        for f in self._facts.values():
+            f["concept_id"] = self.resolve(f.get("concept_id"))
+        return {
+            "concepts": list(self._concepts.values()),
+            "quizzes": list(self._quizzes.values()),
+            "failure_facts": list(self._facts.values()),
+        }
+
+
+def merge_curricula(parts: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge per-chunk curriculum payloads into one, deduplicating overlapping items.
+
+    All concepts are merged before quizzes and facts, so every reference resolves on add.
+
+    Args:
+        parts: Payloads with keys concepts, quizzes, failure_facts.
+
+    Returns:
+        Dict with keys concepts, quizzes, failure_facts.
+    """
+    merger = CurriculumMerger()
+    for key in DRAFT_TYPES:
+        for part in parts:
+            for item in part.get(key) or []:
+                merger.add(key, item)
+    return merger.result()
+
+
+async def _map_reduce(chunks: list[str], topic: str | None) -> dict[str, Any]:
+    """Extract curriculum from each chunk concurrently and merge the results."""
+    semaphore = asyncio.Semaphore(max(1, CURRICULUM_MAP_CONCURRENCY))
+
+    async def extract(i: int, chunk: str) -> dict[str, Any] | None:
+        async with semaphore:
+            try:
+                return await _generate_one(chunk, topic, part=f"part {i + 1} of {len(chunks)}")
+            except Exception as e:
+                logger.warning("Curriculum map step %d/%d failed: %s", i + 1, len(chunks), e)
+                return None
+
+    results = await asyncio.gather(*(extract(i, c) for i, c in enumerate(chunks)))
+    parts = [r for r in results if r]
+    if not parts:
+        raise ValueError("Curriculum generation failed for every context chunk")
+    return merge_curricula(parts)
+
+
+def _plan_chunks(context: str) -> list[str]:
+    """Return the context pieces to extract separately (one piece means a single call)."""
+    if not CURRICULUM_MAP_REDUCE_ENABLED:
+        return [context[:SINGLE_CALL_MAX_CHARS]]
+    if estimate_tokens(context) <= CURRICULUM_CHUNK_TOKENS:
+        return [context]
+    chunks = split_context(context)
+    if len(chunks) > CURRICULUM_MAX_CHUNKS:
+        logger.warning(
+            "Curriculum context has %d chunks; using the first %d", len(chunks), CURRICULUM_MAX_CHUNKS
+        )
+        chunks = chunks[:CURRICULUM_MAX_CHUNKS]
+    return chunks
+
+
+async def generate_curriculum_from_context(context: str, topic: str | None = None) -> dict:
     """Send context to Gemini; return parsed JSON with concepts, quizzes, failure_facts.
 
+    With map-reduce enabled, contexts larger than CURRICULUM_CHUNK_TOKENS are split
+    (up to CURRICULUM_MAX_CHUNKS chunks), extracted concurrently, and merged.
+
     Args:
         context: Retrieved knowledge-base context (e.g. from LightRAG).
         topic: Optional topic focus for the prompt.
@@ -29,12 +304,86 @@ def generate_curriculum_from_context(context: str, topic: str | None = None) ->
     Raises:
         ValueError: If GEMINI_API_KEY is missing or Gemini returns invalid/no text.
     """
-    if not GEMINI_API_KEY:
+    if not llm_configured():
         raise ValueError("GEMINI_API_KEY required for curriculum generation")
-    user = f"Topic focus: {topic or 'general system design'}\n\nRetrieved context:\n{context[:30000]}"
-    return get_llm_provider().generate_json(
-        system_instruction=CURRICULUM_SYSTEM,
-        user_content=user,
-        max_output_tokens=4096,
-        temperature=0.3,
-    )
+    chunks = _plan_chunks(context)
+    if len(chunks) == 1:
+        return await _generate_one(chunks[0], topic)
+    return await _map_reduce(chunks, topic)
+
+
+async def stream_curriculum(
+    context: str, topic: str | None = None
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Generate curriculum with streamed JSON, yielding each item as soon as it is complete.
+
+    Each chunk's response is parsed incrementally (ArrayItemParser), so a concept, quiz or
+    failure fact is merged and yielded when its closing brace arrives. A response cut off
+    at max_output_tokens still yields every item completed before the cut. Items that
+    change after being yielded (merged duplicates, references resolved at the end) are
+    yielded again with the same id.
+
+    Args:
+        context: Retrieved knowledge-base context (e.g. from LightRAG).
+        topic: Optional topic focus for the prompt.
+
+    Yields:
+        (draft type, item) upserts, draft type being concept, quiz or failure.
+
+    Raises:
+        ValueError: If GEMINI_API_KEY is missing or no complete item was generated.
+    """
+    if not llm_configured():
+        raise ValueError("GEMINI_API_KEY required for curriculum generation")
+    chunks = _plan_chunks(context)
+    llm = get_async_llm_provider("curriculum")
+    semaphore = asyncio.Semaphore(max(1, CURRICULUM_MAP_CONCURRENCY))
+    queue: asyncio.Queue[tuple[str, Any] | None] = asyncio.Queue()
+    failures: list[str] = []
+
+    async def extract(i: int, chunk: str) -> None:
+        part = f"part {i + 1} of {len(chunks)}" if len(chunks) > 1 else ""
+        parser = ArrayItemParser()
+        async with semaphore:
+            try:
+                async for text in llm.stream_json(
+                    system_instruction=CURRICULUM_SYSTEM,
+                    user_content=_user_prompt(chunk, topic, part),
+                    max_output_tokens=4096,
+                    temperature=0.3,
+                ):
+                    for item in parser.feed(text):
+                        queue.put_nowait(item)
+            except Exception as e:
+                logger.warning("Curriculum stream %d/%d failed: %s", i + 1, len(chunks), e)
+                failures.append(str(e) or type(e).__name__)
+                return
+        if not parser.complete:
+            logger.warning("Curriculum stream %d/%d ended before the JSON closed", i + 1, len(chunks))
+
+    async def produce() -> None:
+        try:
+            await asyncio.gather(*(extract(i, c) for i, c in enumerate(chunks)))
+        finally:
+            queue.put_nowait(None)
+
+    merger = CurriculumMerger()
+    yielded: dict[tuple[str, str], str] = {}
+    producer = asyncio.create_task(produce())
+    try:
+        while (entry := await queue.get()) is not None:
+            upsert = merger.add(*entry)
+            if upsert:
+                draft_type, item = upsert
+                yielded[(draft_type, item["id"])] = json.dumps(item, sort_keys=True)
+                yield draft_type, copy.deepcopy(item)
+    finally:
+        producer.cancel()
+    if not merger.count:
+        detail = f" ({failures[-1]})" if failures else ""
+        raise ValueError(f"Curriculum generation produced no complete items{detail}")
+    for key, items in merger.result().items():
+        draft_type = DRAFT_TYPES[key]
+        for item in items:
+            if yielded.get((draft_type, item["id"])) != json.dumps(item, sort_keys=True):
+                yield draft_type, copy.deepcopy(item)
@@ -6,7 +6,24 @@ from typing import Any
 from sqlalchemy.orm import Session
 
 from db.models import Concept, FailureFact, Quiz
-from repositories import CurriculumDraftRepository
+from repositories import ContentVersionRepository, CurriculumDraftRepository
+from services import failure_fact_index as failure_fact_index_service
+
+
+def save_draft_item(db: Session, draft_type: str, payload: dict[str, Any]) -> str:
+    """Insert or update one draft (used to save streamed items as they complete).
+
+    Args:
+        db: SQLAlchemy session.
+        draft_type: concept, quiz or failure.
+        payload: Item object; its id is used as the draft id (a UUID if missing).
+
+    Returns:
+        The draft ID.
+    """
+    draft_id = payload.get("id") or str(uuid.uuid4())
+    CurriculumDraftRepository(db).merge_one(draft_id, draft_type, payload)
+    return draft_id
 
 
 def save_drafts(db: Session, data: dict[str, Any]) -> list[str]:
@@ -19,20 +36,10 @@ def save_drafts(db: Session, data: dict[str, Any]) -> list[str]:
     Returns:
         List of draft IDs saved.
     """
-    repo = CurriculumDraftRepository(db)
     draft_ids: list[str] = []
-    for c in data.get("concepts") or []:
-        cid = c.get("id") or str(uuid.uuid4())
-        repo.merge_one(cid, "concept", c)
-        draft_ids.append(cid)
-    for q in data.get("quizzes") or []:
-        qid = q.get("id") or str(uuid.uuid4())
-        repo.merge_one(qid, "quiz", q)
-        draft_ids.append(qid)
-    for f in data.get("failure_facts") or []:
-        fid = f.get("id") or str(uuid.uuid4())
-        repo.merge_one(fid, "failure", f)
-        draft_ids.append(fid)
+    for key, draft_type in (("concepts", "concept"), ("quizzes", "quiz"), ("failure_facts", "failure")):
+        for item in data.get(key) or []:
+            draft_ids.append(save_draft_item(db, draft_type, item))
     return draft_ids
 
 
@@ -70,6 +77,10 @@ def publish_drafts(db: Session, draft_ids: list[str]) -> list[str]:
     """
     repo = CurriculumDraftRepository(db)
     drafts = repo.get_by_ids(draft_ids)
+    publishes_facts = any(d.type == "failure" for d in drafts)
+    if publishes_facts:
+        # Committed with the facts; workers reload their failure fact index on the new version.
+        ContentVersionRepository(db).bump(failure_fact_index_service.VERSION_NAME)
     for d in drafts:
         p = d.payload or {}
         if d.type == "concept":
@@ -107,4 +118,7 @@ def publish_drafts(db: Session, draft_ids: list[str]) -> list[str]:
                 )
             )
     db.commit()
+    index = failure_fact_index_service.failure_fact_index
+    if publishes_facts and index.enabled:
+        index.load(db)
     return draft_ids
@@ -0,0 +1,288 @@
+"""Background curriculum generation: persisted jobs run by a bounded in-process worker pool.
+
+POST /admin/curriculum/generate only inserts curriculum_jobs rows and returns their ids.
+Workers (CURRICULUM_JOB_WORKERS per process) claim jobs atomically, run the LightRAG
+retrieval and Gemini generation, and save drafts as items complete. Jobs submitted to
+this process are handed to its workers directly; idle workers also poll the table every
+CURRICULUM_JOB_POLL_S for jobs queued by other (possibly dead or scaled-in) instances.
+Running jobs refresh a heartbeat while they run, and a periodic sweep requeues jobs whose
+heartbeat is older than CURRICULUM_JOB_STALE_S, or fails them once they have been claimed
+CURRICULUM_JOB_MAX_ATTEMPTS times.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from config import (
+    CURRICULUM_JOB_MAX_ATTEMPTS,
+    CURRICULUM_JOB_POLL_S,
+    CURRICULUM_JOB_STALE_S,
+    CURRICULUM_JOB_WORKERS,
+    CURRICULUM_STREAMING_ENABLED,
+)
+from db import SessionLocal
+from db.models import CurriculumJob
+from repositories import CurriculumJobRepository
+from services import curriculum as curriculum_service
+from services import curriculum_draft as curriculum_draft_service
+from services import lightrag as lightrag_service
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOPIC = "system design fundamentals"
+
+# Approximate completion per stage, for progress bars.
+STAGE_PROGRESS = {
+    "queued": 0.0,
+    "retrieving": 0.1,
+    "generating": 0.3,
+    "saving": 0.9,
+    "done": 1.0,
+}
+
+metrics.counter("curriculum_jobs_total", "Curriculum jobs finished by status.")
+metrics.histogram("curriculum_job_duration_seconds", "Curriculum job run time (claim to finish).")
+
+
+def job_to_dict(job: CurriculumJob) -> dict[str, Any]:
+    """Serialize a job row for the admin API."""
+    return {
+        "id": job.id,
+        "topic": job.topic,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": STAGE_PROGRESS.get(job.stage, 0.0),
+        "error": job.error,
+        "draft_ids": job.draft_ids or [],
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def get_job(db: Session, job_id: str) -> dict[str, Any] | None:
+    """Return one job as a dict, or None if unknown."""
+    job = CurriculumJobRepository(db).get(job_id)
+    return job_to_dict(job) if job else None
+
+
+def list_jobs(db: Session, status: str | None = None, limit: int = 100) -> list[dict[str, Any]]:
+    """Return the newest jobs as dicts, optionally filtered by status."""
+    return [job_to_dict(j) for j in CurriculumJobRepository(db).list_recent(status, limit)]
+
+
+def _with_repo(fn: Callable[[CurriculumJobRepository], Any]) -> Any:
+    """Run fn with a repository on a short-lived session (called from worker threads)."""
+    db = SessionLocal()
+    try:
+        return fn(CurriculumJobRepository(db))
+    finally:
+        db.close()
+
+
+async def generate_drafts_for_topic(
+    db: Session,
+    topic: str,
+    on_stage: Callable[..., Any] | None = None,
+) -> list[str]:
+    """Retrieve context for topic, generate curriculum JSON, and save it as drafts.
+
+    With CURRICULUM_STREAMING_ENABLED, each item is saved as soon as it is complete and
+    on_stage is called again with the draft ids saved so far.
+
+    Args:
+        db: SQLAlchemy session used to save drafts.
+        topic: Topic focus.
+        on_stage: Optional async callback invoked with each stage name (and draft ids).
+
+    Returns:
+        Saved draft ids.
+
+    Raises:
+        ValueError: If LightRAG returns no context or generation fails validation.
+    """
+    if on_stage:
+        await on_stage("retrieving")
+    question = f"What are the key concepts and tradeoffs for {topic}?"
+    context = await lightrag_service.query(question, only_need_context=True)
+    if not context:
+        raise ValueError(
+            "LightRAG returned no context. Ingest content first and ensure GEMINI_API_KEY is set."
+        )
+    if on_stage:
+        await on_stage("generating")
+    if not CURRICULUM_STREAMING_ENABLED:
+        data = await curriculum_service.generate_curriculum_from_context(context, topic=topic)
+        if on_stage:
+            await on_stage("saving")
+        return await asyncio.to_thread(curriculum_draft_service.save_drafts, db, data)
+    draft_ids: list[str] = []
+    async for draft_type, item in curriculum_service.stream_curriculum(context, topic=topic):
+        draft_id = await asyncio.to_thread(curriculum_draft_service.save_draft_item, db, draft_type, item)
+        if draft_id not in draft_ids:
+            draft_ids.append(draft_id)
+            if on_stage:
+                await on_stage("generating", list(draft_ids))
+    return draft_ids
+
+
+class CurriculumJobRunner:
+    """In-process worker pool that runs queued curriculum jobs with bounded concurrency."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        stale_after_s: float = 900.0,
+        poll_s: float = 30.0,
+        max_attempts: int = 3,
+    ):
+        self.workers = max(1, workers)
+        self.stale_after = timedelta(seconds=stale_after_s)
+        self.poll_s = poll_s
+        self.max_attempts = max(1, max_attempts)
+        # Several heartbeats per stale window, so one slow DB write does not requeue a live job.
+        self.heartbeat_s = max(1.0, stale_after_s / 3)
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._running: set[str] = set()
+
+    async def start(self) -> None:
+        """Start the workers and the stale-job sweep, and enqueue jobs left queued by earlier processes."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        try:
+            pending = await asyncio.to_thread(
+                _with_repo, lambda r: r.requeue_stale(self.stale_after, self.max_attempts)
+            )
+        except Exception:
+            logger.warning("Curriculum jobs: could not load pending jobs", exc_info=True)
+            return
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    async def submit(self, db: Session, topics: list[str]) -> list[dict[str, Any]]:
+        """Persist one queued job per topic and hand them to the workers.
+
+        Args:
+            db: SQLAlchemy session.
+            topics: Topics to generate (blank topics use DEFAULT_TOPIC).
+
+        Returns:
+            The created jobs as dicts.
+        """
+        topics = [(t or "").strip() or DEFAULT_TOPIC for t in topics]
+        jobs = await asyncio.to_thread(CurriculumJobRepository(db).create_many, topics)
+        if self._queue is not None:
+            for job in jobs:
+                self._queue.put_nowait(job.id)
+        return [job_to_dict(j) for j in jobs]
+
+    async def _worker(self) -> None:
+        """Run jobs handed over on the queue; when idle for poll_s, claim the oldest queued job from the DB."""
+        assert self._queue is not None
+        while True:
+            try:
+                job_id = await asyncio.wait_for(self._queue.get(), self.poll_s)
+            except TimeoutError:
+                job_id = None
+            else:
+                self._queue.task_done()
+            try:
+                if job_id is not None:
+                    claimed = await asyncio.to_thread(_with_repo, lambda r: r.claim(job_id))
+                else:
+                    job_id = await asyncio.to_thread(_with_repo, lambda r: r.claim_next())
+                    claimed = job_id is not None
+                if claimed:
+                    await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Curriculum job %s: unexpected worker error", job_id)
+
+    async def _sweep(self) -> None:
+        """Every poll_s, requeue (or fail) running jobs whose heartbeat is older than stale_after."""
+        while True:
+            await asyncio.sleep(self.poll_s)
+            try:
+                await asyncio.to_thread(
+                    _with_repo, lambda r: r.requeue_stale(self.stale_after, self.max_attempts)
+                )
+            except Exception:
+                logger.warning("Curriculum jobs: stale-job sweep failed", exc_info=True)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Refresh the running job's heartbeat until cancelled (covers long single LLM calls)."""
+        while True:
+            await asyncio.sleep(self.heartbeat_s)
+            try:
+                await asyncio.to_thread(_with_repo, lambda r: r.heartbeat(job_id))
+            except Exception:
+                logger.warning("Curriculum job %s: heartbeat failed", job_id, exc_info=True)
+
+    async def _run(self, job_id: str) -> None:
+        """Run one claimed job, recording its stages and outcome."""
+        job = await asyncio.to_thread(_with_repo, lambda r: r.get(job_id))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._running.add(job_id)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+        async def on_stage(stage: str, draft_ids: list[str] | None = None) -> None:
+            await asyncio.to_thread(_with_repo, lambda r: r.set_stage(job_id, stage, draft_ids))
+
+        db = SessionLocal()
+        try:
+            draft_ids = await generate_drafts_for_topic(db, job.topic, on_stage=on_stage)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job for the next process instead of marking it failed.
+            await asyncio.shield(asyncio.to_thread(_with_repo, lambda r: r.requeue(job_id)))
+            raise
+        except Exception as e:
+            logger.warning("Curriculum job %s failed: %s", job_id, e)
+            await asyncio.to_thread(_with_repo, lambda r: r.finish(job_id, error=str(e) or type(e).__name__))
+            metrics.inc("curriculum_jobs_total", status="failed")
+        else:
+            await asyncio.to_thread(_with_repo, lambda r: r.finish(job_id, draft_ids=draft_ids))
+            metrics.inc("curriculum_jobs_total", status="succeeded")
+        finally:
+            heartbeat.cancel()
+            db.close()
+            self._running.discard(job_id)
+            metrics.observe("curriculum_job_duration_seconds", loop.time() - started)
+
+    def stats(self) -> dict[str, Any]:
+        """Return worker count, local queue depth and jobs running in this process."""
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+        }
+
+
+# Process-wide runner, started and stopped by the app lifespan.
+job_runner = CurriculumJobRunner(
+    workers=CURRICULUM_JOB_WORKERS,
+    stale_after_s=CURRICULUM_JOB_STALE_S,
+    poll_s=CURRICULUM_JOB_POLL_S,
+    max_attempts=CURRICULUM_JOB_MAX_ATTEMPTS,
+)
+metrics.register_stats("curriculum_job_runner", job_runner.stats, "Curriculum job worker pool.")
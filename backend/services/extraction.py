@@ -0,0 +1,264 @@
+"""Text extraction (PDF pages, HTML) in a process pool, off the API worker's core.
+
+PyMuPDF and trafilatura are CPU-bound and hold the GIL, so they run in a pool of
+EXTRACTION_WORKERS processes (default: one per available core). Large PDFs are split into
+page ranges of EXTRACTION_PDF_PAGES_PER_TASK extracted in parallel and streamed back in
+page order. Each task has a
+timeout (EXTRACTION_TIMEOUT_S) and each worker an address-space cap
+(EXTRACTION_MEMORY_MB), so one pathological document fails its request instead of
+stalling or exhausting the API process.
+
+The timeout is enforced inside the worker (SIGALRM), so it covers only the time the task
+actually runs, not the time it waits for a free worker, and a timed-out task leaves the
+pool and other requests' tasks alone. Tasks are submitted only when a worker is free, and
+a task that outlives its timeout by KILL_GRACE_S (stuck inside C code, where the alarm
+cannot interrupt it) gets the pool's processes killed and the pool recreated. Tasks that
+were broken by another task's crash or kill are retried once on the new pool.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, TypeVar
+
+from config import (
+    EXTRACTION_MEMORY_MB,
+    EXTRACTION_PDF_PAGES_PER_TASK,
+    EXTRACTION_POOL_ENABLED,
+    EXTRACTION_TIMEOUT_S,
+    EXTRACTION_WORKERS,
+)
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+metrics.counter("extraction_tasks_total", "Extraction tasks by kind and outcome (ok, error, timeout, crashed).")
+
+# Extra time past the in-worker timeout before the API process kills the pool.
+KILL_GRACE_S = 10.0
+
+
+class ExtractionTimeout(Exception):
+    """Raised inside a worker when its task exceeds the extraction timeout."""
+
+
+def available_cores() -> int:
+    """Return the number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def _on_alarm(_signum: int, _frame: Any) -> None:
+    raise ExtractionTimeout()
+
+
+def _init_worker(memory_mb: int) -> None:
+    """Install the timeout alarm handler and cap the worker's address space (POSIX only).
+
+    With the cap, a runaway document raises MemoryError instead of exhausting the host.
+    """
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _run_task(timeout_s: float, fn: Callable[..., T], *args: Any) -> T:
+    """Run fn(*args) in the worker, raising ExtractionTimeout after timeout_s (worker task)."""
+    if not hasattr(signal, "setitimer"):
+        return fn(*args)
+    signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def pdf_page_count(path: str) -> int:
+    """Return the number of pages of the PDF at path (worker task)."""
+    from pymupdf import open as pymupdf_open
+
+    with pymupdf_open(path) as doc:
+        return doc.page_count
+
+
+def pdf_pages_text(path: str, start: int, stop: int) -> list[str]:
+    """Return the text of pages [start, stop) of the PDF at path (worker task)."""
+    from pymupdf import open as pymupdf_open
+
+    with pymupdf_open(path) as doc:
+        return [doc[i].get_text() for i in range(start, min(stop, doc.page_count))]
+
+
+def html_text(content: bytes, url: str) -> str:
+    """Return the main text of an HTML page, stripped (worker task)."""
+    import trafilatura
+
+    return (trafilatura.extract(content, url=url) or "").strip()
+
+
+class ExtractionPool:
+    """Process pool running extraction tasks with a per-task timeout, recreated when broken."""
+
+    def __init__(
+        self,
+        workers: int = 0,
+        timeout_s: float = 120.0,
+        memory_mb: int = 0,
+        enabled: bool = True,
+    ):
+        self.workers = workers or available_cores()
+        self.timeout_s = timeout_s
+        self.memory_mb = memory_mb
+        self.enabled = enabled
+        self.restarts = 0
+        self.inflight = 0
+        self.timeouts = 0
+        self._executor: ProcessPoolExecutor | None = None
+        # One slot per worker: a task is submitted only when a worker is free to start it.
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Return the pool (created on first use; spawn, so workers do not inherit app threads)."""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_mb,),
+            )
+        return self._executor
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """Kill executor's processes (a stuck task cannot be cancelled otherwise) and drop it."""
+        if self._executor is not executor:
+            return
+        self._executor = None
+        self.restarts += 1
+        # _processes is private, but killing the workers is the only way to stop a running task.
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, kind: str, fn: Callable[..., T], *args: Any) -> T:
+        """Run fn(*args) in the pool (or a worker thread when the pool is disabled).
+
+        Args:
+            kind: Task label for metrics (e.g. pdf, html).
+            fn: Module-level function (picklable).
+            *args: Picklable arguments.
+
+        Returns:
+            fn's result.
+
+        Raises:
+            ValueError: If the task timed out or its worker crashed (e.g. memory cap).
+        """
+        if not self.enabled:
+            return await asyncio.to_thread(fn, *args)
+        loop = asyncio.get_running_loop()
+        retried = False
+        self.inflight += 1
+        try:
+            async with self._slots:
+                while True:
+                    executor = self._get_executor()
+                    try:
+                        result = await asyncio.wait_for(
+                            loop.run_in_executor(executor, _run_task, self.timeout_s, fn, *args),
+                            self.timeout_s + KILL_GRACE_S,
+                        )
+                    except ExtractionTimeout:
+                        self.timeouts += 1
+                        metrics.inc("extraction_tasks_total", kind=kind, outcome="timeout")
+                        logger.warning("Extraction %s timed out after %.0fs", kind, self.timeout_s)
+                        raise ValueError(f"Extraction timed out after {self.timeout_s:.0f}s") from None
+                    except TimeoutError:
+                        self.timeouts += 1
+                        metrics.inc("extraction_tasks_total", kind=kind, outcome="timeout")
+                        logger.warning(
+                            "Extraction %s ignored its %.0fs timeout; restarting pool", kind, self.timeout_s
+                        )
+                        self._restart(executor)
+                        raise ValueError(f"Extraction timed out after {self.timeout_s:.0f}s") from None
+                    except BrokenProcessPool:
+                        self._restart(executor)
+                        if not retried:
+                            retried = True
+                            continue
+                        metrics.inc("extraction_tasks_total", kind=kind, outcome="crashed")
+                        raise ValueError("Extraction worker crashed (document too large or malformed)") from None
+                    except Exception:
+                        metrics.inc("extraction_tasks_total", kind=kind, outcome="error")
+                        raise
+                    metrics.inc("extraction_tasks_total", kind=kind, outcome="ok")
+                    return result
+        finally:
+            self.inflight -= 1
+
+    async def iter_pdf_pages(self, path: str) -> AsyncIterator[list[str]]:
+        """Yield the page texts of the PDF at path, one page range at a time, in page order.
+
+        At most `workers` ranges are extracted ahead of the consumer, so memory stays
+        bounded by a few ranges of text however long the document is.
+        """
+        pages = await self.run("pdf", pdf_page_count, path)
+        step = max(1, EXTRACTION_PDF_PAGES_PER_TASK)
+        pending: deque[asyncio.Future[list[str]]] = deque()
+        try:
+            for start in range(0, pages, step):
+                pending.append(
+                    asyncio.ensure_future(self.run("pdf", pdf_pages_text, path, start, start + step))
+                )
+                if len(pending) >= self.workers:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def html_text(self, content: bytes, url: str) -> str:
+        """Return the main text of a fetched HTML page."""
+        return await self.run("html", html_text, content, url)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (app shutdown)."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Return pool size, tasks in flight, timeout and restart counts."""
+        return {
+            "workers": self.workers,
+            "inflight": self.inflight,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+
+# Process-wide pool, shut down by the app lifespan.
+extraction_pool = ExtractionPool(
+    workers=EXTRACTION_WORKERS,
+    timeout_s=EXTRACTION_TIMEOUT_S,
+    memory_mb=EXTRACTION_MEMORY_MB,
+    enabled=EXTRACTION_POOL_ENABLED,
+)
+metrics.register_stats("extraction_pool", extraction_pool.stats, "PDF/HTML extraction process pool.")
@@ -0,0 +1,124 @@
+"""BM25 ranking of failure facts against the learner's design and conversation.
+
+rank() orders candidates by BM25 alone or fused with embedding similarity
+(services.fact_vectors).
+
+Facts are indexed over three fields (fact text, keywords, tags); keyword and tag matches
+weigh more than words in the fact sentence. The inverted index stores each posting's
+final BM25 weight, so scoring a query is one dict lookup and one vectorized add per
+query term. The index is built by FailureFactIndex whenever it (re)loads facts.
+"""
+
+import math
+import re
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Common English and prompt words that carry no signal for matching hints.
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i if in into is it its "
+    "me my no not of on or our so than that the their then there these they this to us was "
+    "we what when where which while who why will with would you your".split()
+)
+
+# Term-frequency multiplier per field (BM25F-style field boosts).
+FIELD_WEIGHTS = {"fact": 1.0, "keywords": 2.0, "tags": 1.5}
+
+# Reciprocal rank fusion constant (dampens the weight of top ranks).
+RRF_K = 60
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split it into alphanumeric terms, dropping stopwords and 1-char terms."""
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def keyword_terms(text: str) -> list[str]:
+    """Return the terms and adjacent term pairs of text, for exact tag/keyword matching."""
+    terms = tokenize(text)
+    pairs = [f"{a} {b}" for a, b in zip(terms, terms[1:])]
+    return list(dict.fromkeys(terms + pairs))
+
+
+def _field_text(value: Any) -> str:
+    """Return a field value (string or list of strings) as one string."""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+class BM25Index:
+    """Inverted index over facts with precomputed BM25 posting weights (NumPy arrays)."""
+
+    def __init__(self, docs: Sequence[dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+        """Index docs (dicts with fact, keywords, tags); doc i is referred to by its position."""
+        self.size = len(docs)
+        term_freqs: list[Counter[str]] = []
+        for doc in docs:
+            tf: Counter[str] = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(_field_text(doc.get(field))):
+                    tf[term] += weight
+            term_freqs.append(tf)
+        lengths = [sum(tf.values()) for tf in term_freqs]
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+        doc_freq: Counter[str] = Counter(term for tf in term_freqs for term in tf)
+        postings: dict[str, tuple[list[int], list[float]]] = {}
+        for i, tf in enumerate(term_freqs):
+            norm = k1 * (1 - b + b * lengths[i] / avg_len) if avg_len else k1
+            for term, freq in tf.items():
+                idf = math.log(1 + (self.size - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+                docs_, weights = postings.setdefault(term, ([], []))
+                docs_.append(i)
+                weights.append(idf * freq * (k1 + 1) / (freq + norm))
+        # term -> (doc positions, weights); each doc appears at most once per term.
+        self.postings: dict[str, tuple[np.ndarray, np.ndarray]] = {
+            term: (np.asarray(d, dtype=np.int32), np.asarray(w, dtype=np.float32))
+            for term, (d, w) in postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the BM25 score of every doc for query (zeros for docs matching no term)."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def match_scores(self, query: str) -> np.ndarray:
+        """Return scores() with docs matching no query term set to -inf (for rank fusion)."""
+        scores = self.scores(query)
+        scores[scores == 0] = -np.inf
+        return scores
+
+
+def rank(signals: list[np.ndarray], limit: int) -> np.ndarray:
+    """Order candidates by one or more relevance signals, best first.
+
+    A single signal is sorted directly. Several signals (e.g. BM25 and embedding
+    similarity) are combined by reciprocal rank fusion, which needs no score
+    normalization across signals. Entries of -inf mean "no match" and contribute nothing;
+    ties keep candidate order, so unmatched candidates follow in their given order.
+
+    Args:
+        signals: Score arrays aligned with the candidate list.
+        limit: Max results.
+
+    Returns:
+        Indices into the candidate list.
+    """
+    if len(signals) == 1:
+        fused = signals[0]
+    else:
+        fused = np.zeros(len(signals[0]), dtype=np.float64)
+        for scores in signals:
+            ranks = np.empty(len(scores), dtype=np.float64)
+            ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores))
+            fused += np.where(np.isfinite(scores), 1.0 / (RRF_K + ranks + 1), 0.0)
+    return np.argsort(-fused, kind="stable")[:limit]
@@ -0,0 +1,310 @@
+"""Semantic retrieval of failure facts from a memory-mapped float32 embedding matrix.
+
+Fact embeddings are computed when drafts are published (only new or edited facts are
+embedded; the rest are copied from the previous matrix) and written as one normalized
+float32 .npy matrix plus a JSON manifest of fact ids. Every worker memory-maps the
+matrix read-only, so the vectors live once in the OS page cache rather than once per
+process. Query and fact embeddings go through the shared Gemini client (same model and
+dimension as LightRAG), so the coach path never imports the lightrag package. A
+background task (started by the app lifespan) checks the manifest every
+FAILURE_FACT_VECTORS_REFRESH_S and maps a new matrix in a worker thread; lookups only
+read the mapped state. Rebuilds from several workers are serialized by an exclusive
+lock file in the vectors directory, and every matrix is written under a unique name, so
+a file another worker has mapped is never rewritten.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from config import (
+    FAILURE_FACT_VECTORS_DIR,
+    FAILURE_FACT_VECTORS_ENABLED,
+    FAILURE_FACT_VECTORS_REFRESH_S,
+)
+from db import SessionLocal
+from repositories import FailureFactRepository
+from services import lightrag as lightrag_service
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "failure_facts.json"
+LOCK_NAME = "failure_facts.lock"
+
+# Facts embedded per embedding request during a rebuild.
+EMBED_BATCH_SIZE = 100
+
+# Query text beyond this many characters is not embedded.
+QUERY_MAX_CHARS = 2000
+
+
+def fact_text(fact: dict[str, Any]) -> str:
+    """Return the text embedded for a fact: fact sentence, prompt hint and keywords."""
+    keywords = ", ".join(fact.get("keywords") or [])
+    parts = [fact.get("fact") or "", fact.get("promptHint") or "", keywords]
+    return "\n".join(p for p in parts if p)
+
+
+def _text_hash(text: str) -> str:
+    """Return a short content hash used to reuse embeddings of unchanged facts."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class FactVectorIndex:
+    """Read-only view of the latest fact embedding matrix, reloaded when the manifest changes."""
+
+    def __init__(self, directory: str, refresh_s: float = 5.0, enabled: bool = False):
+        self.directory = Path(directory)
+        self.refresh_s = refresh_s
+        self.enabled = enabled
+        self.version = 0
+        self._matrix: np.ndarray | None = None
+        self._ids: list[str] = []
+        self._hashes: list[str] = []
+        self._row_of: dict[str, int] = {}
+        self._manifest_mtime = 0
+        # (facts list, version) -> row per fact position (-1 = no vector). The list itself is
+        # kept and compared by identity: an id() could be reused by a later list.
+        self._rows_cache: tuple[list[dict[str, Any]], int, np.ndarray] | None = None
+        self._rebuild_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        """True when enabled and a matrix is mapped."""
+        return self.enabled and self._matrix is not None
+
+    @property
+    def dim(self) -> int:
+        """Embedding dimension of the mapped matrix (0 if none)."""
+        return self._matrix.shape[1] if self._matrix is not None else 0
+
+    async def reload(self) -> bool:
+        """Map the matrix named by the manifest if the manifest changed; True if reloaded.
+
+        Disk reads and the mapping run in a worker thread; the new state is swapped in
+        on the event loop, where lookups read it. Errors are logged, not raised.
+        """
+        if not self.enabled:
+            return False
+        try:
+            loaded = await asyncio.to_thread(self._read, self._manifest_mtime)
+        except Exception:
+            logger.warning("Fact vectors: could not load %s", self.directory, exc_info=True)
+            return False
+        if loaded is None:
+            return False
+        mtime, manifest, matrix = loaded
+        self._matrix = matrix
+        self._ids = manifest["ids"]
+        self._hashes = manifest["hashes"]
+        self._row_of = {fact_id: row for row, fact_id in enumerate(self._ids)}
+        self.version = manifest["version"]
+        self._manifest_mtime = mtime
+        return True
+
+    def _read(self, known_mtime: int) -> tuple[int, dict[str, Any], np.ndarray] | None:
+        """Return (mtime, manifest, mapped matrix), or None if the manifest is missing or unchanged."""
+        try:
+            mtime = (self.directory / MANIFEST_NAME).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime == known_mtime:
+            return None
+        manifest = json.loads((self.directory / MANIFEST_NAME).read_text())
+        matrix = np.load(self.directory / manifest["file"], mmap_mode="r")
+        if matrix.shape[0] != len(manifest["ids"]):
+            raise ValueError("Fact vector matrix does not match its manifest")
+        return mtime, manifest, matrix
+
+    async def start(self) -> None:
+        """Map the current matrix and start watching the manifest (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        await self.reload()
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop watching the manifest."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _poll(self) -> None:
+        """Pick up matrices rebuilt by other workers (checked every refresh_s seconds)."""
+        while True:
+            await asyncio.sleep(self.refresh_s)
+            if await self.reload():
+                logger.info("Fact vectors reloaded (version %s)", self.version)
+
+    def rows_for(self, facts: list[dict[str, Any]]) -> np.ndarray:
+        """Return the matrix row of each fact (-1 for facts without a vector); cached per list."""
+        cached = self._rows_cache
+        if cached is not None and cached[0] is facts and cached[1] == self.version:
+            return cached[2]
+        rows = np.asarray([self._row_of.get(f["id"], -1) for f in facts], dtype=np.int64)
+        self._rows_cache = (facts, self.version, rows)
+        return rows
+
+    def similarities(self, rows: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """Return cosine similarity of query_vector to each given matrix row."""
+        matrix = self._matrix
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        query = query / (np.linalg.norm(query) or 1.0)
+        # A small subset is gathered first; otherwise one pass over the whole mapping is cheaper.
+        if len(rows) * 2 < matrix.shape[0]:
+            return matrix[rows] @ query
+        return (matrix @ query)[rows]
+
+    def candidate_scores(
+        self, facts: list[dict[str, Any]], candidates: np.ndarray, query_vector: np.ndarray
+    ) -> np.ndarray | None:
+        """Return similarity per candidate fact position (-inf where a fact has no vector).
+
+        Returns:
+            Scores aligned with candidates, or None if no matrix is mapped or the query
+            dimension does not match.
+        """
+        if not self.ready or len(query_vector) != self.dim:
+            return None
+        rows = self.rows_for(facts)[candidates]
+        scores = np.full(len(candidates), -np.inf, dtype=np.float32)
+        has_vector = rows >= 0
+        if has_vector.any():
+            scores[has_vector] = self.similarities(rows[has_vector], query_vector)
+        return scores
+
+    async def embed_query(self, text: str) -> np.ndarray | None:
+        """Embed learner text for retrieval; None when unavailable (errors are logged)."""
+        if not self.ready or not text.strip():
+            return None
+        try:
+            vectors = await lightrag_service.embed_texts(
+                [text[:QUERY_MAX_CHARS]], task_type="RETRIEVAL_QUERY", call_site="coach"
+            )
+        except Exception:
+            logger.warning("Fact vectors: query embedding failed", exc_info=True)
+            return None
+        return None if vectors is None else vectors[0]
+
+    async def rebuild(self) -> int:
+        """Embed new or edited facts and write a new matrix and manifest.
+
+        Returns:
+            Number of facts embedded in this rebuild.
+        """
+        async with self._rebuild_lock, self._directory_lock():
+            # Another worker may have rebuilt while we waited for the lock: start from its matrix.
+            await self.reload()
+            facts = await asyncio.to_thread(_load_facts)
+            texts = [fact_text(f) for f in facts]
+            hashes = [_text_hash(t) for t in texts]
+            old_hash = dict(zip(self._ids, self._hashes))
+            stale = [i for i, f in enumerate(facts) if old_hash.get(f["id"]) != hashes[i]]
+            ids = [f["id"] for f in facts]
+            if not stale and ids == self._ids and self._matrix is not None:
+                return 0
+            fresh: dict[int, np.ndarray] = {}
+            for start in range(0, len(stale), EMBED_BATCH_SIZE):
+                batch = stale[start : start + EMBED_BATCH_SIZE]
+                vectors = await lightrag_service.embed_texts(
+                    [texts[i] for i in batch], task_type="RETRIEVAL_DOCUMENT"
+                )
+                if vectors is None:
+                    raise ValueError("GEMINI_API_KEY required to embed failure facts")
+                fresh.update(zip(batch, np.asarray(vectors, dtype=np.float32)))
+            dim = next(iter(fresh.values())).shape[0] if fresh else self.dim
+            matrix = np.zeros((len(facts), dim), dtype=np.float32)
+            for i, f in enumerate(facts):
+                matrix[i] = fresh[i] if i in fresh else self._matrix[self._row_of[f["id"]]]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+            await asyncio.to_thread(self._write, matrix, ids, hashes, self.version + 1)
+            await self.reload()
+            metrics.inc("fact_vectors_embedded_total", len(stale))
+            return len(stale)
+
+    @asynccontextmanager
+    async def _directory_lock(self) -> AsyncIterator[None]:
+        """Hold an exclusive lock on the vectors directory across processes (POSIX flock)."""
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.directory / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock.
+            os.close(fd)
+
+    def _write(self, matrix: np.ndarray, ids: list[str], hashes: list[str], version: int) -> None:
+        """Write the matrix under a new unique name, then atomically swap the manifest to it."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"failure_facts.v{version}.{uuid.uuid4().hex[:8]}.npy"
+        tmp_matrix = self.directory / f"{name}.tmp"
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp_matrix, self.directory / name)
+        manifest = {"version": version, "file": name, "dim": matrix.shape[1], "ids": ids, "hashes": hashes}
+        tmp = self.directory / f"{MANIFEST_NAME}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, self.directory / MANIFEST_NAME)
+        # Older matrices can go: workers still mapping one keep it alive until they remap.
+        # Leftover .tmp files are from writers that died (the lock is held here).
+        for path in self.directory.glob("failure_facts.v*.npy*"):
+            if path.name != name:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Return vector count, dimension and loaded version."""
+        return {
+            "vectors": len(self._ids) if self._matrix is not None else 0,
+            "dim": self.dim,
+            "version": self.version,
+        }
+
+
+def _load_facts() -> list[dict[str, Any]]:
+    """Return all failure facts ordered by id (worker thread, own session)."""
+    db = SessionLocal()
+    try:
+        return FailureFactRepository(db).list_all()
+    finally:
+        db.close()
+
+
+async def rebuild_after_publish() -> None:
+    """Rebuild the vectors after a publish (background task; failures are logged, not raised)."""
+    if not fact_vectors.enabled:
+        return
+    try:
+        embedded = await fact_vectors.rebuild()
+    except Exception:
+        logger.warning("Fact vectors: rebuild after publish failed", exc_info=True)
+        return
+    logger.info("Fact vectors rebuilt (version %s, %d embedded)", fact_vectors.version, embedded)
+
+
+# Process-wide index, started and stopped by the app lifespan.
+fact_vectors = FactVectorIndex(
+    FAILURE_FACT_VECTORS_DIR,
+    refresh_s=FAILURE_FACT_VECTORS_REFRESH_S,
+    enabled=FAILURE_FACT_VECTORS_ENABLED,
+)
+metrics.counter("fact_vectors_embedded_total", "Failure facts embedded by vector index rebuilds.")
+metrics.register_stats("fact_vectors", fact_vectors.stats, "Memory-mapped failure fact embeddings.")
@@ -0,0 +1,186 @@
+"""Process-local index of failure facts for the coach hot path.
+
+failure_facts only changes when drafts are published, so each worker keeps all facts in
+memory, grouped by concept_id plus a global list, and answers coach lookups with a dict
+access. Candidates are ranked by BM25 against the learner's text (services.fact_ranking),
+with the inverted index rebuilt on every reload, and optionally fused with embedding
+similarity (services.fact_vectors). publish_drafts bumps the "failure_facts" row in
+content_versions in the same transaction and reloads the local index; other workers
+notice the new version within FAILURE_FACT_INDEX_REFRESH_S and reload theirs.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config import (
+    FAILURE_FACT_INDEX_ENABLED,
+    FAILURE_FACT_INDEX_REFRESH_S,
+    FAILURE_FACT_RANKING_ENABLED,
+)
+from db import SessionLocal
+from repositories import ContentVersionRepository, FailureFactRepository
+from services.fact_ranking import BM25Index, rank
+from services.fact_vectors import fact_vectors
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# content_versions row bumped whenever failure_facts changes.
+VERSION_NAME = "failure_facts"
+
+# (all facts ordered by id, concept_id -> positions of its facts plus global ones,
+#  positions of global facts, BM25 index over all facts).
+Snapshot = tuple[list[dict[str, Any]], dict[str, np.ndarray], np.ndarray, BM25Index]
+
+
+class FailureFactIndex:
+    """Immutable snapshot of failure facts by concept, swapped atomically on reload."""
+
+    def __init__(self, refresh_s: float = 5.0, enabled: bool = True, ranking: bool = True):
+        self.refresh_s = refresh_s
+        self.enabled = enabled
+        self.ranking = ranking
+        self.version: int | None = None
+        self.loaded_at = 0.0
+        self.reloads = 0
+        self._snapshot: Snapshot = ([], {}, np.zeros(0, dtype=np.int32), BM25Index([]))
+        self._task: asyncio.Task | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """True once a snapshot has been loaded (lookups no longer need the DB)."""
+        return self.enabled and self.version is not None
+
+    def build(self, facts: list[dict[str, Any]], version: int) -> None:
+        """Replace the snapshot with facts (dicts from FailureFactRepository.list_all)."""
+        facts = sorted(facts, key=lambda f: f["id"])
+        global_ids = [i for i, f in enumerate(facts) if not f.get("concept_id")]
+        concept_ids: dict[str, list[int]] = {}
+        for i, f in enumerate(facts):
+            if f.get("concept_id"):
+                concept_ids.setdefault(f["concept_id"], []).append(i)
+        by_concept = {
+            concept_id: np.asarray(sorted(ids + global_ids), dtype=np.int32)
+            for concept_id, ids in concept_ids.items()
+        }
+        global_facts = np.asarray(global_ids, dtype=np.int32)
+        # One assignment: readers on other threads see the old or the new snapshot, never a mix.
+        self._snapshot = (facts, by_concept, global_facts, BM25Index(facts))
+        self.version = version
+        self.loaded_at = time.time()
+        self.reloads += 1
+
+    def load(self, db: Session) -> None:
+        """Load all failure facts and the current version stamp from the DB."""
+        # Read the version first: a publish racing the load leaves the index one version
+        # behind, so the next refresh reloads it.
+        version = ContentVersionRepository(db).get(VERSION_NAME)
+        self.build(FailureFactRepository(db).list_all(), version)
+
+    def lookup(
+        self,
+        concept_id: str | None,
+        limit: int = 2,
+        query: str = "",
+        query_vector: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return hints for concept_id (its facts plus global ones), or global ones only.
+
+        Args:
+            concept_id: Optional concept slug.
+            limit: Max number of facts to return.
+            query: Learner text to rank candidates by (BM25); facts without a match, or
+                all candidates when query is empty or ranking is off, follow in id order
+                (the FailureFactRepository.get_failure_facts order).
+            query_vector: Optional embedding of query; fused with BM25 using the
+                memory-mapped fact vectors when they are available.
+
+        Returns:
+            List of dicts with id, tags, keywords, fact, promptHint.
+        """
+        facts, by_concept, global_facts, bm25 = self._snapshot
+        candidates = by_concept.get(concept_id, global_facts) if concept_id else global_facts
+        signals = []
+        if self.ranking and query:
+            signals.append(bm25.match_scores(query)[candidates])
+        if self.ranking and query_vector is not None:
+            similarities = fact_vectors.candidate_scores(facts, candidates, query_vector)
+            if similarities is not None:
+                signals.append(similarities)
+        if signals:
+            chosen = candidates[rank(signals, limit)].tolist()
+        else:
+            chosen = candidates[:limit].tolist()
+        return [_hint(facts[i]) for i in chosen]
+
+    def all_facts(self) -> list[dict[str, Any]]:
+        """Return every fact in the snapshot (with concept_id), ordered by id."""
+        return self._snapshot[0]
+
+    def refresh(self) -> bool:
+        """Reload if the stored version differs from the loaded one; True if reloaded."""
+        db = SessionLocal()
+        try:
+            if self.version is not None and ContentVersionRepository(db).get(VERSION_NAME) == self.version:
+                return False
+            self.load(db)
+            return True
+        finally:
+            db.close()
+
+    async def start(self) -> None:
+        """Load the index and start polling the version stamp (no-op when disabled)."""
+        if not self.enabled or self._task is not None:
+            return
+        try:
+            await asyncio.to_thread(self.refresh)
+        except Exception:
+            logger.warning("Failure fact index: initial load failed; using the DB until it loads", exc_info=True)
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _poll(self) -> None:
+        """Reload whenever another worker publishes (checked every refresh_s seconds)."""
+        while True:
+            await asyncio.sleep(self.refresh_s)
+            try:
+                if await asyncio.to_thread(self.refresh):
+                    logger.info("Failure fact index reloaded (version %s)", self.version)
+            except Exception:
+                logger.warning("Failure fact index: refresh failed", exc_info=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Return fact/concept counts, loaded version, reload count and snapshot age."""
+        facts, by_concept, _, _ = self._snapshot
+        return {
+            "facts": len(facts),
+            "concepts": len(by_concept),
+            "version": self.version if self.version is not None else -1,
+            "reloads": self.reloads,
+            "age_s": time.time() - self.loaded_at if self.loaded_at else 0.0,
+        }
+
+
+def _hint(fact: dict[str, Any]) -> dict[str, Any]:
+    """Return the coach hint fields of an indexed fact (drops concept_id)."""
+    return {k: v for k, v in fact.items() if k != "concept_id"}
+
+
+# Process-wide index, started and stopped by the app lifespan.
+failure_fact_index = FailureFactIndex(
+    refresh_s=FAILURE_FACT_INDEX_REFRESH_S,
+    enabled=FAILURE_FACT_INDEX_ENABLED,
+    ranking=FAILURE_FACT_RANKING_ENABLED,
+)
+metrics.register_stats("failure_fact_index", failure_fact_index.stats, "In-memory failure fact index.")
@@ -0,0 +1,307 @@
+"""Deterministic offline LLM providers for benchmarks and load tests (LLM_PROVIDER=fake).
+
+Replies depend only on the prompt, so identical requests get identical answers (cache and
+coalescing behave as with Gemini). Latency is drawn from a configurable distribution and a
+configurable fraction of calls fail with FakeLLMError, from a seeded random generator.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from config import (
+    LLM_FAKE_ERROR_RATE,
+    LLM_FAKE_LATENCY_DIST,
+    LLM_FAKE_LATENCY_JITTER_MS,
+    LLM_FAKE_LATENCY_MS,
+    LLM_FAKE_SEED,
+)
+
+# Fraction of the total latency spent before the first streamed chunk.
+FIRST_CHUNK_SHARE = 0.5
+
+_COACH_LINES = [
+    "What happens to your write path when the primary database becomes unavailable?",
+    "How would you shard this data once a single node cannot hold the working set?",
+    "Where does back-pressure show up if the queue consumers fall behind for an hour?",
+    "Which component is the single point of failure in this design, and how do you remove it?",
+    "How do you keep the cache consistent with the database after a partial write?",
+    "What is your p99 latency budget per hop, and which hop is most likely to blow it?",
+    "How does the system behave during a regional network partition?",
+    "What would you monitor to notice this failure before users do?",
+]
+
+
+class FakeLLMError(RuntimeError):
+    """Injected upstream failure raised by the fake providers."""
+
+
+def _digest(*parts: str) -> bytes:
+    """Return a stable digest of the prompt parts."""
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()
+
+
+def _fake_text(system_instruction: str, user_content: str, max_output_tokens: int) -> str:
+    """Return deterministic coach-like text for the prompt, at most ~max_output_tokens long."""
+    digest = _digest(system_instruction, user_content)
+    lines = [_COACH_LINES[b % len(_COACH_LINES)] for b in digest[:3]]
+    text = f"[fake {digest[:4].hex()}] " + " ".join(lines)
+    return text[: max(1, max_output_tokens) * 4]
+
+
+def _fake_json(system_instruction: str, user_content: str) -> dict[str, Any]:
+    """Return a deterministic curriculum-shaped JSON object for the prompt."""
+    tag = _digest(system_instruction, user_content)[:4].hex()
+    concept_id = f"fake-concept-{tag}"
+    return {
+        "concepts": [
+            {
+                "id": concept_id,
+                "title": f"Fake concept {tag}",
+                "body": _fake_text(system_instruction, user_content, 256),
+                "tags": ["fake"],
+                "track": "system_design",
+                "phase": "fundamentals",
+                "sort_order": 1,
+                "prerequisite_concept_ids": [],
+            }
+        ],
+        "quizzes": [
+            {
+                "id": f"fake-quiz-{tag}",
+                "conceptId": concept_id,
+                "questions": [
+                    {
+                        "id": "q1",
+                        "text": "Which option is correct?",
+                        "options": [
+                            {"id": "a", "text": "This one", "correct": True},
+                            {"id": "b", "text": "Not this one", "correct": False},
+                        ],
+                    }
+                ],
+            }
+        ],
+        "failure_facts": [
+            {
+                "id": f"fake-fact-{tag}",
+                "concept_id": concept_id,
+                "tags": ["fake"],
+                "keywords": ["failover"],
+                "fact": "Replica promotion can lose acknowledged writes under async replication.",
+                "promptHint": "Ask how the design handles failover data loss.",
+            }
+        ],
+    }
+
+
+def _chunks(text: str, size: int = 4) -> list[str]:
+    """Split text into chunks of about size words (each keeps its trailing space)."""
+    words = text.split(" ")
+    return [
+        " ".join(words[i : i + size]) + (" " if i + size < len(words) else "")
+        for i in range(0, len(words), size)
+    ]
+
+
+class FakeBehavior:
+    """Seeded latency and error injection shared by the sync and async fake providers."""
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        distribution: str = "normal",
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> tuple[float, bool]:
+        """Draw one call's outcome.
+
+        Returns:
+            Tuple of (latency in seconds, whether the call should fail).
+        """
+        with self._lock:
+            if self.distribution == "fixed":
+                ms = self.latency_ms
+            elif self.distribution == "uniform":
+                ms = self._rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+            elif self.distribution == "lognormal":
+                # Median latency_ms; jitter_ms sets the spread (heavy right tail).
+                sigma = self.jitter_ms / self.latency_ms if self.latency_ms > 0 else 0.0
+                ms = self.latency_ms * self._rng.lognormvariate(0.0, sigma)
+            else:
+                ms = self._rng.gauss(self.latency_ms, self.jitter_ms)
+            fail = self._rng.random() < self.error_rate
+        return max(0.0, ms) / 1000.0, fail
+
+
+def default_behavior() -> FakeBehavior:
+    """Return a FakeBehavior configured from LLM_FAKE_* settings."""
+    return FakeBehavior(
+        latency_ms=LLM_FAKE_LATENCY_MS,
+        jitter_ms=LLM_FAKE_LATENCY_JITTER_MS,
+        distribution=LLM_FAKE_LATENCY_DIST,
+        error_rate=LLM_FAKE_ERROR_RATE,
+        seed=LLM_FAKE_SEED,
+    )
+
+
+class FakeLLM:
+    """Sync fake LLM provider: deterministic replies after a simulated (blocking) delay."""
+
+    def __init__(self, behavior: FakeBehavior | None = None):
+        self.behavior = behavior or default_behavior()
+
+    def _wait(self) -> None:
+        """Sleep for the drawn latency, then raise if the call was drawn to fail."""
+        delay, fail = self.behavior.draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+
+    def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Return deterministic text for the prompt."""
+        self._wait()
+        return _fake_text(system_instruction, user_content, max_output_tokens)
+
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> Iterator[str]:
+        """Yield deterministic text in word chunks, spreading the latency across them."""
+        delay, fail = self.behavior.draw()
+        chunks = _chunks(_fake_text(system_instruction, user_content, max_output_tokens))
+        time.sleep(delay * FIRST_CHUNK_SHARE)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for chunk in chunks:
+            yield chunk
+            time.sleep(delay * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+
+    def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Return a deterministic curriculum-shaped JSON object for the prompt."""
+        self._wait()
+        return _fake_json(system_instruction, user_content)
+
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> Iterator[str]:
+        """Yield the deterministic JSON object as text chunks, spreading the latency across them."""
+        delay, fail = self.behavior.draw()
+        chunks = _chunks(json.dumps(_fake_json(system_instruction, user_content)), size=8)
+        time.sleep(delay * FIRST_CHUNK_SHARE)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for chunk in chunks:
+            yield chunk
+            time.sleep(delay * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+
+
+class AsyncFakeLLM:
+    """Async fake LLM provider: deterministic replies after a simulated (non-blocking) delay."""
+
+    def __init__(self, behavior: FakeBehavior | None = None):
+        self.behavior = behavior or default_behavior()
+
+    async def _wait(self) -> None:
+        """Sleep for the drawn latency, then raise if the call was drawn to fail."""
+        delay, fail = self.behavior.draw()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Return deterministic text for the prompt."""
+        await self._wait()
+        return _fake_text(system_instruction, user_content, max_output_tokens)
+
+    async def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Yield deterministic text in word chunks, spreading the latency across them."""
+        delay, fail = self.behavior.draw()
+        chunks = _chunks(_fake_text(system_instruction, user_content, max_output_tokens))
+        await asyncio.sleep(delay * FIRST_CHUNK_SHARE)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(delay * (1 - FIRST_CHUNK_SHARE) / len(chunks))
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Return a deterministic curriculum-shaped JSON object for the prompt."""
+        await self._wait()
+        return _fake_json(system_instruction, user_content)
+
+    async def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Yield the deterministic JSON object as text chunks, spreading the latency across them."""
+        delay, fail = self.behavior.draw()
+        chunks = _chunks(json.dumps(_fake_json(system_instruction, user_content)), size=8)
+        await asyncio.sleep(delay * FIRST_CHUNK_SHARE)
+        if fail:
+            raise FakeLLMError("Simulated LLM failure")
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(delay * (1 - FIRST_CHUNK_SHARE) / len(chunks))
@@ -1,37 +1,112 @@
-"""Ingest service: extract text from PDF/URL and insert into LightRAG + DB."""
+"""Ingest service: extract text from PDF/URL and insert into LightRAG + DB.
 
+URLs are fetched concurrently through one pooled httpx.AsyncClient (opened on first use,
+closed in the app lifespan), at most INGEST_URL_CONCURRENCY per batch and
+INGEST_URL_PER_HOST_CONCURRENCY per host. PDF and HTML text extraction runs in the
+extraction process pool (services.extraction). PDF uploads are spooled to disk and their
+text inserted into LightRAG a few segments at a time, so memory use does not grow with
+document size. Documents (URLs, PDF segments) are inserted in batches
+(lightrag.insert_many).
+
+A PDF's ingested_docs row is written before its first segment is inserted and records
+how many segments were sent to LightRAG (ids doc_id, doc_id-1, ...; see segment_ids). If
+a later batch fails, the row is left with status "partial" so segments already in
+LightRAG stay visible and removable.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
 import uuid
+from collections.abc import AsyncIterator
 from typing import Any
+from urllib.parse import urlsplit
 
 import httpx
-import trafilatura
 from fastapi import UploadFile
-from pymupdf import open as pymupdf_open
 from sqlalchemy.orm import Session
 
+from config import (
+    LIGHTRAG_INSERT_BATCH_SIZE,
+    INGEST_FETCH_TIMEOUT_S,
+    INGEST_PDF_SEGMENT_CHARS,
+    INGEST_SPOOL_DIR,
+    INGEST_URL_CONCURRENCY,
+    INGEST_URL_PER_HOST_CONCURRENCY,
+)
 from repositories import IngestedDocRepository
 from services import lightrag as lightrag_service
+from services.extraction import extraction_pool
 
+# Buffer size for copying uploads to disk.
+SPOOL_CHUNK_BYTES = 1024 * 1024
 
-def extract_pdf_text(file: UploadFile) -> str:
-    """Extract text from uploaded PDF using PyMuPDF.
 
-    Args:
-        file: FastAPI UploadFile (PDF).
+def _spool_upload(file: UploadFile) -> str:
+    """Copy the upload to a named temp file in fixed-size chunks; return its path.
 
-    Returns:
-        Concatenated page text, or empty string if none.
+    Extraction workers open the PDF by path, so the document is never held in memory.
     """
-    content = file.file.read()
-    doc = pymupdf_open(stream=content)
-    parts = []
-    for page in doc:
-        parts.append(page.get_text())
-    doc.close()
-    return "\n\n".join(parts).strip() or ""
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=INGEST_SPOOL_DIR or None, delete=False) as tmp:
+        shutil.copyfileobj(file.file, tmp, SPOOL_CHUNK_BYTES)
+    return tmp.name
+
+
+async def extract_pdf_segments(path: str) -> AsyncIterator[str]:
+    """Yield the text of the PDF at path in segments of about INGEST_PDF_SEGMENT_CHARS.
+
+    Pages are extracted incrementally (services.extraction) and segments split at page
+    boundaries; a page longer than the limit is a segment of its own.
+
+    Raises:
+        ValueError: If extraction timed out or its worker crashed.
+    """
+    buffer: list[str] = []
+    size = 0
+    async for pages in extraction_pool.iter_pdf_pages(path):
+        for page in pages:
+            page = page.strip()
+            if not page:
+                continue
+            if buffer and size + len(page) > INGEST_PDF_SEGMENT_CHARS:
+                yield "\n\n".join(buffer)
+                buffer, size = [], 0
+            buffer.append(page)
+            size += len(page) + 2
+    if buffer:
+        yield "\n\n".join(buffer)
+
+
+# Process-wide pooled client for URL fetches.
+_http_client: httpx.AsyncClient | None = None
 
 
-def extract_url_text(url: str) -> str:
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared URL fetch client (created on first use)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=INGEST_FETCH_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=INGEST_URL_CONCURRENCY,
+                max_keepalive_connections=INGEST_URL_CONCURRENCY,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the URL fetch client and its connection pool (app shutdown)."""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None:
+        await client.aclose()
+
+
+async def extract_url_text(url: str) -> str:
     """Fetch URL and extract main text using trafilatura.
 
     Args:
@@ -43,10 +118,23 @@ def extract_url_text(url: str) -> str:
     Raises:
         httpx.HTTPStatusError: On non-2xx response.
     """
-    resp = httpx.get(url, follow_redirects=True, timeout=30)
+    resp = await _get_http_client().get(url)
     resp.raise_for_status()
-    text = trafilatura.extract(resp.content, url=url)
-    return (text or "").strip()
+    return await extraction_pool.html_text(resp.content, url)
+
+
+async def _insert_segments(batch: list[tuple[str, str]]) -> None:
+    """Insert one batch of (id, text) PDF segments; raise if LightRAG rejected it."""
+    if not batch:
+        return
+    failures = await lightrag_service.insert_many(batch)
+    if failures:
+        raise ValueError(f"Insert failed: {next(iter(failures.values()))}")
+
+
+def segment_ids(doc_id: str, segments: int) -> list[str]:
+    """Return the LightRAG document ids of a PDF ingested as segments (first one is doc_id)."""
+    return [doc_id] + [f"{doc_id}-{n}" for n in range(1, segments)]
 
 
 async def ingest_pdf(db: Session, file: UploadFile) -> dict[str, Any]:
@@ -57,25 +145,61 @@ async def ingest_pdf(db: Session, file: UploadFile) -> dict[str, Any]:
         file: FastAPI UploadFile (PDF).
 
     Returns:
-        Dict with doc_id, name, type.
+        Dict with doc_id, name, type, segments.
 
     Raises:
         ValueError: If file is not PDF or no text extracted.
     """
-    text = extract_pdf_text(file)
-    if not text:
-        raise ValueError("No text extracted from PDF")
+    path = await asyncio.to_thread(_spool_upload, file)
     doc_id = str(uuid.uuid4())
-    doc_id = await lightrag_service.insert(text, doc_name=doc_id) or doc_id
     name = file.filename or "upload.pdf"
     repo = IngestedDocRepository(db)
-    repo.add(doc_id=doc_id, name=name, type="pdf")
-    return {"doc_id": doc_id, "name": name, "type": "pdf"}
+    recorded = False
+    segments = 0
+    # Segments handed to LightRAG so far (a failed batch may have been partly indexed).
+    sent = 0
+    batch: list[tuple[str, str]] = []
+    try:
+        await asyncio.to_thread(
+            repo.add, doc_id=doc_id, name=name, type="pdf", segments=0, status="ingesting"
+        )
+        recorded = True
+        async for segment in extract_pdf_segments(path):
+            # The first segment keeps doc_id, so a short PDF is stored as before.
+            batch.append((doc_id if segments == 0 else f"{doc_id}-{segments}", segment))
+            segments += 1
+            if len(batch) >= LIGHTRAG_INSERT_BATCH_SIZE:
+                sent = segments
+                await _insert_segments(batch)
+                await asyncio.to_thread(repo.set_progress, doc_id, sent, "ingesting")
+                batch = []
+        sent = segments
+        await _insert_segments(batch)
+        if not segments:
+            raise ValueError("No text extracted from PDF")
+    except BaseException:
+        # Keep a record of segments that may be in LightRAG; drop the row if none can be.
+        # Shielded so a cancelled request (client disconnect) still records the outcome.
+        if recorded:
+            if sent:
+                cleanup = asyncio.to_thread(repo.set_progress, doc_id, sent, "partial")
+            else:
+                cleanup = asyncio.to_thread(repo.delete, doc_id)
+            await asyncio.shield(cleanup)
+        raise
+    finally:
+        os.unlink(path)
+    await asyncio.to_thread(repo.set_progress, doc_id, segments, "ingested")
+    return {"doc_id": doc_id, "name": name, "type": "pdf", "segments": segments}
 
 
 async def ingest_urls(db: Session, urls: list[str]) -> list[dict[str, Any]]:
     """Fetch each URL, extract text, insert into LightRAG, record in DB.
 
+    URLs are fetched concurrently (see module docstring), then inserted into LightRAG in
+    batches of LIGHTRAG_INSERT_BATCH_SIZE and recorded in one transaction; results keep
+    input order.
+
     Args:
         db: SQLAlchemy session.
         urls: List of URLs to ingest.
@@ -83,24 +207,38 @@ async def ingest_urls(db: Session, urls: list[str]) -> list[dict[str, Any]]:
     Returns:
         List of {url, doc_id} or {url, error, doc_id: None} per URL.
     """
+    urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+    batch_limit = asyncio.Semaphore(INGEST_URL_CONCURRENCY)
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def fetch_one(url: str) -> tuple[str, str]:
+        """Return (text, error) for url; exactly one of them is non-empty."""
+        host = urlsplit(url).netloc.lower()
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(INGEST_URL_PER_HOST_CONCURRENCY))
+        async with host_limit, batch_limit:
+            try:
+                text = await extract_url_text(url)
+            except Exception as e:
+                return "", str(e)
+        return (text, "") if text else ("", "No text extracted")
+
+    fetched = await asyncio.gather(*(fetch_one(url) for url in urls))
+    doc_ids = [str(uuid.uuid4()) if text else None for text, _ in fetched]
+    docs = [(doc_id, text) for doc_id, (text, _) in zip(doc_ids, fetched) if doc_id]
+    failures = await lightrag_service.insert_many(docs) or {}
+
     results: list[dict[str, Any]] = []
-    for url in urls:
-        if not isinstance(url, str) or not url.strip():
-            continue
-        url = url.strip()
-        try:
-            text = extract_url_text(url)
-        except Exception as e:
-            results.append({"url": url, "error": str(e), "doc_id": None})
-            continue
-        if not text:
-            results.append({"url": url, "error": "No text extracted", "doc_id": None})
-            continue
-        doc_id = str(uuid.uuid4())
-        doc_id = await lightrag_service.insert(text, doc_name=doc_id) or doc_id
-        repo = IngestedDocRepository(db)
-        repo.add(doc_id=doc_id, name=url, type="url")
-        results.append({"url": url, "doc_id": doc_id})
+    for url, doc_id, (_, error) in zip(urls, doc_ids, fetched):
+        if doc_id in failures:
+            error = f"Insert failed: {failures[doc_id]}"
+        if error:
+            results.append({"url": url, "error": error, "doc_id": None})
+        else:
+            results.append({"url": url, "doc_id": doc_id})
+    await asyncio.to_thread(
+        IngestedDocRepository(db).add_many,
+        [(r["doc_id"], r["url"], "url") for r in results if r["doc_id"]],
+    )
     return results
 
 
@@ -111,7 +249,7 @@ def list_sources(db: Session) -> list[dict[str, Any]]:
         db: SQLAlchemy session.
 
     Returns:
-        List of dicts with doc_id, name, type, created_at.
+        List of dicts with doc_id, name, type, segments, status, created_at.
     """
     repo = IngestedDocRepository(db)
     rows = repo.list_all()
@@ -120,6 +258,8 @@ def list_sources(db: Session) -> list[dict[str, Any]]:
             "doc_id": r.doc_id,
             "name": r.name,
             "type": r.type,
+            "segments": r.segments,
+            "status": r.status,
             "created_at": r.created_at.isoformat() if r.created_at else None,
         }
         for r in rows
@@ -0,0 +1,90 @@
+"""Incremental JSON parsing for streamed model output.
+
+Parses a top-level JSON object of arrays (e.g. {"concepts": [...], "quizzes": [...]})
+as text arrives and emits each array element object as soon as it closes, so a
+response truncated at max_output_tokens still yields every complete element.
+"""
+
+import json
+from typing import Any
+
+
+class ArrayItemParser:
+    """Streaming parser emitting (array key, element) for objects inside top-level arrays.
+
+    Text before the first "{" (e.g. a markdown code fence) is ignored. Elements that
+    are not objects, or that fail to decode, are skipped.
+    """
+
+    def __init__(self) -> None:
+        self.complete = False
+        self.skipped = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars: list[str] = []
+        self._last_key = ""
+        self._array_key = ""
+        self._item: list[str] | None = None
+
+    def feed(self, text: str) -> list[tuple[str, dict[str, Any]]]:
+        """Consume a chunk of text.
+
+        Args:
+            text: Next chunk of the model response.
+
+        Returns:
+            (array key, element dict) for every element that closed in this chunk.
+        """
+        items: list[tuple[str, dict[str, Any]]] = []
+        for ch in text:
+            if self.complete:
+                break
+            if self._item is not None:
+                self._item.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_key = "".join(self._key_chars)
+                elif len(self._stack) == 1:
+                    self._key_chars.append(ch)
+                continue
+            if not self._stack and ch != "{":
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._key_chars = []
+            elif ch in "{[":
+                if ch == "[" and len(self._stack) == 1:
+                    self._array_key = self._last_key
+                if ch == "{" and self._stack == ["{", "["]:
+                    self._item = ["{"]
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._stack == ["{", "["] and self._item is not None:
+                    item = self._decode("".join(self._item))
+                    if item is not None:
+                        items.append((self._array_key, item))
+                    self._item = None
+                if not self._stack:
+                    self.complete = True
+        return items
+
+    def _decode(self, text: str) -> dict[str, Any] | None:
+        """Decode one element; count and drop it if it is not a valid object."""
+        try:
+            value = json.loads(text)
+        except ValueError:
+            self.skipped += 1
+            return None
+        if not isinstance(value, dict):
+            self.skipped += 1
+            return None
+        return value
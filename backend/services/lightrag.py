@@ -3,13 +3,42 @@ LightRAG service using Google Gemini only (LLM + embeddings).
 
 Uses lightrag.llm.gemini: gemini_complete_if_cache, gemini_embed.
 Requires GEMINI_API_KEY. Working dir and storage default to local (no Milvus/Neo4j required for Phase 1).
+LightRAG's LLM and embedding calls go through the shared LLM scheduler as background traffic,
+and their latency and token usage are recorded in services.metrics.
+Query results are cached per process; every insert bumps an index generation that is part
+of the cache key, so results retrieved before the insert are never served after it.
 """
 
 import asyncio
+import logging
 import os
 from typing import Literal
 
-from config import GEMINI_API_KEY, LIGHTRAG_WORKING_DIR
+import numpy as np
+from google.genai.types import EmbedContentConfig, GenerateContentResponseUsageMetadata
+
+from config import (
+    GEMINI_API_KEY,
+    LIGHTRAG_INSERT_BATCH_SIZE,
+    LIGHTRAG_QUERY_CACHE_ENABLED,
+    LIGHTRAG_QUERY_CACHE_MAX_ENTRIES,
+    LIGHTRAG_QUERY_CACHE_TTL_S,
+    LIGHTRAG_WORKING_DIR,
+)
+from services import llm as llm_service
+from services.llm_cache import InMemoryLRUCache, ResponseCache, make_cache_key
+from services.llm_scheduler import llm_scheduler
+from services.metrics import (
+    TokenTracker,
+    metrics,
+    record_cache_hit,
+    record_usage,
+    track_llm_call,
+    track_stage,
+)
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 # Lazy imports so app starts without lightrag deps if not used
 _rag = None
@@ -21,6 +50,105 @@ LIGHTRAG_EMBED_MODEL = os.getenv("LIGHTRAG_EMBED_MODEL", "gemini-embedding-001")
 # gemini-embedding-001 output dimension (from LightRAG gemini.py)
 GEMINI_EMBED_DIM = 1536
 
+# Incremented after every insert; query cache keys include it.
+_index_generation = 0
+
+# Retrieval results by (generation, question, mode, limit, only_need_context). Entries of
+# older generations are unreachable and are dropped on insert.
+query_cache = ResponseCache(
+    backend=InMemoryLRUCache(max_entries=LIGHTRAG_QUERY_CACHE_MAX_ENTRIES),
+    ttl_s=LIGHTRAG_QUERY_CACHE_TTL_S,
+    enabled=LIGHTRAG_QUERY_CACHE_ENABLED,
+)
+# Concurrent identical queries share one retrieval.
+_query_flight = SingleFlight()
+
+
+def _query_cache_stats() -> dict:
+    """Return query cache counters plus the current index generation."""
+    return {**query_cache.stats(), "generation": _index_generation, **_query_flight.stats()}
+
+
+metrics.register_stats("lightrag_query_cache", _query_cache_stats, "LightRAG retrieval result cache.")
+
+
+async def _gemini_embed(
+    texts: list[str],
+    embedding_dim: int | None = None,
+    task_type: str = "RETRIEVAL_DOCUMENT",
+    **kwargs,
+) -> np.ndarray:
+    """Embed texts with the LightRAG Gemini binding (LightRAG's own embedding calls)."""
+    from lightrag.llm.gemini import gemini_embed
+
+    # gemini_embed is already an EmbeddingFunc; call the unwrapped function to avoid double wrapping.
+    return await gemini_embed.func(
+        texts,
+        model=LIGHTRAG_EMBED_MODEL,
+        api_key=GEMINI_API_KEY,
+        embedding_dim=embedding_dim or GEMINI_EMBED_DIM,
+        task_type=task_type,
+        **kwargs,
+    )
+
+
+async def _scheduled_embed(texts: list[str], **kwargs) -> np.ndarray:
+    """LightRAG embedding function: Gemini embeddings inside a background scheduler slot."""
+    kwargs.setdefault("token_tracker", TokenTracker("lightrag_embed"))
+    async with llm_scheduler.slot("lightrag_embed"):
+        with track_llm_call("lightrag_embed", "embed"):
+            return await _gemini_embed(texts, **kwargs)
+
+
+async def embed_texts(
+    texts: list[str],
+    task_type: str = "SEMANTIC_SIMILARITY",
+    call_site: str = "lightrag_embed",
+) -> np.ndarray | None:
+    """Embed texts with the same Gemini model and dimension LightRAG uses.
+
+    Calls the shared Gemini client directly rather than the LightRAG binding, so coach
+    callers (semantic cache, fact vectors) never import the lightrag package.
+
+    Args:
+        texts: Texts to embed (at most 100 per call).
+        task_type: Gemini embedding task type.
+        call_site: LLM scheduler call site (priority) for the request.
+
+    Returns:
+        Array of shape (len(texts), GEMINI_EMBED_DIM), or None if GEMINI_API_KEY is not set.
+    """
+    client = llm_service.get_gemini_client()
+    if client is None:
+        return None
+    async with llm_scheduler.slot(call_site):
+        with track_llm_call(call_site, "embed"):
+            response = await client.aio.models.embed_content(
+                model=LIGHTRAG_EMBED_MODEL,
+                contents=texts,
+                config=EmbedContentConfig(task_type=task_type, output_dimensionality=GEMINI_EMBED_DIM),
+            )
+    record_usage(call_site, _embed_usage(response, texts))
+    return np.asarray([e.values for e in response.embeddings], dtype=np.float32)
+
+
+def _embed_usage(response, texts: list[str]) -> GenerateContentResponseUsageMetadata:
+    """Return the input tokens of an embedding call as usage metadata.
+
+    Uses the per-embedding token counts when the API reports them (Vertex AI); the
+    Gemini API does not, so the count is then estimated from the texts.
+    """
+    counts = [
+        e.statistics.token_count
+        for e in response.embeddings or []
+        if e.statistics is not None and e.statistics.token_count is not None
+    ]
+    if counts and len(counts) == len(texts):
+        tokens = int(sum(counts))
+    else:
+        tokens = sum(llm_service.estimate_tokens(t) for t in texts)
+    return GenerateContentResponseUsageMetadata(prompt_token_count=tokens)
+
 
 async def _get_rag():
     """Initialize and return LightRAG instance (singleton).
@@ -36,7 +164,7 @@ async def _get_rag():
         if _rag is not None:
             return _rag
         from lightrag import LightRAG, QueryParam  # noqa: F401
-        from lightrag.llm.gemini import gemini_complete_if_cache, gemini_embed
+        from lightrag.llm.gemini import gemini_complete_if_cache
         from lightrag.kg.shared_storage import initialize_pipeline_status
         from lightrag.utils import EmbeddingFunc
 
@@ -48,21 +176,24 @@ async def _get_rag():
             history_messages: list | None = None,
             **kwargs,
         ) -> str:
-            return await gemini_complete_if_cache(
-                LIGHTRAG_LLM_MODEL,
-                prompt,
-                system_prompt=system_prompt,
-                history_messages=history_messages or [],
-                api_key=GEMINI_API_KEY,
-                **kwargs,
-            )
+            kwargs.setdefault("token_tracker", TokenTracker("lightrag_llm"))
+            async with llm_scheduler.slot("lightrag_llm"):
+                with track_llm_call("lightrag_llm", "text"):
+                    return await gemini_complete_if_cache(
+                        LIGHTRAG_LLM_MODEL,
+                        prompt,
+                        system_prompt=system_prompt,
+                        history_messages=history_messages or [],
+                        api_key=GEMINI_API_KEY,
+                        **kwargs,
+                    )
 
         rag = LightRAG(
             working_dir=LIGHTRAG_WORKING_DIR,
             llm_model_func=llm_model_func,
             embedding_func=EmbeddingFunc(
                 embedding_dim=GEMINI_EMBED_DIM,
-                func=gemini_embed,
+                func=_scheduled_embed,
             ),
         )
         await rag.initialize_storages()
@@ -71,6 +202,29 @@ async def _get_rag():
     return _rag
 
 
+def _import_lightrag() -> None:
+    """Import the lightrag modules _get_rag needs (slow; run in a worker thread)."""
+    import lightrag  # noqa: F401
+    import lightrag.kg.shared_storage  # noqa: F401
+    import lightrag.llm.gemini  # noqa: F401
+    import lightrag.utils  # noqa: F401
+
+
+async def warm() -> bool:
+    """Build the LightRAG instance now instead of on the first ingest or generate request.
+
+    The lightrag package is imported in a worker thread first, so the import does not
+    block the event loop.
+
+    Returns:
+        False if GEMINI_API_KEY is not set (LightRAG stays unavailable).
+    """
+    if not GEMINI_API_KEY:
+        return False
+    await asyncio.to_thread(_import_lightrag)
+    return await _get_rag() is not None
+
+
 async def insert(text: str, doc_name: str | None = None) -> str | None:
     """Insert text into LightRAG.
 
@@ -86,10 +240,55 @@ async def insert(text: str, doc_name: str | None = None) -> str | None:
         return None
     import uuid
     doc_id = doc_name or str(uuid.uuid4())
-    await rag.ainsert(text, ids=[doc_id])
+    await _ainsert(rag, [text], [doc_id])
     return doc_id
 
 
+async def insert_many(
+    docs: list[tuple[str, str]],
+    batch_size: int = LIGHTRAG_INSERT_BATCH_SIZE,
+) -> dict[str, str] | None:
+    """Insert many documents, batch_size per LightRAG ainsert call.
+
+    One call chunks, embeds and extracts entities for the whole batch, so embedding
+    requests are filled across documents instead of once per document. A failed batch
+    does not stop the following ones.
+
+    Args:
+        docs: (doc_id, text) pairs.
+        batch_size: Documents per ainsert call.
+
+    Returns:
+        doc_id -> error message for documents whose batch failed (empty if all were
+        inserted), or None if LightRAG unavailable (no API key).
+    """
+    rag = await _get_rag()
+    if rag is None:
+        return None
+    failures: dict[str, str] = {}
+    step = max(1, batch_size)
+    for start in range(0, len(docs), step):
+        batch = docs[start : start + step]
+        ids = [doc_id for doc_id, _ in batch]
+        try:
+            await _ainsert(rag, [text for _, text in batch], ids)
+        except Exception as e:
+            logger.warning("LightRAG batch insert of %d documents failed", len(batch), exc_info=True)
+            failures.update((doc_id, str(e)) for doc_id in ids)
+    return failures
+
+
+async def _ainsert(rag, texts: list[str], ids: list[str]) -> None:
+    """Insert texts under ids and invalidate cached query results."""
+    global _index_generation
+    try:
+        await rag.ainsert(texts, ids=ids)
+    finally:
+        # Also after a failed insert: part of the batch may already be indexed.
+        _index_generation += 1
+        query_cache.backend.clear()
+
+
 async def query(
     question: str,
     mode: Literal["naive", "local", "global", "hybrid"] = "hybrid",
@@ -110,10 +309,34 @@ async def query(
     rag = await _get_rag()
     if rag is None:
         return ""
+    generation = _index_generation
+    key = make_cache_key("lightrag_query", generation, question, mode, limit, only_need_context)
+    cached = query_cache.get(key, temperature=0.0)
+    if cached is not None:
+        record_cache_hit("lightrag_query", "exact")
+        return cached
+    result = await _query_flight.do_async(
+        key, lambda: _aquery(rag, question, mode, limit, only_need_context)
+    )
+    # An insert finishing meanwhile may have changed what this query should retrieve.
+    if generation == _index_generation:
+        query_cache.put(key, result, temperature=0.0)
+    return result
+
+
+async def _aquery(
+    rag,
+    question: str,
+    mode: Literal["naive", "local", "global", "hybrid"],
+    limit: int | None,
+    only_need_context: bool,
+) -> str:
+    """Run one LightRAG retrieval (uncached)."""
     from lightrag import QueryParam
     param = QueryParam(mode=mode, only_need_context=only_need_context)
     if limit is not None:
         param.chunk_top_k = limit
         param.top_k = limit
-    result = await rag.aquery(question, param=param)
+    with track_stage("lightrag_query"):
+        result = await rag.aquery(question, param=param)
     return result if isinstance(result, str) else ""
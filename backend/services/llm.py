@@ -1,9 +1,24 @@
-"""LLM integration for coach and curriculum using Google Gemini."""
+"""LLM integration for coach and curriculum using Google Gemini.
 
+Owns the process-wide Gemini client: one genai.Client backed by pooled keep-alive
+httpx clients (sync and async), opened in the app lifespan and closed on shutdown.
+"""
+
+import threading
+from collections.abc import AsyncIterator
+
+import httpx
 from google import genai
-from google.genai.types import GenerateContentConfig
+from google.genai.types import GenerateContentConfig, HttpOptions
 
-from config import GEMINI_API_KEY
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_KEEPALIVE_EXPIRY_S,
+    GEMINI_MAX_CONNECTIONS,
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+    GEMINI_MODEL,
+    GEMINI_TIMEOUT_S,
+)
 
 COACH_SYSTEM = """You are a System Design Coach. Your only job is to deepen the learner's thinking.
 
@@ -16,16 +31,65 @@ Rules:
 [CHALLENGE]
 {rag_snippet}"""
 
+# Generation settings for coach replies (short Socratic questions).
+COACH_MAX_OUTPUT_TOKENS = 256
+COACH_TEMPERATURE = 0.7
+# Each conversation turn is cut to this many characters in the prompt.
+COACH_TURN_MAX_CHARS = 500
+
+# Rough characters-per-token ratio for English prose (no tokenizer round trip).
+CHARS_PER_TOKEN = 4
+
+
+# Process-wide client and the pooled HTTP clients it sends requests through.
+_client: genai.Client | None = None
+_http_client: httpx.Client | None = None
+_async_http_client: httpx.AsyncClient | None = None
+_client_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text (about four characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _build_client() -> genai.Client:
+    """Create the Gemini client on top of pooled keep-alive httpx clients."""
+    global _http_client, _async_http_client
+    limits = httpx.Limits(
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY_S,
+    )
+    timeout = httpx.Timeout(GEMINI_TIMEOUT_S)
+    _http_client = httpx.Client(limits=limits, timeout=timeout)
+    _async_http_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+    return genai.Client(
+        api_key=GEMINI_API_KEY,
+        http_options=HttpOptions(
+            httpx_client=_http_client,
+            httpx_async_client=_async_http_client,
+        ),
+    )
+
 
 def _get_client() -> genai.Client | None:
-    """Return configured Gemini client, or None if API key missing."""
+    """Return the shared Gemini client (created on first use), or None if API key missing."""
+    global _client
     if not GEMINI_API_KEY:
         return None
-    return genai.Client(api_key=GEMINI_API_KEY)
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
 
 
 def get_gemini_client() -> genai.Client | None:
-    """Return a configured Gemini client for generate_content calls.
+    """Return the process-wide Gemini client for generate_content calls.
+
+    Connections are pooled and kept alive across calls, so only the first request
+    per connection pays for the TLS handshake.
 
     Returns:
         google.genai.Client instance, or None if GEMINI_API_KEY is not set.
@@ -33,35 +97,121 @@ def get_gemini_client() -> genai.Client | None:
     return _get_client()
 
 
-def generate_coach_feedback(
+def init_gemini_client() -> None:
+    """Create the shared Gemini client eagerly (called from the app lifespan)."""
+    _get_client()
+
+
+async def warm_gemini_client() -> bool:
+    """Open a pooled connection to the Gemini API before the first user request needs one.
+
+    Returns:
+        False if GEMINI_API_KEY is not set (nothing to warm).
+    """
+    client = _get_client()
+    if client is None:
+        return False
+    await client.aio.models.get(model=GEMINI_MODEL)
+    return True
+
+
+async def close_gemini_client() -> None:
+    """Close the shared Gemini client and its connection pools (app shutdown)."""
+    global _client, _http_client, _async_http_client
+    with _client_lock:
+        http_client, async_http_client = _http_client, _async_http_client
+        _client = _http_client = _async_http_client = None
+    if http_client is not None:
+        http_client.close()
+    if async_http_client is not None:
+        await async_http_client.aclose()
+
+
+def build_coach_prompt(
     design_text: str,
     conversation_context: list[dict],
     rag_snippet: str = "",
-) -> str:
-    """Generate Socratic coach feedback for a learner design using Gemini.
+    summary: str = "",
+) -> tuple[str, str]:
+    """Build the (system_instruction, user_content) pair for a coach call.
 
     Args:
         design_text: The learner's design description.
         conversation_context: List of {role, text} turns for recent conversation.
         rag_snippet: Optional challenge hints (failure facts) to inject into the prompt.
+        summary: Optional summary of earlier turns no longer sent verbatim.
 
     Returns:
-        Coach feedback string, or a message if API key is missing or generation fails.
+        Tuple of system instruction and user content.
     """
-    from services.llm_provider import get_llm_provider
-
     system = COACH_SYSTEM.format(rag_snippet=rag_snippet or "(none)")
     parts = [f"Learner's design:\n\n{design_text}"]
+    if summary:
+        parts.append(f"\n\nEarlier conversation (summary):\n{summary}")
     if conversation_context:
         parts.append("\n\nRecent conversation:")
         for turn in conversation_context:
             role = turn.get("role", "user")
-            text = turn.get("text", "")[:500]
+            text = turn.get("text", "")[:COACH_TURN_MAX_CHARS]
             parts.append(f"\n{role}: {text}")
-    user_content = "\n".join(parts)
-    return get_llm_provider().generate_text(
+    return system, "\n".join(parts)
+
+
+async def generate_coach_feedback(
+    design_text: str,
+    conversation_context: list[dict],
+    rag_snippet: str = "",
+    summary: str = "",
+) -> str:
+    """Generate Socratic coach feedback for a learner design using Gemini.
+
+    Args:
+        design_text: The learner's design description.
+        conversation_context: List of {role, text} turns for recent conversation.
+        rag_snippet: Optional challenge hints (failure facts) to inject into the prompt.
+        summary: Optional summary of earlier turns no longer sent verbatim.
+
+    Returns:
+        Coach feedback string, or a message if API key is missing or generation fails.
+    """
+    from services.llm_provider import get_async_llm_provider
+
+    system, user_content = build_coach_prompt(
+        design_text, conversation_context, rag_snippet, summary
+    )
+    return await get_async_llm_provider("coach").generate_text(
+        system_instruction=system,
+        user_content=user_content,
+        max_output_tokens=COACH_MAX_OUTPUT_TOKENS,
+        temperature=COACH_TEMPERATURE,
+    )
+
+
+def stream_coach_feedback(
+    design_text: str,
+    conversation_context: list[dict],
+    rag_snippet: str = "",
+    summary: str = "",
+) -> AsyncIterator[str]:
+    """Stream Socratic coach feedback for a learner design, chunk by chunk.
+
+    Args:
+        design_text: The learner's design description.
+        conversation_context: List of {role, text} turns for recent conversation.
+        rag_snippet: Optional challenge hints (failure facts) to inject into the prompt.
+        summary: Optional summary of earlier turns no longer sent verbatim.
+
+    Returns:
+        Async iterator of text chunks in the order the model produces them.
+    """
+    from services.llm_provider import get_async_llm_provider
+
+    system, user_content = build_coach_prompt(
+        design_text, conversation_context, rag_snippet, summary
+    )
+    return get_async_llm_provider("coach").stream_text(
         system_instruction=system,
         user_content=user_content,
-        max_output_tokens=256,
-        temperature=0.7,
+        max_output_tokens=COACH_MAX_OUTPUT_TOKENS,
+        temperature=COACH_TEMPERATURE,
     )
@@ -0,0 +1,181 @@
+"""LLM response cache: hashed prompt keys, pluggable storage, LRU + TTL eviction.
+
+The in-process backend is the default; any object implementing CacheBackend
+(e.g. a Redis-backed store) can be passed to ResponseCache to share entries across workers.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class CacheEntry:
+    """A cached LLM response with the temperature it was sampled at and its expiry time."""
+
+    value: str
+    temperature: float
+    expires_at: float
+
+
+class CacheBackend(Protocol):
+    """Storage for cache entries (in-process first; shared stores later)."""
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the entry for key, or None if absent."""
+        ...
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store entry under key, evicting as the backend sees fit."""
+        ...
+
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+        ...
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        ...
+
+
+class InMemoryLRUCache:
+    """Size-bounded, thread-safe in-process backend with least-recently-used eviction."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the entry for key and mark it most recently used."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store entry, evicting least recently used entries beyond max_entries."""
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case-fold so trivially different prompts share a key."""
+    return _WHITESPACE.sub(" ", text or "").strip().casefold()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Return a SHA-256 hex key over the normalized string form of parts.
+
+    Args:
+        *parts: Prompt pieces and generation settings (str, int, float, ...).
+
+    Returns:
+        Hex digest identifying the request.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(normalize_text(str(part)).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """TTL cache of LLM responses with hit/miss counters over a pluggable backend.
+
+    Responses sampled above max_temperature are not stored, since callers asking for
+    that much randomness expect varied answers.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        ttl_s: float = 3600.0,
+        max_temperature: float = 1.0,
+        enabled: bool = True,
+    ):
+        self.backend: CacheBackend = backend if backend is not None else InMemoryLRUCache()
+        self.ttl_s = ttl_s
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, temperature: float) -> str | None:
+        """Return the cached response for key, or None on miss or expiry.
+
+        Args:
+            key: Key from make_cache_key.
+            temperature: Temperature of the request; entries sampled at another temperature miss.
+
+        Returns:
+            Cached response text, or None.
+        """
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        now = time.monotonic()
+        with self._lock:
+            if entry is None or entry.temperature != temperature:
+                self.misses += 1
+                return None
+            if entry.expires_at <= now:
+                self.expired += 1
+                self.misses += 1
+                expired = True
+            else:
+                self.hits += 1
+                expired = False
+        if expired:
+            self.backend.delete(key)
+            return None
+        return entry.value
+
+    def put(self, key: str, value: str, temperature: float) -> None:
+        """Store a response unless caching is disabled or temperature is above the limit."""
+        if not self.enabled or temperature > self.max_temperature:
+            return
+        self.backend.set(
+            key,
+            CacheEntry(value=value, temperature=temperature, expires_at=time.monotonic() + self.ttl_s),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and backend size (when the backend reports one)."""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "size": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            "evictions": getattr(self.backend, "evictions", None),
+        }
@@ -0,0 +1,269 @@
+"""Hedged LLM requests: re-send a slow call and take whichever answer arrives first.
+
+If the primary call has not answered within a per-kind latency percentile of recent
+calls (LLM_HEDGE_PERCENTILE), a second request is sent, to GEMINI_FALLBACK_MODEL when
+set, and the first successful answer wins; the other call is cancelled. A primary call
+that fails before the deadline is re-sent immediately. For streams the deadline applies
+to the first chunk. Hedges are capped at LLM_HEDGE_MAX_RATIO of requests so a slow
+upstream does not get double the load.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+from config import (
+    LLM_HEDGE_DELAY_MS,
+    LLM_HEDGE_MAX_RATIO,
+    LLM_HEDGE_MIN_DELAY_MS,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_PERCENTILE,
+)
+from services.metrics import metrics, record_retry
+
+T = TypeVar("T")
+
+# Number of recent primary latencies kept per call kind.
+_LATENCY_WINDOW = 512
+
+# Hedge budget is capped at this many banked hedges.
+_MAX_BANKED_HEDGES = 10.0
+
+metrics.counter("llm_hedges_total", "Hedge requests sent, by reason (slow primary or failed primary).")
+metrics.counter("llm_hedge_wins_total", "Requests answered by the hedge instead of the primary call.")
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Return the pct percentile (0-100) of an ascending list, or 0.0 if empty."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class HedgePolicy:
+    """Hedge deadlines from recent primary latencies, plus a budget capping the hedge rate."""
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay_s: float = 2.0,
+        min_delay_s: float = 0.05,
+        min_samples: int = 20,
+        max_ratio: float = 0.1,
+    ):
+        self.percentile = percentile
+        self.initial_delay_s = initial_delay_s
+        self.min_delay_s = min_delay_s
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self._latencies: dict[str, deque[float]] = {}
+        self._budget = 1.0
+
+    def record(self, kind: str, seconds: float) -> None:
+        """Record how long a primary call took (or had run when it was cancelled)."""
+        self._latencies.setdefault(kind, deque(maxlen=_LATENCY_WINDOW)).append(seconds)
+
+    def delay(self, kind: str) -> float:
+        """Return how long to wait for the primary before hedging a call of this kind."""
+        samples = self._latencies.get(kind)
+        if not samples or len(samples) < self.min_samples:
+            return self.initial_delay_s
+        return max(self.min_delay_s, _percentile(sorted(samples), self.percentile))
+
+    def on_request(self) -> None:
+        """Earn max_ratio of a hedge for each request."""
+        self._budget = min(_MAX_BANKED_HEDGES, self._budget + self.max_ratio)
+
+    def take(self) -> bool:
+        """Spend one hedge from the budget; False if the budget is used up."""
+        if self._budget < 1.0:
+            return False
+        self._budget -= 1.0
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        """Return the current hedge delay per kind (seconds) and the banked budget."""
+        return {
+            "budget": self._budget,
+            "delay_s": {kind: {"delay_s": self.delay(kind)} for kind in self._latencies},
+        }
+
+
+def default_policy() -> HedgePolicy:
+    """Return a HedgePolicy configured from LLM_HEDGE_* settings."""
+    return HedgePolicy(
+        percentile=LLM_HEDGE_PERCENTILE,
+        initial_delay_s=LLM_HEDGE_DELAY_MS / 1000,
+        min_delay_s=LLM_HEDGE_MIN_DELAY_MS / 1000,
+        min_samples=LLM_HEDGE_MIN_SAMPLES,
+        max_ratio=LLM_HEDGE_MAX_RATIO,
+    )
+
+
+class HedgedLLM:
+    """Async provider wrapper racing a primary provider against a delayed hedge provider.
+
+    Both providers are normally scheduled wrappers, so each attempt takes its own
+    scheduler slot and is recorded in the per-call metrics.
+    """
+
+    def __init__(self, primary: Any, hedge: Any, call_site: str, policy: HedgePolicy | None = None):
+        self.primary = primary
+        self.hedge = hedge
+        self.call_site = call_site
+        self.policy = policy or default_policy()
+        metrics.register_stats(
+            "llm_hedge",
+            self.policy.stats,
+            "Hedge delay per call kind and banked hedges.",
+            nested_label="kind",
+            call_site=call_site,
+        )
+
+    async def _race(self, kind: str, attempt: Callable[[str, Any], Awaitable[T]]) -> tuple[T, str]:
+        """Run attempt on the primary, hedging it if slow or failed; return (result, winner)."""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.policy.on_request()
+        primary = asyncio.create_task(attempt("primary", self.primary))
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.policy.delay(kind))
+            if done and primary.exception() is None:
+                self.policy.record(kind, loop.time() - started)
+                return primary.result(), "primary"
+            if not self.policy.take():
+                return await primary, "primary"
+            reason = "error" if done else "slow"
+            if reason == "error":
+                record_retry(self.call_site)
+            metrics.inc("llm_hedges_total", call_site=self.call_site, kind=kind, reason=reason)
+            tasks[asyncio.create_task(attempt("hedge", self.hedge))] = "hedge"
+            pending = {t for t in tasks if not t.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if primary in done and primary.exception() is None:
+                    self.policy.record(kind, loop.time() - started)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] == "hedge":
+                            metrics.inc("llm_hedge_wins_total", call_site=self.call_site, kind=kind)
+                        return task.result(), tasks[task]
+            # Both attempts failed: surface the primary's error.
+            return primary.result(), "primary"
+        finally:
+            losers = [t for t in tasks if not t.done()]
+            if primary in losers:
+                self.policy.record(kind, loop.time() - started)
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _stream(
+        self, kind: str, open_stream: Callable[[Any], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Race streams on their first chunk, then continue with the winning stream."""
+        streams: dict[str, AsyncIterator[str]] = {}
+
+        async def first_chunk(name: str, provider: Any) -> str | None:
+            stream = streams[name] = open_stream(provider)
+            try:
+                return await anext(stream)
+            except StopAsyncIteration:
+                return None
+
+        try:
+            chunk, winner = await self._race(kind, first_chunk)
+            for name, stream in streams.items():
+                if name != winner:
+                    await stream.aclose()
+            if chunk is None:
+                return
+            yield chunk
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            for stream in streams.values():
+                await stream.aclose()
+
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text, hedging a slow or failed primary call."""
+        result, _ = await self._race(
+            "text",
+            lambda _, p: p.generate_text(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        return result
+
+    async def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Stream plain text, hedging a primary stream whose first chunk is late."""
+        async for chunk in self._stream(
+            "stream",
+            lambda p: p.stream_text(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        ):
+            yield chunk
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON, hedging a slow or failed primary call."""
+        result, _ = await self._race(
+            "json",
+            lambda _, p: p.generate_json(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        return result
+
+    async def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Stream JSON text, hedging a primary stream whose first chunk is late."""
+        async for chunk in self._stream(
+            "json_stream",
+            lambda p: p.stream_json(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        ):
+            yield chunk
@@ -1,18 +1,51 @@
-"""LLM provider interface and Gemini implementation.
+"""LLM provider interfaces and Gemini implementations (sync and async).
 
-Enables swapping LLM implementations (DIP). Default implementation uses Google Gemini.
+Enables swapping LLM implementations (DIP). Default implementation uses Google Gemini;
+LLM_PROVIDER=fake swaps in deterministic offline providers for benchmarks and load tests.
+Request paths running on the event loop (coach, curriculum) use the async provider.
+Default async providers are per call site: identical concurrent requests share one
+upstream call, and each call waits for a slot from the priority-aware LLM scheduler.
+Latency-sensitive call sites hedge slow calls (services.llm_hedging).
 """
 
+import copy
+import hashlib
 import json
 import re
+from collections.abc import AsyncIterator, Iterator
 from typing import Any, Protocol
 
 from google.genai.types import GenerateContentConfig
 
-from config import GEMINI_API_KEY
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_FALLBACK_MODEL,
+    GEMINI_MODEL,
+    LLM_COALESCE_ENABLED,
+    LLM_HEDGE_CALL_SITES,
+    LLM_PROVIDER,
+)
+from services.fake_llm import AsyncFakeLLM, FakeBehavior, FakeLLM, default_behavior
 from services.llm import get_gemini_client
+from services.llm_hedging import HedgedLLM
+from services.llm_scheduler import LLMScheduler, llm_scheduler
+from services.metrics import metrics, record_usage, track_llm_call
+from services.singleflight import SingleFlight
 
-GEMINI_MODEL = "gemini-1.5-flash"
+# Placeholder replies for text generation when Gemini is unavailable or returns nothing.
+MISSING_KEY_MESSAGE = "Set GEMINI_API_KEY to enable the coach."
+EMPTY_RESPONSE_MESSAGE = "The coach could not generate a response."
+FALLBACK_MESSAGES = frozenset({MISSING_KEY_MESSAGE, EMPTY_RESPONSE_MESSAGE})
+
+
+def _parse_json_text(text: str) -> dict[str, Any]:
+    """Parse model JSON output, tolerating a surrounding markdown code fence."""
+    text = text.strip()
+    if "```" in text:
+        match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
+        if match:
+            text = match.group(1).strip()
+    return json.loads(text)
 
 
 class LLMProvider(Protocol):
@@ -29,6 +62,17 @@ class LLMProvider(Protocol):
         """Generate plain text response."""
         ...
 
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> Iterator[str]:
+        """Generate plain text response as an iterator of chunks."""
+        ...
+
     def generate_json(
         self,
         system_instruction: str,
@@ -40,10 +84,73 @@ class LLMProvider(Protocol):
         """Generate JSON response (parsed dict)."""
         ...
 
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> Iterator[str]:
+        """Generate a JSON response as an iterator of raw text chunks (for incremental parsing)."""
+        ...
+
+
+class AsyncLLMProvider(Protocol):
+    """Async counterpart of LLMProvider for callers running on the event loop."""
+
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text response."""
+        ...
+
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Generate plain text response as an async iterator of chunks."""
+        ...
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON response (parsed dict)."""
+        ...
+
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Generate a JSON response as an async iterator of raw text chunks (for incremental parsing)."""
+        ...
+
 
 class GeminiLLM:
     """Gemini-backed LLM provider using google.genai Client."""
 
+    def __init__(self, call_site: str = "default", model: str = GEMINI_MODEL):
+        self.call_site = call_site
+        self.model = model
+
     def generate_text(
         self,
         system_instruction: str,
@@ -54,12 +161,12 @@ class GeminiLLM:
     ) -> str:
         """Generate plain text using Gemini."""
         if not GEMINI_API_KEY:
-            return "Set GEMINI_API_KEY to enable the coach."
+            return MISSING_KEY_MESSAGE
         client = get_gemini_client()
         if not client:
-            return "Set GEMINI_API_KEY to enable the coach."
+            return MISSING_KEY_MESSAGE
         response = client.models.generate_content(
-            model=GEMINI_MODEL,
+            model=self.model,
             contents=user_content,
             config=GenerateContentConfig(
                 system_instruction=system_instruction,
@@ -67,10 +174,44 @@ class GeminiLLM:
                 temperature=temperature,
             ),
         )
+        record_usage(self.call_site, getattr(response, "usage_metadata", None))
         if not response or not response.text:
-            return "The coach could not generate a response."
+            return EMPTY_RESPONSE_MESSAGE
         return response.text.strip()
 
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> Iterator[str]:
+        """Stream plain text from Gemini, yielding chunks as they arrive."""
+        client = get_gemini_client() if GEMINI_API_KEY else None
+        if not client:
+            yield MISSING_KEY_MESSAGE
+            return
+        stream = client.models.generate_content_stream(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        produced = False
+        usage = None
+        for chunk in stream:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk and chunk.text:
+                produced = True
+                yield chunk.text
+        record_usage(self.call_site, usage)
+        if not produced:
+            yield EMPTY_RESPONSE_MESSAGE
+
     def generate_json(
         self,
         system_instruction: str,
@@ -84,7 +225,7 @@ class GeminiLLM:
         if not client:
             raise ValueError("GEMINI_API_KEY is not set")
         response = client.models.generate_content(
-            model=GEMINI_MODEL,
+            model=self.model,
             contents=user_content,
             config=GenerateContentConfig(
                 system_instruction=system_instruction,
@@ -93,23 +234,511 @@ class GeminiLLM:
                 response_mime_type="application/json",
             ),
         )
+        record_usage(self.call_site, getattr(response, "usage_metadata", None))
         if not response or not response.text:
             raise ValueError("Gemini returned no text")
-        text = response.text.strip()
-        if "```" in text:
-            match = re.search(r"```(?:json)?\s*([\s\S]*?)```", text)
-            if match:
-                text = match.group(1).strip()
-        return json.loads(text)
+        return _parse_json_text(response.text)
 
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> Iterator[str]:
+        """Stream JSON text from Gemini, yielding raw chunks as they arrive."""
+        client = get_gemini_client()
+        if not client:
+            raise ValueError("GEMINI_API_KEY is not set")
+        stream = client.models.generate_content_stream(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+                response_mime_type="application/json",
+            ),
+        )
+        usage = None
+        for chunk in stream:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk and chunk.text:
+                yield chunk.text
+        record_usage(self.call_site, usage)
+
+
+class AsyncGeminiLLM:
+    """Gemini-backed async LLM provider using the google.genai async client (client.aio).
+
+    Token counts from response usage metadata are recorded under call_site.
+    """
+
+    def __init__(self, call_site: str = "default", model: str = GEMINI_MODEL):
+        self.call_site = call_site
+        self.model = model
 
-# Default provider used by coach and curriculum services.
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text using Gemini without blocking the event loop."""
+        client = get_gemini_client() if GEMINI_API_KEY else None
+        if not client:
+            return MISSING_KEY_MESSAGE
+        response = await client.aio.models.generate_content(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        record_usage(self.call_site, getattr(response, "usage_metadata", None))
+        if not response or not response.text:
+            return EMPTY_RESPONSE_MESSAGE
+        return response.text.strip()
+
+    async def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Stream plain text from Gemini, yielding chunks as they arrive."""
+        client = get_gemini_client() if GEMINI_API_KEY else None
+        if not client:
+            yield MISSING_KEY_MESSAGE
+            return
+        stream = await client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        produced = False
+        usage = None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk and chunk.text:
+                produced = True
+                yield chunk.text
+        record_usage(self.call_site, usage)
+        if not produced:
+            yield EMPTY_RESPONSE_MESSAGE
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON using Gemini without blocking the event loop; returns parsed dict."""
+        client = get_gemini_client()
+        if not client:
+            raise ValueError("GEMINI_API_KEY is not set")
+        response = await client.aio.models.generate_content(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+                response_mime_type="application/json",
+            ),
+        )
+        record_usage(self.call_site, getattr(response, "usage_metadata", None))
+        if not response or not response.text:
+            raise ValueError("Gemini returned no text")
+        return _parse_json_text(response.text)
+
+    async def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Stream JSON text from Gemini, yielding raw chunks as they arrive."""
+        client = get_gemini_client()
+        if not client:
+            raise ValueError("GEMINI_API_KEY is not set")
+        stream = await client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=user_content,
+            config=GenerateContentConfig(
+                system_instruction=system_instruction,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+                response_mime_type="application/json",
+            ),
+        )
+        usage = None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            if chunk and chunk.text:
+                yield chunk.text
+        record_usage(self.call_site, usage)
+
+
+def _fingerprint(
+    kind: str,
+    system_instruction: str,
+    user_content: str,
+    max_output_tokens: int,
+    temperature: float,
+) -> str:
+    """Return the coalescing key for one generation request.
+
+    Unlike the response caches' make_cache_key, the prompt is hashed exactly (no case or
+    whitespace normalization): requests coalesced here receive each other's output, so
+    JSON prompts or code that differ only in case or indentation must stay distinct.
+    """
+    raw = json.dumps([kind, system_instruction, user_content, max_output_tokens, temperature])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Shared by sync and async coalescing wrappers so stats cover both.
+llm_singleflight = SingleFlight()
+metrics.register_stats("llm_singleflight", llm_singleflight.stats, "Coalesced identical LLM requests.")
+
+
+class CoalescingLLM:
+    """Sync provider wrapper: concurrent identical requests share one upstream call.
+
+    Streaming (text and JSON) is passed through, since each stream is consumed by a single client.
+    """
+
+    def __init__(self, inner: LLMProvider, flight: SingleFlight = llm_singleflight):
+        self.inner = inner
+        self.flight = flight
+
+    def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text, joining an identical in-flight request if there is one."""
+        key = _fingerprint("text", system_instruction, user_content, max_output_tokens, temperature)
+        return self.flight.do(
+            key,
+            lambda: self.inner.generate_text(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> Iterator[str]:
+        """Stream plain text from the wrapped provider (not coalesced)."""
+        return self.inner.stream_text(
+            system_instruction,
+            user_content,
+            max_output_tokens=max_output_tokens,
+            temperature=temperature,
+        )
+
+    def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON, joining an identical in-flight request; each caller gets its own copy."""
+        key = _fingerprint("json", system_instruction, user_content, max_output_tokens, temperature)
+        result = self.flight.do(
+            key,
+            lambda: self.inner.generate_json(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        return copy.deepcopy(result)
+
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> Iterator[str]:
+        """Stream JSON text from the wrapped provider (not coalesced)."""
+        return self.inner.stream_json(
+            system_instruction,
+            user_content,
+            max_output_tokens=max_output_tokens,
+            temperature=temperature,
+        )
+
+
+class AsyncCoalescingLLM:
+    """Async provider wrapper: concurrent identical requests share one upstream call.
+
+    Streaming (text and JSON) is passed through, since each stream is consumed by a single client.
+    """
+
+    def __init__(self, inner: AsyncLLMProvider, flight: SingleFlight = llm_singleflight):
+        self.inner = inner
+        self.flight = flight
+
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text, joining an identical in-flight request if there is one."""
+        key = _fingerprint("text", system_instruction, user_content, max_output_tokens, temperature)
+        return await self.flight.do_async(
+            key,
+            lambda: self.inner.generate_text(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+
+    def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Stream plain text from the wrapped provider (not coalesced)."""
+        return self.inner.stream_text(
+            system_instruction,
+            user_content,
+            max_output_tokens=max_output_tokens,
+            temperature=temperature,
+        )
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON, joining an identical in-flight request; each caller gets its own copy."""
+        key = _fingerprint("json", system_instruction, user_content, max_output_tokens, temperature)
+        result = await self.flight.do_async(
+            key,
+            lambda: self.inner.generate_json(
+                system_instruction,
+                user_content,
+                max_output_tokens=max_output_tokens,
+                temperature=temperature,
+            ),
+        )
+        return copy.deepcopy(result)
+
+    def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Stream JSON text from the wrapped provider (not coalesced)."""
+        return self.inner.stream_json(
+            system_instruction,
+            user_content,
+            max_output_tokens=max_output_tokens,
+            temperature=temperature,
+        )
+
+
+class ScheduledLLM:
+    """Async provider wrapper that runs each call inside an LLM scheduler slot for call_site.
+
+    Call latency (excluding the wait for a slot) and outcome are recorded per call site.
+    """
+
+    def __init__(
+        self,
+        inner: AsyncLLMProvider,
+        call_site: str,
+        scheduler: LLMScheduler = llm_scheduler,
+    ):
+        self.inner = inner
+        self.call_site = call_site
+        self.scheduler = scheduler
+
+    async def generate_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> str:
+        """Generate plain text once the scheduler grants a slot."""
+        async with self.scheduler.slot(self.call_site):
+            with track_llm_call(self.call_site, "text"):
+                return await self.inner.generate_text(
+                    system_instruction,
+                    user_content,
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature,
+                )
+
+    async def stream_text(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 256,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """Stream plain text, holding the slot until the stream ends."""
+        async with self.scheduler.slot(self.call_site):
+            with track_llm_call(self.call_site, "stream"):
+                async for chunk in self.inner.stream_text(
+                    system_instruction,
+                    user_content,
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature,
+                ):
+                    yield chunk
+
+    async def generate_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> dict[str, Any]:
+        """Generate JSON once the scheduler grants a slot."""
+        async with self.scheduler.slot(self.call_site):
+            with track_llm_call(self.call_site, "json"):
+                return await self.inner.generate_json(
+                    system_instruction,
+                    user_content,
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature,
+                )
+
+    async def stream_json(
+        self,
+        system_instruction: str,
+        user_content: str,
+        *,
+        max_output_tokens: int = 4096,
+        temperature: float = 0.3,
+    ) -> AsyncIterator[str]:
+        """Stream JSON text, holding the slot until the stream ends."""
+        async with self.scheduler.slot(self.call_site):
+            with track_llm_call(self.call_site, "json_stream"):
+                async for chunk in self.inner.stream_json(
+                    system_instruction,
+                    user_content,
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature,
+                ):
+                    yield chunk
+
+
+# Default providers used by coach and curriculum services (async ones keyed by call site).
 _default_llm: LLMProvider | None = None
+_async_llms: dict[str, AsyncLLMProvider] = {}
+# One latency/error stream shared by all fake providers in the process.
+_fake_behavior: FakeBehavior | None = None
+
+
+def use_fake_llm() -> bool:
+    """Return True if LLM_PROVIDER selects the deterministic offline provider."""
+    return LLM_PROVIDER == "fake"
+
+
+def llm_configured() -> bool:
+    """Return True if the configured LLM provider can serve requests (fake, or Gemini with a key)."""
+    return use_fake_llm() or bool(GEMINI_API_KEY)
+
+
+def _get_fake_behavior() -> FakeBehavior:
+    """Return the process-wide fake latency/error behavior."""
+    global _fake_behavior
+    if _fake_behavior is None:
+        _fake_behavior = default_behavior()
+    return _fake_behavior
 
 
 def get_llm_provider() -> LLMProvider:
-    """Return the default LLM provider (Gemini)."""
+    """Return the default LLM provider (Gemini or fake, coalesced unless LLM_COALESCE_ENABLED is false)."""
     global _default_llm
     if _default_llm is None:
-        _default_llm = GeminiLLM()
+        provider: LLMProvider = FakeLLM(_get_fake_behavior()) if use_fake_llm() else GeminiLLM("sync")
+        if LLM_COALESCE_ENABLED:
+            provider = CoalescingLLM(provider)
+        _default_llm = provider
     return _default_llm
+
+
+def _async_base(call_site: str, model: str = GEMINI_MODEL) -> AsyncLLMProvider:
+    """Return a new unwrapped async provider (Gemini with model, or fake)."""
+    if use_fake_llm():
+        return AsyncFakeLLM(_get_fake_behavior())
+    return AsyncGeminiLLM(call_site, model)
+
+
+def get_async_llm_provider(call_site: str = "coach") -> AsyncLLMProvider:
+    """Return the default async LLM provider for a call site.
+
+    Gemini (or fake) calls are scheduled under call_site's priority and coalesced
+    (unless LLM_COALESCE_ENABLED is false) before taking a scheduler slot. Call sites
+    in LLM_HEDGE_CALL_SITES re-send slow calls, to GEMINI_FALLBACK_MODEL when set.
+
+    Args:
+        call_site: Caller name used for scheduling priority (coach, curriculum, ...).
+
+    Returns:
+        Async LLM provider shared by all callers from call_site.
+    """
+    provider = _async_llms.get(call_site)
+    if provider is None:
+        provider = ScheduledLLM(_async_base(call_site), call_site)
+        if call_site in LLM_HEDGE_CALL_SITES:
+            hedge = ScheduledLLM(_async_base(call_site, GEMINI_FALLBACK_MODEL or GEMINI_MODEL), call_site)
+            provider = HedgedLLM(provider, hedge, call_site)
+        if LLM_COALESCE_ENABLED:
+            provider = AsyncCoalescingLLM(provider)
+        _async_llms[call_site] = provider
+    return provider
@@ -0,0 +1,202 @@
+"""Priority-aware scheduler for Gemini calls shared by coach, curriculum and LightRAG.
+
+Every async LLM or embedding call takes a slot from one process-wide scheduler. Slots
+are limited by a global concurrency cap, a lower cap for background (admin) traffic,
+and a token-bucket request rate. Waiters are served by priority, so learner-facing
+coach calls go ahead of queued ingest/generation work.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from config import (
+    LLM_BACKGROUND_MAX_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    LLM_RATE_LIMIT_BURST,
+    LLM_RATE_LIMIT_RPM,
+)
+from services.metrics import metrics
+
+# Priority classes (lower value is served first).
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Call sites and their priority class.
+CALL_SITE_PRIORITIES: dict[str, int] = {
+    "coach": PRIORITY_INTERACTIVE,
+    "curriculum": PRIORITY_BACKGROUND,
+    "lightrag_llm": PRIORITY_BACKGROUND,
+    "lightrag_embed": PRIORITY_BACKGROUND,
+}
+
+_PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Number of recent wait times kept per priority class for percentiles.
+_WAIT_WINDOW = 1024
+
+
+class TokenBucket:
+    """Token-bucket rate limiter; a rate of 0 means unlimited."""
+
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate_per_s = rate_per_s
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token if available.
+
+        Returns:
+            0.0 if a token was taken, else seconds until the next token is available.
+        """
+        if self.rate_per_s <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_s)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate_per_s
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Return the pct percentile (0-100) of an ascending list, or 0.0 if empty."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class LLMScheduler:
+    """Grants LLM call slots by priority under concurrency caps and a rate limit."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        background_max_concurrency: int = 4,
+        rate_per_s: float = 0.0,
+        burst: int = 10,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.background_max_concurrency = max(1, min(background_max_concurrency, self.max_concurrency))
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self._in_flight: dict[int, int] = {p: 0 for p in _PRIORITY_NAMES}
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._granted: dict[int, int] = {p: 0 for p in _PRIORITY_NAMES}
+        self._waits: dict[int, deque[float]] = {p: deque(maxlen=_WAIT_WINDOW) for p in _PRIORITY_NAMES}
+        self._max_wait: dict[int, float] = {p: 0.0 for p in _PRIORITY_NAMES}
+
+    def _has_capacity(self, priority: int) -> bool:
+        """Return True if a call of this priority may start now (ignoring the rate limit)."""
+        if sum(self._in_flight.values()) >= self.max_concurrency:
+            return False
+        if priority != PRIORITY_INTERACTIVE:
+            background = sum(n for p, n in self._in_flight.items() if p != PRIORITY_INTERACTIVE)
+            return background < self.background_max_concurrency
+        return True
+
+    def _dispatch(self) -> None:
+        """Grant slots to queued waiters in priority order while capacity and tokens allow."""
+        self._timer = None
+        while self._waiters:
+            priority, _, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_capacity(priority):
+                return
+            delay = self.bucket.take()
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._in_flight[priority] += 1
+            fut.set_result(None)
+
+    async def _acquire(self, priority: int) -> None:
+        """Wait until a slot is granted for this priority."""
+        if not self._waiters and self._has_capacity(priority) and self.bucket.take() == 0.0:
+            self._in_flight[priority] += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release(priority)
+            raise
+
+    def _release(self, priority: int) -> None:
+        """Free a slot and hand it to the next waiter."""
+        self._in_flight[priority] -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, call_site: str) -> AsyncIterator[None]:
+        """Hold one LLM call slot for the duration of the block.
+
+        Args:
+            call_site: Caller name (coach, curriculum, lightrag_llm, lightrag_embed);
+                unknown call sites are treated as background traffic.
+        """
+        priority = CALL_SITE_PRIORITIES.get(call_site, PRIORITY_BACKGROUND)
+        started = time.monotonic()
+        await self._acquire(priority)
+        waited = time.monotonic() - started
+        self._granted[priority] += 1
+        self._waits[priority].append(waited)
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def stats(self) -> dict[str, Any]:
+        """Return per-priority in-flight counts, queue depth, and wait-time percentiles (seconds)."""
+        depth = {p: 0 for p in _PRIORITY_NAMES}
+        for priority, _, fut in self._waiters:
+            if not fut.done():
+                depth[priority] += 1
+        classes: dict[str, Any] = {}
+        for priority, name in _PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            classes[name] = {
+                "in_flight": self._in_flight[priority],
+                "queue_depth": depth[priority],
+                "granted": self._granted[priority],
+                "wait_p50_s": _percentile(waits, 50),
+                "wait_p99_s": _percentile(waits, 99),
+                "wait_max_s": self._max_wait[priority],
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "background_max_concurrency": self.background_max_concurrency,
+            "rate_limit_rpm": self.bucket.rate_per_s * 60,
+            "classes": classes,
+        }
+
+
+# Process-wide scheduler shared by all async Gemini callers.
+llm_scheduler = LLMScheduler(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    background_max_concurrency=LLM_BACKGROUND_MAX_CONCURRENCY,
+    rate_per_s=LLM_RATE_LIMIT_RPM / 60,
+    burst=LLM_RATE_LIMIT_BURST,
+)
+metrics.register_stats(
+    "llm_scheduler", llm_scheduler.stats, "LLM scheduler slots and waits.", nested_label="priority"
+)
@@ -0,0 +1,257 @@
+"""In-process metrics with Prometheus text exposition (served at GET /metrics).
+
+Counters and histograms are recorded on the hot path (LLM and embedding calls per call
+site, HTTP requests, retrieval and DB stages). Component stats() (caches, single-flight,
+scheduler, sessions) are exported as gauges at scrape time through registered collectors.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+# Latency buckets in seconds, sized for LLM calls (tens of ms to a minute).
+LATENCY_BUCKETS_S = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    """Return a hashable, sorted label set."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    """Render a label set as {a="x",b="y"} (empty string when there are no labels)."""
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value the way Prometheus expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, histograms and scrape-time gauge collectors."""
+
+    def __init__(self) -> None:
+        self._help: dict[str, tuple[str, str]] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+        self._collectors: list[Callable[[], list[tuple[str, dict[str, Any], float]]]] = []
+        self._collector_help: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> None:
+        """Declare a counter (idempotent)."""
+        with self._lock:
+            self._help.setdefault(name, ("counter", help_text))
+            self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS_S) -> None:
+        """Declare a histogram (idempotent)."""
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help_text))
+            self._buckets.setdefault(name, tuple(sorted(buckets)))
+            self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Add value to a declared counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record one observation in a declared histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            buckets = self._buckets[name]
+            hist = self._histograms[name].get(key)
+            if hist is None:
+                hist = self._histograms[name][key] = _Histogram(buckets)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist.counts[i] += 1
+            hist.sum += value
+            hist.count += 1
+
+    def register_stats(
+        self,
+        prefix: str,
+        stats_fn: Callable[[], dict[str, Any]],
+        help_text: str,
+        nested_label: str | None = None,
+        **labels: Any,
+    ) -> None:
+        """Export a component's stats() dict as gauges named prefix_<key> at scrape time.
+
+        Args:
+            prefix: Metric name prefix (e.g. coach_cache).
+            stats_fn: Zero-argument callable returning the component stats.
+            help_text: HELP text for the exported gauges.
+            nested_label: If set, nested dict values become samples labelled
+                nested_label=<key> (e.g. scheduler classes by priority).
+            **labels: Constant labels added to every sample.
+        """
+
+        def collect() -> list[tuple[str, dict[str, Any], float]]:
+            samples: list[tuple[str, dict[str, Any], float]] = []
+            for key, value in stats_fn().items():
+                if isinstance(value, dict) and nested_label:
+                    for inner, inner_stats in value.items():
+                        for field, v in inner_stats.items():
+                            if isinstance(v, (int, float)):
+                                samples.append(
+                                    (f"{prefix}_{field}", {**labels, nested_label: inner}, float(v))
+                                )
+                elif isinstance(value, (int, float)):
+                    samples.append((f"{prefix}_{key}", labels, float(value)))
+            return samples
+
+        with self._lock:
+            self._collectors.append(collect)
+            self._collector_help[prefix] = help_text
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                _, help_text = self._help[name]
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name, series in self._histograms.items():
+                _, help_text = self._help[name]
+                buckets = self._buckets[name]
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for key, hist in series.items():
+                    for bound, count in zip(buckets, hist.counts):
+                        le = (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {count}")
+                    lines.append(f'{name}_bucket{_format_labels(key, (("le", "+Inf"),))} {hist.count}')
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(hist.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+            collectors = list(self._collectors)
+            collector_help = dict(self._collector_help)
+        gauges: dict[str, list[str]] = {}
+        for collect in collectors:
+            for name, labels, value in collect():
+                gauges.setdefault(name, []).append(
+                    f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}"
+                )
+        for name, samples in gauges.items():
+            prefix = next((p for p in collector_help if name.startswith(p + "_")), "")
+            lines += [f"# HELP {name} {collector_help.get(prefix, name)}", f"# TYPE {name} gauge"]
+            lines += samples
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry.
+metrics = MetricsRegistry()
+
+metrics.histogram("llm_request_duration_seconds", "LLM/embedding call latency (after the scheduler slot is granted).")
+metrics.counter("llm_requests_total", "LLM/embedding calls by outcome (ok, error or cancelled).")
+metrics.counter("llm_input_tokens_total", "Prompt tokens reported by response usage metadata.")
+metrics.counter("llm_output_tokens_total", "Output tokens reported by response usage metadata.")
+metrics.counter("llm_retries_total", "LLM calls retried or re-sent after a failure or timeout.")
+metrics.counter("llm_cache_hits_total", "Requests answered from a cache instead of an LLM call.")
+metrics.histogram("stage_duration_seconds", "Request stage latency (retrieval, DB lookups).")
+metrics.histogram("http_request_duration_seconds", "HTTP request latency until response headers are sent.")
+metrics.counter("http_requests_total", "HTTP requests by route and status code.")
+
+
+@contextmanager
+def track_llm_call(call_site: str, kind: str) -> Iterator[None]:
+    """Record latency and outcome of one LLM call made inside the block.
+
+    Args:
+        call_site: Caller name (coach, curriculum, lightrag_llm, lightrag_embed).
+        kind: Call type (text, stream, json, json_stream, embed).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        # Abandoned by the caller (e.g. a losing hedge or a closed stream), not failed.
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.observe(
+            "llm_request_duration_seconds", time.perf_counter() - started, call_site=call_site, kind=kind
+        )
+        metrics.inc("llm_requests_total", call_site=call_site, kind=kind, outcome=outcome)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Record the latency of one request stage (e.g. lightrag_query, failure_facts)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("stage_duration_seconds", time.perf_counter() - started, stage=stage)
+
+
+def record_usage(call_site: str, usage_metadata: Any) -> None:
+    """Add token counts from a Gemini response's usage_metadata (ignored when missing)."""
+    if usage_metadata is None:
+        return
+    prompt = getattr(usage_metadata, "prompt_token_count", None) or 0
+    output = getattr(usage_metadata, "candidates_token_count", None) or 0
+    if prompt:
+        metrics.inc("llm_input_tokens_total", prompt, call_site=call_site)
+    if output:
+        metrics.inc("llm_output_tokens_total", output, call_site=call_site)
+
+
+def record_retry(call_site: str) -> None:
+    """Count one retried LLM call."""
+    metrics.inc("llm_retries_total", call_site=call_site)
+
+
+def record_cache_hit(call_site: str, cache: str) -> None:
+    """Count one request served from cache (exact, semantic, summary...)."""
+    metrics.inc("llm_cache_hits_total", call_site=call_site, cache=cache)
+
+
+class TokenTracker:
+    """LightRAG token_tracker adapter: forwards add_usage() counts to the registry."""
+
+    def __init__(self, call_site: str):
+        self.call_site = call_site
+
+    def add_usage(self, token_counts: dict[str, int]) -> None:
+        """Record prompt/completion token counts reported by LightRAG's Gemini binding."""
+        prompt = token_counts.get("prompt_tokens") or 0
+        completion = token_counts.get("completion_tokens") or 0
+        if prompt:
+            metrics.inc("llm_input_tokens_total", prompt, call_site=self.call_site)
+        if completion:
+            metrics.inc("llm_output_tokens_total", completion, call_site=self.call_site)
@@ -1,23 +1,43 @@
 """Failure hints for the coach: from DB (failure_facts by concept_id).
 
 Replaces JSON-based get_failures. Used by coach to build RAG snippet for LLM prompt.
+Served from the in-memory failure fact index (ranked by relevance) once it is loaded, else
+from the DB.
 """
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from repositories import FailureFactRepository
+from services.fact_ranking import keyword_terms
+from services.failure_fact_index import failure_fact_index
 
 
-def get_failure_facts(db: Session, concept_id: str | None, limit: int = 2) -> list[dict]:
+def get_failure_facts(
+    db: Session,
+    concept_id: str | None,
+    limit: int = 2,
+    query: str = "",
+    query_vector: np.ndarray | None = None,
+) -> list[dict]:
     """Return failure_facts for coach hints: concept_id match or global (concept_id IS NULL).
 
     Args:
         db: SQLAlchemy session.
         concept_id: Optional concept slug; if set, include facts for this concept or global (NULL).
         limit: Max number of facts to return.
+        query: Learner text used to rank facts by relevance (before the index loads, only
+            exact tag/keyword matches are preferred).
+        query_vector: Optional embedding of query for semantic ranking (see services.fact_vectors).
 
     Returns:
         List of dicts with id, tags, keywords, fact, promptHint.
     """
+    if failure_fact_index.loaded:
+        return failure_fact_index.lookup(
+            concept_id, limit=limit, query=query, query_vector=query_vector
+        )
     repo = FailureFactRepository(db)
-    return repo.get_failure_facts(concept_id=concept_id, limit=limit)
+    return repo.get_failure_facts(
+        concept_id=concept_id, limit=limit, terms=keyword_terms(query) or None
+    )
@@ -0,0 +1,145 @@
+"""Semantic cache: reuse LLM answers for inputs whose embeddings are near-duplicates.
+
+Entries are grouped by scope (e.g. concept/topic). Each scope keeps a fixed-capacity
+float32 matrix of L2-normalized embeddings, so a lookup is one matrix-vector product.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+
+class _ScopeIndex:
+    """Fixed-capacity embedding matrix and answers for one scope, with LRU row reuse."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.values: list[str | None] = [None] * capacity
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+
+    def search(self, vec: np.ndarray, now: float) -> tuple[int, float]:
+        """Return (row, cosine similarity) of the best live match, or (-1, -1.0)."""
+        if self.size == 0:
+            return -1, -1.0
+        sims = self.matrix[: self.size] @ vec
+        sims[self.expires_at[: self.size] <= now] = -1.0
+        row = int(np.argmax(sims))
+        return row, float(sims[row])
+
+    def add(self, vec: np.ndarray, value: str, now: float, ttl_s: float) -> bool:
+        """Insert an entry; returns True if an existing row was evicted to make room."""
+        if self.size < len(self.values):
+            row = self.size
+            self.size += 1
+            evicted = False
+        else:
+            # Prefer expired rows, then the least recently used one.
+            expired = np.flatnonzero(self.expires_at <= now)
+            row = int(expired[0]) if expired.size else int(np.argmin(self.last_used))
+            evicted = True
+        self.matrix[row] = vec
+        self.values[row] = value
+        self.last_used[row] = now
+        self.expires_at[row] = now + ttl_s
+        return evicted
+
+
+class SemanticCache:
+    """Embedding-similarity cache with per-scope capacity, LRU eviction and TTL."""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        capacity_per_scope: int = 256,
+        max_scopes: int = 64,
+        ttl_s: float = 3600.0,
+        enabled: bool = True,
+    ):
+        self.threshold = threshold
+        self.capacity_per_scope = capacity_per_scope
+        self.max_scopes = max_scopes
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scopes: OrderedDict[str, _ScopeIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray | None:
+        """Return embedding as a unit float32 vector, or None if it has zero norm."""
+        vec = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        if norm == 0.0:
+            return None
+        return vec / norm
+
+    def lookup(self, scope: str, embedding: np.ndarray) -> str | None:
+        """Return the cached answer most similar to embedding if above threshold.
+
+        Args:
+            scope: Scope key (e.g. concept id or topic).
+            embedding: Embedding of the incoming input.
+
+        Returns:
+            Cached answer, or None on miss.
+        """
+        vec = self._normalize(embedding)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if vec is None or index is None or index.matrix.shape[1] != vec.shape[0]:
+                self.misses += 1
+                return None
+            now = time.monotonic()
+            row, score = index.search(vec, now)
+            if row < 0 or score < self.threshold:
+                self.misses += 1
+                return None
+            self._scopes.move_to_end(scope)
+            index.last_used[row] = now
+            self.hits += 1
+            return index.values[row]
+
+    def add(self, scope: str, embedding: np.ndarray, value: str) -> None:
+        """Store an answer for embedding in scope, evicting the LRU entry when full."""
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None or index.matrix.shape[1] != vec.shape[0]:
+                index = _ScopeIndex(self.capacity_per_scope, vec.shape[0])
+                self._scopes[scope] = index
+                while len(self._scopes) > self.max_scopes:
+                    _, dropped = self._scopes.popitem(last=False)
+                    self.evictions += dropped.size
+            self._scopes.move_to_end(scope)
+            if index.add(vec, value, time.monotonic(), self.ttl_s):
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Remove all scopes and entries."""
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            size = sum(index.size for index in self._scopes.values())
+            scopes = len(self._scopes)
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "evictions": self.evictions,
+            "size": size,
+            "scopes": scopes,
+        }
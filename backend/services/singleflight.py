@@ -0,0 +1,105 @@
+"""Single-flight: concurrent calls with the same key share one execution and its result.
+
+Works for sync callers (threads wait on the leader) and async callers (tasks await one
+shared task). Counts how many calls were coalesced onto an in-flight leader.
+"""
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """In-flight sync call: followers wait on event, then read result or error."""
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Deduplicate concurrent identical calls (sync and async) by key."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.coalesced = 0
+        self._sync_calls: dict[str, _Call] = {}
+        self._async_calls: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """Run fn once for all threads calling with key at the same time.
+
+        Args:
+            key: Request fingerprint.
+            fn: Zero-argument callable producing the result.
+
+        Returns:
+            The leader's result (followers re-raise the leader's exception).
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._sync_calls[key] = call
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._sync_calls.pop(key, None)
+            call.event.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn once for all tasks calling with key at the same time.
+
+        The shared call runs as its own task, so cancelling one waiter does not
+        cancel it for the others.
+
+        Args:
+            key: Request fingerprint.
+            fn: Zero-argument coroutine function producing the result.
+
+        Returns:
+            The shared result (every waiter re-raises the shared exception).
+        """
+        with self._lock:
+            self.calls += 1
+            task = self._async_calls.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._async_calls[key] = task
+                task.add_done_callback(lambda t: self._finish_async(key, t))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish_async(self, key: str, task: asyncio.Task) -> None:
+        """Drop a finished task and mark its exception retrieved if nobody awaited it."""
+        with self._lock:
+            if self._async_calls.get(key) is task:
+                del self._async_calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """Return total calls, coalesced calls, and calls currently in flight."""
+        with self._lock:
+            inflight = len(self._sync_calls) + len(self._async_calls)
+        return {"calls": self.calls, "coalesced": self.coalesced, "inflight": inflight}
@@ -0,0 +1,105 @@
+"""Startup warm-up of slow-to-initialize dependencies, reported by the readiness probe.
+
+With WARMUP_ENABLED, the app lifespan starts warm-up in the background: it opens a
+Gemini connection and builds LightRAG (imports, storages, pipeline status) so the first
+ingest, generate or coach request does not pay for them. /health/ready answers 503 until
+warm-up has finished, so a platform startup probe (e.g. Cloud Run) keeps traffic off the
+instance meanwhile. A failed step is reported but does not block readiness: the
+dependency falls back to initializing on first use, as it does with warm-up off.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from config import WARMUP_ENABLED
+from services import lightrag as lightrag_service
+from services import llm as llm_service
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Step name -> coroutine function returning False when there is nothing to warm (skipped).
+WarmupStep = Callable[[], Awaitable[bool]]
+
+
+class Warmup:
+    """Runs warm-up steps in order in a background task and records their state and timing."""
+
+    def __init__(self, steps: dict[str, WarmupStep], enabled: bool = False):
+        self.enabled = enabled
+        self.steps = steps
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        # step -> {"state": pending | running | ready | skipped | failed, "duration_s": ..., "error": ...}
+        self.state: dict[str, dict[str, Any]] = {name: {"state": "pending"} for name in steps}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        """True when warm-up is off or has finished (whatever each step's outcome)."""
+        return not self.enabled or self.finished_at > 0
+
+    def start(self) -> None:
+        """Start warm-up in the background (no-op when disabled or already started)."""
+        if not self.enabled or self._task is not None:
+            return
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel warm-up if it is still running (app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        """Run each step, logging and recording failures instead of raising."""
+        for name, step in self.steps.items():
+            state = self.state[name]
+            state["state"] = "running"
+            started = time.monotonic()
+            try:
+                warmed = await step()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed", name, exc_info=True)
+                state.update(state="failed", error=str(e))
+            else:
+                state["state"] = "ready" if warmed else "skipped"
+            state["duration_s"] = round(time.monotonic() - started, 3)
+        self.finished_at = time.monotonic()
+        logger.info("Warm-up finished in %.2fs: %s", self.finished_at - self.started_at, self.state)
+
+    def status(self) -> dict[str, Any]:
+        """Return readiness, per-step state and timings, and total warm-up duration."""
+        if self.finished_at:
+            duration = self.finished_at - self.started_at
+        elif self.started_at:
+            duration = time.monotonic() - self.started_at
+        else:
+            duration = 0.0
+        return {
+            "ready": self.ready,
+            "warmup": "off" if not self.enabled else ("done" if self.finished_at else "running"),
+            "duration_s": round(duration, 3),
+            "steps": self.state,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """Return readiness and warm-up duration as numbers (for /metrics)."""
+        status = self.status()
+        return {"ready": int(status["ready"]), "duration_s": status["duration_s"]}
+
+
+# Process-wide warm-up, started and stopped by the app lifespan.
+warmup = Warmup(
+    {
+        "gemini_client": llm_service.warm_gemini_client,
+        "lightrag": lightrag_service.warm,
+    },
+    enabled=WARMUP_ENABLED,
+)
+metrics.register_stats("warmup", warmup.stats, "Startup warm-up readiness and duration.")
@@ -0,0 +1,29 @@
+"""Shared fixtures: a PostgreSQL session rolled back after each test (skipped without a database)."""
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from db import engine
+
+
+@pytest.fixture
+def db_session():
+    """Yield a session on DATABASE_URL whose commits are rolled back after the test.
+
+    Repository commits release a savepoint inside one outer transaction, so nothing a
+    test writes is persisted. Tests using this fixture are skipped when the database
+    is unreachable.
+    """
+    try:
+        conn = engine.connect()
+    except OperationalError:
+        pytest.skip("PostgreSQL not reachable at DATABASE_URL")
+    trans = conn.begin()
+    session = Session(bind=conn, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        trans.rollback()
+        conn.close()
@@ -0,0 +1,48 @@
+"""Tests for the coach's first-turn semantic cache scope (topic plus failure-fact hints)."""
+
+import numpy as np
+import pytest
+
+from services import coach
+from services.coach_context import CoachContext
+from services.llm_cache import InMemoryLRUCache, ResponseCache
+from services.semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def generated(monkeypatch):
+    """Semantic cache only, every design embedding the same; returns the prompts sent to the LLM."""
+    calls: list[str] = []
+
+    async def embed_texts(texts, task_type="SEMANTIC_SIMILARITY", call_site="lightrag_embed"):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    async def generate_coach_feedback(design_text, conversation_context, rag_snippet, summary):
+        calls.append(rag_snippet)
+        return f"reply for {rag_snippet}"
+
+    monkeypatch.setattr(coach, "coach_cache", ResponseCache(backend=InMemoryLRUCache(), enabled=False))
+    monkeypatch.setattr(coach, "coach_semantic_cache", SemanticCache())
+    monkeypatch.setattr(coach.lightrag_service, "embed_texts", embed_texts)
+    monkeypatch.setattr(coach.llm_service, "generate_coach_feedback", generate_coach_feedback)
+    return calls
+
+
+async def _respond(design: str, rag_snippet: str, topic: str = "caching") -> str:
+    return await coach.respond(CoachContext(design_text=design), rag_snippet, topic, False, True)
+
+
+@pytest.mark.asyncio
+async def test_similar_designs_with_the_same_hints_share_a_reply(generated):
+    first = await _respond("A cache in front of the DB", "Hint: TTLs")
+    assert await _respond("A cache in front of the database", "Hint: TTLs") == first
+    assert generated == ["Hint: TTLs"]
+
+
+@pytest.mark.asyncio
+async def test_replies_are_not_reused_across_different_hints_or_topics(generated):
+    await _respond("A cache in front of the DB", "Hint: TTLs")
+    assert await _respond("A cache in front of the DB", "Hint: stampedes") == "reply for Hint: stampedes"
+    assert await _respond("A cache in front of the DB", "", topic="queues") == "reply for "
+    assert await _respond("A cache in front of the DB", "") == "reply for "
+    assert generated == ["Hint: TTLs", "Hint: stampedes", "", ""]
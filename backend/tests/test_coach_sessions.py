@@ -0,0 +1,74 @@
+"""Tests for streamed coach session turns: per-turn DB session and per-session serialization."""
+
+import asyncio
+
+import pytest
+
+from services import coach_session
+from services.coach_session import CoachSessionStore
+
+
+class FakeDB:
+    """Stands in for a SQLAlchemy session; records whether it was closed."""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def coach(monkeypatch):
+    """Stub the coach service; returns a dict recording DB sessions and prompts used."""
+    seen: dict = {"dbs": [], "prompts": []}
+
+    def session_local():
+        db = FakeDB()
+        seen["dbs"].append(db)
+        return db
+
+    async def load_rag_snippet(db, topic, pressure_test, query=""):
+        assert not db.closed
+        return f"hints for {topic}"
+
+    async def stream_response(ctx, rag_snippet, topic, pressure_test, first_turn):
+        seen["prompts"].append([t["text"] for t in ctx.recent_turns])
+
+        async def chunks():
+            for part in ("Consider ", "failure ", "modes."):
+                await asyncio.sleep(0)
+                yield part
+
+        return chunks()
+
+    monkeypatch.setattr(coach_session, "SessionLocal", session_local)
+    monkeypatch.setattr(coach_session.coach_service, "load_rag_snippet", load_rag_snippet)
+    monkeypatch.setattr(coach_session.coach_service, "stream_response", stream_response)
+    return seen
+
+
+@pytest.mark.asyncio
+async def test_streamed_turn_uses_its_own_db_session_and_closes_it_before_streaming(coach):
+    session = CoachSessionStore().create("A cache in front of the DB", "caching", False)
+    chunks = await coach_session.stream_turn(session, text="What about TTLs?")
+    assert coach["dbs"] == []  # nothing runs until the response streams
+    first = await anext(chunks)
+    assert first == "Consider "
+    assert len(coach["dbs"]) == 1 and coach["dbs"][0].closed
+    rest = [chunk async for chunk in chunks]
+    assert "".join([first, *rest]) == "Consider failure modes."
+    assert [t["role"] for t in session.turns] == ["user", "coach"]
+    assert session.turns[-1]["text"] == "Consider failure modes."
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streamed_turns_on_one_session_do_not_interleave(coach):
+    session = CoachSessionStore().create("A cache in front of the DB", "caching", False)
+
+    async def turn(text):
+        return "".join([c async for c in await coach_session.stream_turn(session, text=text)])
+
+    await asyncio.gather(turn("first"), turn("second"))
+    assert coach["prompts"] == [["first"], ["first", "Consider failure modes.", "second"]]
+    assert all(db.closed for db in coach["dbs"])
@@ -0,0 +1,259 @@
+"""Tests for persisted curriculum jobs: repository claim/requeue/finish and the job runner."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.models import CurriculumJob
+from repositories import CurriculumJobRepository
+from services import curriculum_jobs
+from services.curriculum_jobs import CurriculumJobRunner
+
+
+@pytest.fixture
+def repo(db_session):
+    return CurriculumJobRepository(db_session)
+
+
+@pytest.fixture
+def runner_repo(db_session, monkeypatch):
+    """Route the runner's short-lived sessions to the test session."""
+    monkeypatch.setattr(curriculum_jobs, "_with_repo", lambda fn: fn(CurriculumJobRepository(db_session)))
+    return CurriculumJobRepository(db_session)
+
+
+def _age(repo: CurriculumJobRepository, job_id: str, seconds: float) -> None:
+    """Move a job's heartbeat into the past."""
+    repo.db.query(CurriculumJob).filter(CurriculumJob.id == job_id).update(
+        {"updated_at": datetime.utcnow() - timedelta(seconds=seconds)}
+    )
+    repo.db.commit()
+
+
+def _claimed(repo: CurriculumJobRepository, topic: str = "caching") -> CurriculumJob:
+    """Create a job and claim it, as a worker does before running it."""
+    job = repo.create_many([topic])[0]
+    assert repo.claim(job.id)
+    return job
+
+
+def test_create_many_queues_one_job_per_topic(repo):
+    jobs = repo.create_many(["a", "b"])
+    assert [(j.topic, j.status, j.stage, j.attempts) for j in jobs] == [
+        ("a", "queued", "queued", 0),
+        ("b", "queued", "queued", 0),
+    ]
+
+
+def test_claim_is_atomic_and_counts_attempts(repo):
+    job = repo.create_many(["t"])[0]
+    assert repo.claim(job.id)
+    assert not repo.claim(job.id)
+    repo.db.refresh(job)
+    assert (job.status, job.stage, job.attempts) == ("running", "retrieving", 1)
+    assert job.started_at is not None
+
+
+def test_finish_records_success_or_failure(repo):
+    ok, bad = repo.create_many(["ok", "bad"])
+    repo.claim(ok.id)
+    repo.claim(bad.id)
+    repo.finish(ok.id, draft_ids=["d1", "d2"])
+    repo.finish(bad.id, error="boom")
+    repo.db.refresh(ok)
+    repo.db.refresh(bad)
+    assert (ok.status, ok.stage, ok.draft_ids, ok.error) == ("succeeded", "done", ["d1", "d2"], None)
+    assert (bad.status, bad.error) == ("failed", "boom")
+    assert ok.finished_at is not None
+
+
+def test_requeue_only_affects_running_jobs(repo):
+    running, done = repo.create_many(["running", "done"])
+    repo.claim(running.id)
+    repo.claim(done.id)
+    repo.finish(done.id, draft_ids=[])
+    repo.requeue(running.id)
+    repo.requeue(done.id)
+    repo.db.refresh(running)
+    repo.db.refresh(done)
+    assert (running.status, running.stage) == ("queued", "queued")
+    assert done.status == "succeeded"
+
+
+def test_requeue_stale_requeues_only_jobs_without_a_recent_heartbeat(repo):
+    stale, fresh, queued = repo.create_many(["stale", "fresh", "queued"])
+    repo.claim(stale.id)
+    repo.claim(fresh.id)
+    _age(repo, stale.id, 3600)
+    pending = repo.requeue_stale(timedelta(minutes=15))
+    ours = [job_id for job_id in pending if job_id in {stale.id, fresh.id, queued.id}]
+    assert ours == [stale.id, queued.id]
+    repo.db.refresh(fresh)
+    assert fresh.status == "running"
+
+
+def test_requeue_stale_fails_jobs_that_reached_max_attempts(repo):
+    retried, fresh_start = repo.create_many(["retried", "fresh start"])
+    for _ in range(2):
+        repo.claim(retried.id)
+        repo.requeue(retried.id)
+    repo.claim(retried.id)
+    repo.claim(fresh_start.id)
+    _age(repo, retried.id, 3600)
+    _age(repo, fresh_start.id, 3600)
+    pending = repo.requeue_stale(timedelta(minutes=15), max_attempts=3)
+    repo.db.refresh(retried)
+    repo.db.refresh(fresh_start)
+    assert (retried.status, retried.attempts) == ("failed", 3)
+    assert retried.error == "exceeded max attempts (3)"
+    assert retried.id not in pending
+    assert fresh_start.status == "queued" and fresh_start.id in pending
+
+
+def test_claim_next_takes_the_oldest_queued_job(repo):
+    first, second = repo.create_many(["first", "second"])
+    assert repo.claim_next() == first.id
+    assert repo.claim_next() == second.id
+    assert repo.claim_next() is None
+    repo.db.refresh(first)
+    assert (first.status, first.attempts) == ("running", 1)
+
+
+def test_heartbeat_refreshes_only_running_jobs(repo):
+    running = _claimed(repo, "running")
+    queued = repo.create_many(["queued"])[0]
+    _age(repo, running.id, 3600)
+    _age(repo, queued.id, 3600)
+    repo.heartbeat(running.id)
+    repo.heartbeat(queued.id)
+    pending = repo.requeue_stale(timedelta(minutes=15))
+    repo.db.refresh(running)
+    assert running.status == "running"
+    assert queued.id in pending and running.id not in pending
+
+
+@pytest.mark.asyncio
+async def test_runner_runs_a_job_and_records_drafts(runner_repo, monkeypatch):
+    stages: list[str] = []
+
+    async def generate(db, topic, on_stage=None):
+        await on_stage("retrieving")
+        stages.append(topic)
+        return ["draft-1"]
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job = _claimed(runner_repo)
+    await CurriculumJobRunner(workers=1)._run(job.id)
+    runner_repo.db.refresh(job)
+    assert stages == ["caching"]
+    assert (job.status, job.draft_ids, job.attempts) == ("succeeded", ["draft-1"], 1)
+
+
+@pytest.mark.asyncio
+async def test_runner_marks_a_failing_job_failed(runner_repo, monkeypatch):
+    async def generate(db, topic, on_stage=None):
+        raise ValueError("LightRAG returned no context")
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job = _claimed(runner_repo)
+    await CurriculumJobRunner(workers=1)._run(job.id)
+    runner_repo.db.refresh(job)
+    assert (job.status, job.error) == ("failed", "LightRAG returned no context")
+
+
+@pytest.mark.asyncio
+async def test_runner_keeps_drafts_saved_before_a_failure(runner_repo, monkeypatch):
+    async def generate(db, topic, on_stage=None):
+        await on_stage("generating", ["draft-1", "draft-2"])
+        raise ValueError("stream ended mid-item")
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job = _claimed(runner_repo)
+    await CurriculumJobRunner(workers=1)._run(job.id)
+    runner_repo.db.refresh(job)
+    assert (job.status, job.error) == ("failed", "stream ended mid-item")
+    assert job.draft_ids == ["draft-1", "draft-2"]
+
+
+@pytest.mark.asyncio
+async def test_runner_requeues_a_job_cancelled_by_shutdown(runner_repo, monkeypatch):
+    started = asyncio.Event()
+
+    async def generate(db, topic, on_stage=None):
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job = _claimed(runner_repo)
+    task = asyncio.create_task(CurriculumJobRunner(workers=1)._run(job.id))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    runner_repo.db.refresh(job)
+    assert (job.status, job.stage) == ("queued", "queued")
+
+
+@pytest.mark.asyncio
+async def test_runner_exposes_drafts_saved_so_far(runner_repo, monkeypatch):
+    seen: list[tuple[str, list[str]]] = []
+
+    async def generate(db, topic, on_stage=None):
+        await on_stage("generating", ["draft-1"])
+        job = runner_repo.get(job_id)
+        runner_repo.db.refresh(job)
+        seen.append((job.stage, list(job.draft_ids)))
+        return ["draft-1", "draft-2"]
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job_id = _claimed(runner_repo).id
+    await CurriculumJobRunner(workers=1)._run(job_id)
+    assert seen == [("generating", ["draft-1"])]
+    assert runner_repo.get(job_id).draft_ids == ["draft-1", "draft-2"]
+
+
+async def _wait_for_status(repo: CurriculumJobRepository, job_id: str, status: str) -> CurriculumJob:
+    """Poll the job row until it reaches status (fails after 2s)."""
+    for _ in range(200):
+        job = repo.get(job_id)
+        repo.db.refresh(job)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} stayed {job.status}")
+
+
+@pytest.mark.asyncio
+async def test_workers_claim_and_run_submitted_jobs(runner_repo, monkeypatch):
+    async def generate(db, topic, on_stage=None):
+        return [f"draft-{topic}"]
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    runner = CurriculumJobRunner(workers=1, poll_s=60)
+    await runner.start()
+    try:
+        jobs = await runner.submit(runner_repo.db, ["caching"])
+        job = await _wait_for_status(runner_repo, jobs[0]["id"], "succeeded")
+    finally:
+        await runner.stop()
+    assert (job.draft_ids, job.attempts) == (["draft-caching"], 1)
+
+
+@pytest.mark.asyncio
+async def test_workers_skip_a_job_claimed_elsewhere(runner_repo, monkeypatch):
+    async def generate(db, topic, on_stage=None):
+        raise AssertionError("must not run")
+
+    monkeypatch.setattr(curriculum_jobs, "generate_drafts_for_topic", generate)
+    job = _claimed(runner_repo)
+    runner = CurriculumJobRunner(workers=1, poll_s=60)
+    await runner.start()
+    try:
+        runner._queue.put_nowait(job.id)
+        await runner._queue.join()
+        await asyncio.sleep(0.05)
+    finally:
+        await runner.stop()
+    runner_repo.db.refresh(job)
+    assert (job.status, job.attempts) == ("running", 1)
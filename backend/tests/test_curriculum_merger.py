@@ -0,0 +1,72 @@
+"""Tests for incremental curriculum merging and deduplication (services.curriculum)."""
+
+from services.curriculum import CurriculumMerger, merge_curricula
+
+
+def test_concepts_dedupe_by_id_or_title_keeping_longer_body():
+    merger = CurriculumMerger()
+    first = merger.add("concepts", {"id": "caching", "title": "Caching", "body": "short", "tags": ["a"]})
+    again = merger.add(
+        "concepts", {"id": "cache-strategies", "title": "caching", "body": "a longer body", "tags": ["b"]}
+    )
+    assert first[0] == "concept"
+    assert again[1] is first[1]
+    result = merger.result()
+    assert len(result["concepts"]) == 1
+    concept = result["concepts"][0]
+    assert concept["id"] == "caching"
+    assert concept["body"] == "a longer body"
+    assert concept["tags"] == ["a", "b"]
+
+
+def test_quizzes_merge_one_per_concept_with_questions_deduped_by_text():
+    merger = CurriculumMerger()
+    merger.add("concepts", {"id": "queues", "title": "Message Queues"})
+    first = merger.add("quizzes", {"id": "quiz-1", "conceptId": "Message Queues", "questions": [{"text": "Why?"}]})
+    duplicate = merger.add("quizzes", {"id": "quiz-9", "conceptId": "queues", "questions": [{"text": "why"}]})
+    extended = merger.add(
+        "quizzes", {"id": "quiz-2", "conceptId": "queues", "questions": [{"text": "Why?"}, {"text": "How?"}]}
+    )
+    assert first[1]["conceptId"] == "queues"
+    assert duplicate is None
+    assert extended[1] is first[1]
+    quizzes = merger.result()["quizzes"]
+    assert len(quizzes) == 1
+    assert [q["text"] for q in quizzes[0]["questions"]] == ["Why?", "How?"]
+    assert quizzes[0]["id"] == "quiz-1"
+
+
+def test_failure_facts_dedupe_by_text_and_get_unique_ids():
+    merger = CurriculumMerger()
+    assert merger.add("failure_facts", {"id": "f-1", "fact": "Caches go stale."}) is not None
+    assert merger.add("failure_facts", {"id": "f-2", "fact": "caches  go stale"}) is None
+    second = merger.add("failure_facts", {"id": "f-1", "fact": "Queues back up."})
+    assert second[1]["id"] == "f-1-2"
+    assert [f["id"] for f in merger.result()["failure_facts"]] == ["f-1", "f-1-2"]
+
+
+def test_references_added_before_their_concept_resolve_in_result():
+    merger = CurriculumMerger()
+    merger.add("failure_facts", {"fact": "Hot keys overload one shard.", "concept_id": "Sharding"})
+    merger.add("concepts", {"id": "sharding-basics", "title": "Sharding", "prerequisite_concept_ids": ["Sharding"]})
+    result = merger.result()
+    assert result["failure_facts"][0]["concept_id"] == "sharding-basics"
+    # A concept never lists itself as a prerequisite.
+    assert result["concepts"][0]["prerequisite_concept_ids"] == []
+
+
+def test_unknown_keys_and_non_dict_items_are_ignored():
+    merger = CurriculumMerger()
+    assert merger.add("other", {"id": "x"}) is None
+    assert merger.add("concepts", "not a dict") is None
+    assert merger.count == 0
+
+
+def test_merge_curricula_merges_concepts_before_references():
+    parts = [
+        {"quizzes": [{"id": "q", "conceptId": "Load Balancing", "questions": [{"text": "a"}]}]},
+        {"concepts": [{"id": "lb", "title": "Load Balancing"}]},
+    ]
+    result = merge_curricula(parts)
+    assert [c["id"] for c in result["concepts"]] == ["lb"]
+    assert result["quizzes"][0]["conceptId"] == "lb"
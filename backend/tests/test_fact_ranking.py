@@ -0,0 +1,77 @@
+"""Tests for BM25 ranking of failure facts and its use by the failure fact index."""
+
+import numpy as np
+
+from services.fact_ranking import BM25Index, rank, tokenize
+from services.failure_fact_index import FailureFactIndex
+
+FACTS = [
+    {"id": "f1", "concept_id": "caching", "fact": "Cache entries go stale without a TTL.",
+     "keywords": ["ttl", "expiry"], "tags": ["caching"]},
+    {"id": "f2", "concept_id": "caching", "fact": "A cache stampede overloads the database.",
+     "keywords": ["stampede", "thundering herd"], "tags": ["caching", "load"]},
+    {"id": "f3", "concept_id": "queues", "fact": "Unbounded queues hide overload until memory runs out.",
+     "keywords": ["backpressure"], "tags": ["queues"]},
+    {"id": "g1", "concept_id": None, "fact": "Single points of failure take the system down.",
+     "keywords": ["redundancy"], "tags": ["availability"]},
+]
+
+
+def test_tokenize_drops_stopwords_short_terms_and_punctuation():
+    assert tokenize("What is a Cache-TTL, and why?") == ["cache", "ttl"]
+    assert tokenize("") == []
+
+
+def test_scores_are_zero_for_docs_without_a_matching_term():
+    scores = BM25Index(FACTS).scores("backpressure")
+    assert scores[2] > 0
+    assert scores[[0, 1, 3]].tolist() == [0.0, 0.0, 0.0]
+
+
+def test_keyword_matches_outweigh_fact_text_matches():
+    docs = [
+        {"fact": "we retry on stampede", "keywords": [], "tags": []},
+        {"fact": "we retry on errors", "keywords": ["stampede"], "tags": []},
+    ]
+    scores = BM25Index(docs).scores("stampede")
+    assert scores[1] > scores[0] > 0
+
+
+def test_rare_terms_weigh_more_than_common_ones():
+    scores = BM25Index(FACTS).scores("cache stampede")
+    # "stampede" only appears in f2; "cache" appears in f1 and f2.
+    assert scores[1] > scores[0] > 0
+
+
+def test_match_scores_mark_docs_without_a_match_as_minus_inf():
+    scores = BM25Index(FACTS).match_scores("backpressure")
+    assert scores[2] > 0
+    assert np.isneginf(scores[[0, 1, 3]]).all()
+
+
+def test_rank_single_signal_sorts_matches_first_and_keeps_candidate_order():
+    scores = np.asarray([-np.inf, 0.5, -np.inf, 2.0], dtype=np.float32)
+    assert rank([scores], 4).tolist() == [3, 1, 0, 2]
+    assert rank([scores], 1).tolist() == [3]
+
+
+def test_rank_fuses_signals_by_reciprocal_rank():
+    bm25 = np.asarray([3.0, 2.0, -np.inf, -np.inf], dtype=np.float32)
+    vectors = np.asarray([0.1, 0.9, 0.8, -np.inf], dtype=np.float32)
+    # 1 is ranked high by both signals; 2 only by similarity; 3 by neither.
+    assert rank([bm25, vectors], 4).tolist() == [1, 0, 2, 3]
+
+
+def test_index_lookup_ranks_concept_and_global_facts_by_query():
+    index = FailureFactIndex()
+    index.build(FACTS, version=1)
+    assert [h["id"] for h in index.lookup("caching", limit=2, query="no redundancy anywhere")] == ["g1", "f1"]
+    assert [h["id"] for h in index.lookup("caching", limit=2)] == ["f1", "f2"]
+    assert [h["id"] for h in index.lookup(None, limit=2, query="stampede")] == ["g1"]
+    assert "concept_id" not in index.lookup("queues", limit=1)[0]
+
+
+def test_index_lookup_keeps_id_order_when_ranking_is_off():
+    index = FailureFactIndex(ranking=False)
+    index.build(FACTS, version=1)
+    assert [h["id"] for h in index.lookup("caching", limit=2, query="redundancy")] == ["f1", "f2"]
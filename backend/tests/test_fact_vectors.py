@@ -0,0 +1,173 @@
+"""Tests for the memory-mapped failure fact vectors: incremental rebuilds and manifest swaps."""
+
+import asyncio
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services import fact_vectors as fv
+from services import lightrag as lightrag_service
+from services.fact_vectors import MANIFEST_NAME, FactVectorIndex, fact_text
+from services.metrics import metrics
+
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    """Deterministic fake embedding of text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def _fact(fact_id: str, text: str) -> dict:
+    return {"id": fact_id, "fact": text, "promptHint": "", "keywords": []}
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Fake embeddings; returns the list of text batches sent to the embedding API."""
+    calls: list[list[str]] = []
+
+    async def embed_texts(texts, task_type="RETRIEVAL_DOCUMENT", call_site="lightrag"):
+        calls.append(list(texts))
+        return np.stack([_vector(t) for t in texts])
+
+    monkeypatch.setattr(fv.lightrag_service, "embed_texts", embed_texts)
+    return calls
+
+
+@pytest.fixture
+def facts(monkeypatch):
+    """Mutable list of facts returned by the (stubbed) failure fact table."""
+    current: list[dict] = []
+    monkeypatch.setattr(fv, "_load_facts", lambda: list(current))
+    return current
+
+
+@pytest.mark.asyncio
+async def test_rebuild_embeds_only_new_or_edited_facts(tmp_path, facts, embedded):
+    index = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    facts[:] = [_fact("a", "stale cache"), _fact("b", "stampede"), _fact("c", "no backpressure")]
+    assert await index.rebuild() == 3
+    old_b = np.array(index._matrix[index._row_of["b"]])
+
+    facts[:] = [_fact("a", "stale cache without TTL"), _fact("b", "stampede"), _fact("d", "single point")]
+    assert await index.rebuild() == 2
+    assert embedded[-1] == [fact_text(facts[0]), fact_text(facts[2])]
+    assert index._ids == ["a", "b", "d"]
+    assert index.version == 2
+    np.testing.assert_allclose(index._matrix[index._row_of["b"]], old_b, rtol=1e-6)
+    expected_a = _vector(fact_text(facts[0]))
+    np.testing.assert_allclose(index._matrix[0], expected_a / np.linalg.norm(expected_a), rtol=1e-6)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_without_changes_embeds_nothing(tmp_path, facts, embedded):
+    index = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    facts[:] = [_fact("a", "stale cache")]
+    await index.rebuild()
+    assert await index.rebuild() == 0
+    assert len(embedded) == 1
+    assert index.version == 1
+
+
+@pytest.mark.asyncio
+async def test_other_workers_pick_up_a_new_manifest(tmp_path, facts, embedded):
+    writer = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    reader = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    facts[:] = [_fact("a", "stale cache"), _fact("b", "stampede")]
+    await writer.rebuild()
+
+    assert await reader.reload()
+    assert (reader.version, reader._ids) == (1, ["a", "b"])
+    rows = reader.rows_for(facts)
+    query = _vector(fact_text(facts[1]))
+    scores = reader.candidate_scores(facts, np.arange(2), query)
+    assert int(np.argmax(scores)) == 1 and scores[1] == pytest.approx(1.0, abs=1e-5)
+
+    facts.append(_fact("c", "unbounded queue"))
+    await writer.rebuild()
+    assert await reader.reload()
+    assert (reader.version, reader._ids) == (2, ["a", "b", "c"])
+    assert not await reader.reload()
+    assert reader.rows_for(facts) is not rows
+    # Only the current matrix is kept next to the manifest (and the rebuild lock file).
+    matrices = [p.name for p in tmp_path.glob("failure_facts.v*.npy*")]
+    assert len(matrices) == 1 and matrices[0].startswith("failure_facts.v2.")
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+
+@pytest.mark.asyncio
+async def test_background_poll_maps_new_matrices_and_lookups_never_read_the_disk(
+    tmp_path, facts, embedded, monkeypatch
+):
+    writer = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    reader = FactVectorIndex(str(tmp_path), refresh_s=0.01, enabled=True)
+    facts[:] = [_fact("a", "stale cache")]
+    await reader.start()
+    try:
+        await writer.rebuild()
+        for _ in range(100):
+            if reader.version == 1:
+                break
+            await asyncio.sleep(0.01)
+        assert reader.ready and reader.version == 1
+    finally:
+        await reader.stop()
+
+    def no_disk(known_mtime):
+        raise AssertionError("lookup read the manifest")
+
+    monkeypatch.setattr(reader, "_read", no_disk)
+    query = await reader.embed_query("stale cache")
+    assert reader.candidate_scores(facts, np.arange(1), query)[0] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_rebuilds_in_two_workers_embed_once(tmp_path, facts, embedded):
+    first = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    second = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    facts[:] = [_fact("a", "stale cache"), _fact("b", "stampede")]
+    results = await asyncio.gather(first.rebuild(), second.rebuild())
+    assert sorted(results) == [0, 2]
+    assert len(embedded) == 1
+    assert first.version == second.version == 1
+
+
+@pytest.mark.asyncio
+async def test_lookups_ignore_vectors_until_a_matrix_exists(tmp_path, facts):
+    index = FactVectorIndex(str(tmp_path), refresh_s=0, enabled=True)
+    facts[:] = [_fact("a", "stale cache")]
+    assert not index.ready
+    assert index.candidate_scores(facts, np.arange(1), np.ones(DIM, dtype=np.float32)) is None
+    assert await index.embed_query("stale cache") is None
+
+
+def _input_tokens(call_site: str) -> float:
+    """Return llm_input_tokens_total for call_site from the metrics exposition."""
+    prefix = f'llm_input_tokens_total{{call_site="{call_site}"}} '
+    lines = [line for line in metrics.render().splitlines() if line.startswith(prefix)]
+    return float(lines[0][len(prefix):]) if lines else 0.0
+
+
+@pytest.mark.parametrize(
+    ("statistics", "expected"),
+    [
+        (None, 3 + 1),  # Gemini API: estimated at about four characters per token
+        (SimpleNamespace(token_count=7.0), 14),  # Vertex AI: reported per embedding
+    ],
+)
+@pytest.mark.asyncio
+async def test_embed_texts_records_input_tokens(monkeypatch, statistics, expected):
+    async def embed_content(model, contents, config):
+        embeddings = [SimpleNamespace(values=[0.0] * DIM, statistics=statistics) for _ in contents]
+        return SimpleNamespace(embeddings=embeddings)
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(embed_content=embed_content)))
+    monkeypatch.setattr(lightrag_service.llm_service, "get_gemini_client", lambda: client)
+    before = _input_tokens("coach")
+    vectors = await lightrag_service.embed_texts(["stale cache", "ttl"], call_site="coach")
+    assert vectors.shape == (2, DIM)
+    assert _input_tokens("coach") - before == expected
@@ -0,0 +1,194 @@
+"""Tests for PDF ingest: segment grouping, batched LightRAG inserts and spool cleanup."""
+
+import asyncio
+import io
+import threading
+
+import pymupdf
+import pytest
+from fastapi import UploadFile
+
+from services import ingest
+from services.extraction import ExtractionPool
+
+
+def _pdf(pages: list[str]) -> bytes:
+    """Return a PDF with one page per text."""
+    doc = pymupdf.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class FakeDocRepository:
+    """Stands in for IngestedDocRepository; keeps rows by doc_id."""
+
+    rows: dict[str, dict] = {}
+
+    def __init__(self, db):
+        pass
+
+    def add(self, doc_id, name, type, segments=1, status="ingested"):
+        self.rows[doc_id] = {"name": name, "type": type, "segments": segments, "status": status}
+
+    def set_progress(self, doc_id, segments, status):
+        self.rows[doc_id].update(segments=segments, status=status)
+
+    def delete(self, doc_id):
+        self.rows.pop(doc_id, None)
+
+    def add_many(self, docs):
+        for doc_id, name, type in docs:
+            self.add(doc_id, name, type)
+        FakeDocRepository.rows_thread = threading.get_ident()
+
+
+@pytest.fixture
+def inserted(monkeypatch, tmp_path):
+    """Run extraction inline, spool to tmp_path and record LightRAG insert batches of (id, text)."""
+    calls: list[list[tuple[str, str]]] = []
+
+    async def insert_many(docs, batch_size=None):
+        calls.append(list(docs))
+        return {}
+
+    monkeypatch.setattr(ingest, "extraction_pool", ExtractionPool(enabled=False))
+    monkeypatch.setattr(ingest, "INGEST_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest, "INGEST_PDF_SEGMENT_CHARS", 40)
+    monkeypatch.setattr(ingest, "LIGHTRAG_INSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(ingest.lightrag_service, "insert_many", insert_many)
+    monkeypatch.setattr(ingest, "IngestedDocRepository", FakeDocRepository)
+    FakeDocRepository.rows = {}
+    return calls
+
+
+async def _segments(path: str) -> list[str]:
+    return [s async for s in ingest.extract_pdf_segments(path)]
+
+
+@pytest.mark.asyncio
+async def test_segments_group_pages_up_to_the_size_limit(inserted, tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(_pdf(["page one", "page two", "a much longer third page of text here", ""]))
+    assert await _segments(str(path)) == [
+        "page one\n\npage two",
+        "a much longer third page of text here",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_inserts_segments_in_batches_and_records_the_document(inserted, tmp_path):
+    upload = UploadFile(io.BytesIO(_pdf(["first " * 8, "second " * 8, "third"])), filename="notes.pdf")
+    result = await ingest.ingest_pdf(None, upload)
+    doc_id = result["doc_id"]
+    assert [[name for name, _ in batch] for batch in inserted] == [[doc_id, f"{doc_id}-1"], [f"{doc_id}-2"]]
+    assert inserted[1][0][1] == "third"
+    assert result["segments"] == 3
+    assert FakeDocRepository.rows == {
+        doc_id: {"name": "notes.pdf", "type": "pdf", "segments": 3, "status": "ingested"}
+    }
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_without_text_fails_and_removes_the_spool_file(inserted, tmp_path):
+    upload = UploadFile(io.BytesIO(_pdf([""])), filename="blank.pdf")
+    with pytest.raises(ValueError, match="No text extracted"):
+        await ingest.ingest_pdf(None, upload)
+    assert inserted == [] and FakeDocRepository.rows == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_failing_after_a_batch_is_recorded_as_partial(inserted, monkeypatch, tmp_path):
+    batches: list[list[str]] = []
+
+    async def insert_many(docs, batch_size=None):
+        batches.append([doc_id for doc_id, _ in docs])
+        return {doc_id: "quota exceeded" for doc_id, _ in docs} if len(batches) == 2 else {}
+
+    monkeypatch.setattr(ingest.lightrag_service, "insert_many", insert_many)
+    upload = UploadFile(io.BytesIO(_pdf(["first " * 8, "second " * 8, "third"])), filename="notes.pdf")
+    with pytest.raises(ValueError, match="Insert failed: quota exceeded"):
+        await ingest.ingest_pdf(None, upload)
+    [(doc_id, row)] = FakeDocRepository.rows.items()
+    # The rejected batch may be partly indexed, so its segments are counted too.
+    assert (row["segments"], row["status"]) == (3, "partial")
+    assert ingest.segment_ids(doc_id, row["segments"]) == batches[0] + batches[1]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_failing_before_any_insert_leaves_no_record(inserted, monkeypatch, tmp_path):
+    async def iter_pdf_pages(path):
+        raise ValueError("PDF extraction timed out")
+        yield []
+
+    monkeypatch.setattr(ingest.extraction_pool, "iter_pdf_pages", iter_pdf_pages)
+    upload = UploadFile(io.BytesIO(_pdf(["only page"])), filename="notes.pdf")
+    with pytest.raises(ValueError, match="timed out"):
+        await ingest.ingest_pdf(None, upload)
+    assert inserted == [] and FakeDocRepository.rows == {}
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_cancelled_mid_batch_is_recorded_as_partial(inserted, monkeypatch, tmp_path):
+    started = asyncio.Event()
+
+    async def insert_many(docs, batch_size=None):
+        if docs[0][0].endswith("-2"):
+            started.set()
+            await asyncio.sleep(60)
+        return {}
+
+    monkeypatch.setattr(ingest.lightrag_service, "insert_many", insert_many)
+    upload = UploadFile(io.BytesIO(_pdf(["first " * 8, "second " * 8, "third"])), filename="notes.pdf")
+    task = asyncio.create_task(ingest.ingest_pdf(None, upload))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    [row] = FakeDocRepository.rows.values()
+    assert (row["segments"], row["status"]) == (3, "partial")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_ingest_pdf_removes_the_spool_file_when_recording_fails(inserted, monkeypatch, tmp_path):
+    def add(self, **row):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(FakeDocRepository, "add", add)
+    upload = UploadFile(io.BytesIO(_pdf(["only page"])), filename="notes.pdf")
+    with pytest.raises(RuntimeError, match="database is down"):
+        await ingest.ingest_pdf(None, upload)
+    assert inserted == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_segment_ids_keep_the_doc_id_for_the_first_segment():
+    assert ingest.segment_ids("d", 1) == ["d"]
+    assert ingest.segment_ids("d", 3) == ["d", "d-1", "d-2"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_urls_reports_each_url_and_records_inserted_ones(inserted, monkeypatch):
+    texts = {"https://a.example/": "page a", "https://b.example/": "", "https://c.example/": "page c"}
+
+    async def extract_url_text(url):
+        return texts[url]
+
+    async def insert_many(docs, batch_size=None):
+        return {doc_id: "quota exceeded" for doc_id, text in docs if text == "page c"}
+
+    monkeypatch.setattr(ingest, "extract_url_text", extract_url_text)
+    monkeypatch.setattr(ingest.lightrag_service, "insert_many", insert_many)
+    results = await ingest.ingest_urls(None, list(texts))
+    assert [r.get("error") for r in results] == [None, "No text extracted", "Insert failed: quota exceeded"]
+    assert [row["name"] for row in FakeDocRepository.rows.values()] == ["https://a.example/"]
+    assert results[0]["doc_id"] in FakeDocRepository.rows
+    # The DB write runs in a worker thread, not on the event loop.
+    assert FakeDocRepository.rows_thread != threading.get_ident()
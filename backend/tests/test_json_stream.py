@@ -0,0 +1,100 @@
+"""Tests for the incremental curriculum JSON parser (services.json_stream)."""
+
+import json
+
+import pytest
+
+from services.json_stream import ArrayItemParser
+
+PAYLOAD = {
+    "concepts": [
+        {"id": "c1", "title": "Caching", "body": 'Say "cache {aside}" [twice] \\ then \\"stop\\"'},
+        {"id": "c2", "title": "Queues", "tags": ["a", "b"], "meta": {"nested": [1, {"x": "}"}]}},
+    ],
+    "quizzes": [{"id": "q1", "conceptId": "c1", "questions": [{"text": "Why {?}"}]}],
+    "failure_facts": [],
+}
+
+
+def _feed_all(parser: ArrayItemParser, chunks: list[str]) -> list[tuple[str, dict]]:
+    items = []
+    for chunk in chunks:
+        items += parser.feed(chunk)
+    return items
+
+
+def _expected() -> list[tuple[str, dict]]:
+    return [(key, item) for key, items in PAYLOAD.items() for item in items]
+
+
+def test_whole_document_in_one_chunk():
+    parser = ArrayItemParser()
+    assert _feed_all(parser, [json.dumps(PAYLOAD)]) == _expected()
+    assert parser.complete
+    assert parser.skipped == 0
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16])
+def test_items_split_across_chunk_boundaries(size):
+    text = json.dumps(PAYLOAD)
+    parser = ArrayItemParser()
+    items = _feed_all(parser, [text[i : i + size] for i in range(0, len(text), size)])
+    assert items == _expected()
+    assert parser.complete
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    text = json.dumps(PAYLOAD)
+    end_of_first = text.index("}, {") + 1
+    parser = ArrayItemParser()
+    assert parser.feed(text[:end_of_first]) == [("concepts", PAYLOAD["concepts"][0])]
+    assert not parser.complete
+
+
+def test_escaped_quotes_and_braces_inside_strings():
+    item = {"id": "x", "body": 'a \\"} not the end {[ "', "title": "\\\\"}
+    parser = ArrayItemParser()
+    assert parser.feed(json.dumps({"concepts": [item]})) == [("concepts", item)]
+
+
+def test_escape_split_across_chunks():
+    text = json.dumps({"concepts": [{"id": "x", "body": 'q"}'}]})
+    split = text.index("\\") + 1  # chunk ends right after the backslash
+    parser = ArrayItemParser()
+    items = _feed_all(parser, [text[:split], text[split:]])
+    assert items == [("concepts", {"id": "x", "body": 'q"}'})]
+
+
+def test_leading_code_fence_and_trailing_text_are_ignored():
+    text = "```json\n" + json.dumps(PAYLOAD) + "\n```\n{\"concepts\": [{\"id\": \"late\"}]}"
+    parser = ArrayItemParser()
+    assert _feed_all(parser, [text]) == _expected()
+    assert parser.complete
+
+
+def test_truncated_input_yields_only_complete_items():
+    text = json.dumps(PAYLOAD)
+    cut = text.index('"id": "c2"') + 5
+    parser = ArrayItemParser()
+    assert _feed_all(parser, [text[:cut]]) == [("concepts", PAYLOAD["concepts"][0])]
+    assert not parser.complete
+
+
+def test_malformed_and_non_object_elements_are_skipped():
+    text = '{"concepts": [1, "s", {"id": "ok"}, {"id": bad}, {"id": "ok2"}]}'
+    parser = ArrayItemParser()
+    assert parser.feed(text) == [("concepts", {"id": "ok"}), ("concepts", {"id": "ok2"})]
+    assert parser.skipped == 1
+    assert parser.complete
+
+
+def test_nested_arrays_do_not_emit_inner_objects():
+    text = '{"concepts": [{"id": "a", "sub": [{"id": "inner"}]}]}'
+    assert ArrayItemParser().feed(text) == [("concepts", {"id": "a", "sub": [{"id": "inner"}]})]
+
+
+def test_feed_after_complete_is_ignored():
+    parser = ArrayItemParser()
+    parser.feed('{"concepts": []}')
+    assert parser.complete
+    assert parser.feed('{"concepts": [{"id": "x"}]}') == []
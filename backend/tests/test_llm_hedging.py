@@ -0,0 +1,143 @@
+"""Tests for hedged LLM requests and the hedge policy (services.llm_hedging)."""
+
+import asyncio
+
+import pytest
+
+from services.fake_llm import AsyncFakeLLM, FakeBehavior, FakeLLMError, _fake_text
+from services.llm_hedging import HedgedLLM, HedgePolicy
+
+
+class LabeledLLM(AsyncFakeLLM):
+    """AsyncFakeLLM with fixed latency whose replies name the provider; counts calls and cancellations."""
+
+    def __init__(self, label: str, latency_ms: float, error_rate: float = 0.0):
+        super().__init__(FakeBehavior(latency_ms=latency_ms, distribution="fixed", error_rate=error_rate))
+        self.label = label
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_text(self, system_instruction: str, user_content: str, **kwargs) -> str:
+        self.calls += 1
+        try:
+            text = await super().generate_text(system_instruction, user_content, **kwargs)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"{self.label}: {text}"
+
+    async def stream_text(self, system_instruction: str, user_content: str, **kwargs):
+        self.calls += 1
+        prefix = f"{self.label}: "
+        try:
+            async for chunk in super().stream_text(system_instruction, user_content, **kwargs):
+                yield prefix + chunk
+                prefix = ""
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _hedged(primary: AsyncFakeLLM, hedge: AsyncFakeLLM, **policy) -> HedgedLLM:
+    defaults = {"initial_delay_s": 0.05, "min_delay_s": 0.01, "min_samples": 3, "max_ratio": 1.0}
+    return HedgedLLM(primary, hedge, call_site="test", policy=HedgePolicy(**{**defaults, **policy}))
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary, hedge = LabeledLLM("primary", 0), LabeledLLM("hedge", 0)
+    llm = _hedged(primary, hedge)
+    assert (await llm.generate_text("sys", "p")).startswith("primary:")
+    assert hedge.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_the_loser_cancelled():
+    primary, hedge = LabeledLLM("primary", 5000), LabeledLLM("hedge", 0)
+    llm = _hedged(primary, hedge)
+    result = await asyncio.wait_for(llm.generate_text("sys", "p"), timeout=2)
+    assert result.startswith("hedge:")
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_primary_that_wins_after_the_hedge_started_cancels_the_hedge():
+    primary, hedge = LabeledLLM("primary", 100), LabeledLLM("hedge", 5000)
+    llm = _hedged(primary, hedge)
+    assert (await asyncio.wait_for(llm.generate_text("sys", "p"), timeout=2)).startswith("primary:")
+    assert hedge.calls == 1
+    assert hedge.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_is_hedged_immediately():
+    primary, hedge = LabeledLLM("primary", 0, error_rate=1.0), LabeledLLM("hedge", 0)
+    llm = _hedged(primary, hedge, initial_delay_s=10.0)
+    result = await asyncio.wait_for(llm.generate_text("sys", "p"), timeout=2)
+    assert result.startswith("hedge:")
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raise_the_primary_error():
+    primary = LabeledLLM("primary", 0, error_rate=1.0)
+    hedge = LabeledLLM("hedge", 0, error_rate=1.0)
+    with pytest.raises(FakeLLMError):
+        await _hedged(primary, hedge).generate_text("sys", "p")
+    assert hedge.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_caps_the_hedge_rate():
+    primary, hedge = LabeledLLM("primary", 100), LabeledLLM("hedge", 0)
+    # One banked hedge, and each request earns only a tenth of another.
+    llm = _hedged(primary, hedge, max_ratio=0.1)
+    results = [await llm.generate_text("sys", f"p{i}") for i in range(3)]
+    assert [r.split(":")[0] for r in results] == ["hedge", "primary", "primary"]
+    assert hedge.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_first_chunk_is_hedged_for_streams():
+    primary, hedge = LabeledLLM("primary", 5000), LabeledLLM("hedge", 0)
+    llm = _hedged(primary, hedge)
+
+    async def collect() -> str:
+        return "".join([c async for c in llm.stream_text("sys", "p")])
+
+    text = await asyncio.wait_for(collect(), timeout=2)
+    # The whole reply comes from the winning stream; the slow primary stream was closed.
+    assert text == "hedge: " + _fake_text("sys", "p", 256)
+    assert primary.cancelled == 1
+
+
+def test_delay_uses_initial_value_until_enough_samples():
+    policy = HedgePolicy(percentile=50, initial_delay_s=2.0, min_delay_s=0.0, min_samples=3)
+    policy.record("text", 0.1)
+    policy.record("text", 0.3)
+    assert policy.delay("text") == 2.0
+    policy.record("text", 0.2)
+    assert policy.delay("text") == pytest.approx(0.2)
+    assert policy.delay("json") == 2.0
+
+
+def test_delay_tracks_the_configured_percentile_with_a_floor():
+    policy = HedgePolicy(percentile=95, initial_delay_s=1.0, min_delay_s=0.05, min_samples=1)
+    for ms in range(1, 101):
+        policy.record("text", ms / 1000)
+    assert policy.delay("text") == pytest.approx(0.095)
+    floored = HedgePolicy(percentile=50, min_delay_s=0.5, min_samples=1)
+    floored.record("text", 0.01)
+    assert floored.delay("text") == 0.5
+
+
+def test_budget_is_earned_per_request_and_capped():
+    policy = HedgePolicy(max_ratio=0.5)
+    assert policy.take()
+    assert not policy.take()
+    policy.on_request()
+    assert not policy.take()
+    policy.on_request()
+    assert policy.take()
+    for _ in range(100):
+        policy.on_request()
+    assert policy.stats()["budget"] == 10.0
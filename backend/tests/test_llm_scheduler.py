@@ -0,0 +1,181 @@
+"""Tests for the priority LLM scheduler and its token bucket (services.llm_scheduler)."""
+
+import asyncio
+
+import pytest
+
+from services import llm_scheduler as scheduler_module
+from services.llm_scheduler import LLMScheduler, TokenBucket
+
+
+class FakeClock:
+    """Manually advanced stand-in for time.monotonic."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _hold(scheduler: LLMScheduler, call_site: str, entered: list[str], name: str, release: asyncio.Event):
+    async with scheduler.slot(call_site):
+        entered.append(name)
+        await release.wait()
+
+
+async def _settle() -> None:
+    """Let every ready task run until it blocks again."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _in_flight(scheduler: LLMScheduler) -> dict[str, int]:
+    return {name: c["in_flight"] for name, c in scheduler.stats()["classes"].items()}
+
+
+@pytest.mark.asyncio
+async def test_interactive_waiters_are_served_before_earlier_background_waiters():
+    scheduler = LLMScheduler(max_concurrency=1, background_max_concurrency=1)
+    entered: list[str] = []
+    releases = {name: asyncio.Event() for name in ("holder", "bg", "coach")}
+    tasks = [asyncio.create_task(_hold(scheduler, "curriculum", entered, "holder", releases["holder"]))]
+    await _settle()
+    tasks.append(asyncio.create_task(_hold(scheduler, "lightrag_llm", entered, "bg", releases["bg"])))
+    await _settle()
+    tasks.append(asyncio.create_task(_hold(scheduler, "coach", entered, "coach", releases["coach"])))
+    await _settle()
+    assert entered == ["holder"]
+
+    releases["holder"].set()
+    await _settle()
+    assert entered == ["holder", "coach"]
+    releases["coach"].set()
+    await _settle()
+    assert entered == ["holder", "coach", "bg"]
+    releases["bg"].set()
+    await asyncio.gather(*tasks)
+    assert _in_flight(scheduler) == {"interactive": 0, "background": 0}
+
+
+@pytest.mark.asyncio
+async def test_background_cap_leaves_room_for_interactive_calls():
+    scheduler = LLMScheduler(max_concurrency=3, background_max_concurrency=2)
+    entered: list[str] = []
+    release = asyncio.Event()
+    tasks = [
+        asyncio.create_task(_hold(scheduler, "curriculum", entered, f"bg{i}", release)) for i in range(3)
+    ]
+    await _settle()
+    assert entered == ["bg0", "bg1"]
+    tasks.append(asyncio.create_task(_hold(scheduler, "coach", entered, "coach", release)))
+    await _settle()
+    assert entered == ["bg0", "bg1", "coach"]
+    assert scheduler.stats()["classes"]["background"]["queue_depth"] == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert entered[-1] == "bg2"
+    assert _in_flight(scheduler) == {"interactive": 0, "background": 0}
+
+
+@pytest.mark.asyncio
+async def test_global_cap_applies_to_interactive_calls():
+    scheduler = LLMScheduler(max_concurrency=2, background_max_concurrency=1)
+    entered: list[str] = []
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(_hold(scheduler, "coach", entered, f"c{i}", release)) for i in range(3)]
+    await _settle()
+    assert entered == ["c0", "c1"]
+    release.set()
+    await asyncio.gather(*tasks)
+    assert entered == ["c0", "c1", "c2"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped_and_does_not_leak_a_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    entered: list[str] = []
+    release = asyncio.Event()
+    holder = asyncio.create_task(_hold(scheduler, "coach", entered, "holder", asyncio.Event()))
+    await _settle()
+    cancelled = asyncio.create_task(_hold(scheduler, "coach", entered, "cancelled", release))
+    waiter = asyncio.create_task(_hold(scheduler, "coach", entered, "waiter", release))
+    await _settle()
+    cancelled.cancel()
+    await _settle()
+    assert cancelled.cancelled()
+
+    holder.cancel()
+    await _settle()
+    assert entered == ["holder", "waiter"]
+    release.set()
+    await waiter
+    assert _in_flight(scheduler) == {"interactive": 0, "background": 0}
+    assert scheduler.stats()["classes"]["interactive"]["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_after_its_grant_releases_the_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    entered: list[str] = []
+    release = asyncio.Event()
+    holder_done = asyncio.Event()
+
+    async def holder() -> None:
+        async with scheduler.slot("coach"):
+            await holder_done.wait()
+        # The slot was just handed to `granted`; cancel it before it resumes.
+        granted.cancel()
+
+    holder_task = asyncio.create_task(holder())
+    await _settle()
+    granted = asyncio.create_task(_hold(scheduler, "coach", entered, "granted", release))
+    await _settle()
+    holder_done.set()
+    await holder_task
+    with pytest.raises(asyncio.CancelledError):
+        await granted
+    assert entered == []
+    assert _in_flight(scheduler) == {"interactive": 0, "background": 0}
+
+    # The freed slot is usable.
+    release.set()
+    await _hold(scheduler, "coach", entered, "next", release)
+    assert entered == ["next"]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_delays_calls_beyond_the_burst(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    scheduler = LLMScheduler(max_concurrency=10, rate_per_s=10.0, burst=2)
+    entered: list[str] = []
+    release = asyncio.Event()
+    release.set()
+    tasks = [asyncio.create_task(_hold(scheduler, "coach", entered, f"c{i}", release)) for i in range(3)]
+    await _settle()
+    assert entered == ["c0", "c1"]
+
+    # The third call is granted by the dispatch timer once a token has accrued.
+    clock.now += 0.1
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=2)
+    assert entered == ["c0", "c1", "c2"]
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    bucket = TokenBucket(rate_per_s=2.0, burst=2)
+    assert bucket.take() == 0.0
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+    clock.now += 60
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+
+
+def test_token_bucket_with_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate_per_s=0.0, burst=1)
+    assert all(bucket.take() == 0.0 for _ in range(100))
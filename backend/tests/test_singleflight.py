@@ -0,0 +1,159 @@
+"""Tests for async single-flight request coalescing (services.singleflight)."""
+
+import asyncio
+import gc
+import threading
+import time
+
+import pytest
+
+from services.fake_llm import AsyncFakeLLM, FakeBehavior, FakeLLMError
+from services.llm_provider import _fingerprint
+from services.singleflight import SingleFlight
+
+
+class CountingLLM(AsyncFakeLLM):
+    """AsyncFakeLLM that counts calls and records whether a call was cancelled."""
+
+    def __init__(self, latency_ms: float = 20.0, error_rate: float = 0.0):
+        super().__init__(FakeBehavior(latency_ms=latency_ms, distribution="fixed", error_rate=error_rate))
+        self.calls = 0
+        self.cancelled = 0
+
+    async def generate_text(self, system_instruction: str, user_content: str, **kwargs) -> str:
+        self.calls += 1
+        try:
+            return await super().generate_text(system_instruction, user_content, **kwargs)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flight, llm = SingleFlight(), CountingLLM()
+    results = await asyncio.gather(
+        *(flight.do_async("k", lambda: llm.generate_text("sys", "prompt")) for _ in range(5))
+    )
+    assert llm.calls == 1
+    assert len(set(results)) == 1
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "inflight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    flight, llm = SingleFlight(), CountingLLM()
+    a, b = await asyncio.gather(
+        flight.do_async("a", lambda: llm.generate_text("sys", "a")),
+        flight.do_async("b", lambda: llm.generate_text("sys", "b")),
+    )
+    assert llm.calls == 2
+    assert a != b
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_are_not_cached():
+    flight, llm = SingleFlight(), CountingLLM(latency_ms=0)
+    await flight.do_async("k", lambda: llm.generate_text("sys", "p"))
+    await flight.do_async("k", lambda: llm.generate_text("sys", "p"))
+    assert llm.calls == 2
+    assert flight.stats()["coalesced"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_error_is_raised_to_every_waiter():
+    flight, llm = SingleFlight(), CountingLLM(error_rate=1.0)
+    results = await asyncio.gather(
+        *(flight.do_async("k", lambda: llm.generate_text("sys", "p")) for _ in range(3)),
+        return_exceptions=True,
+    )
+    assert llm.calls == 1
+    assert all(isinstance(r, FakeLLMError) for r in results)
+    assert flight.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_does_not_cancel_the_shared_call():
+    flight, llm = SingleFlight(), CountingLLM()
+    first = asyncio.create_task(flight.do_async("k", lambda: llm.generate_text("sys", "p")))
+    second = asyncio.create_task(flight.do_async("k", lambda: llm.generate_text("sys", "p")))
+    await asyncio.sleep(0)
+    first.cancel()
+    result = await second
+    assert first.cancelled()
+    assert result
+    assert llm.calls == 1
+    assert llm.cancelled == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_call_finishes_after_all_waiters_are_cancelled():
+    flight, llm = SingleFlight(), CountingLLM()
+    waiter = asyncio.create_task(flight.do_async("k", lambda: llm.generate_text("sys", "p")))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert flight.stats()["inflight"] == 1
+
+    # A caller arriving while it still runs joins it instead of starting another call.
+    result = await flight.do_async("k", lambda: llm.generate_text("sys", "p"))
+    assert result
+    assert llm.calls == 1
+    assert llm.cancelled == 0
+    assert flight.stats()["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unawaited_shared_failure_is_retrieved():
+    loop = asyncio.get_running_loop()
+    unhandled: list[dict] = []
+    loop.set_exception_handler(lambda _loop, context: unhandled.append(context))
+    flight, llm = SingleFlight(), CountingLLM(error_rate=1.0)
+    waiter = asyncio.create_task(flight.do_async("k", lambda: llm.generate_text("sys", "p")))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0.05)
+    gc.collect()
+    await asyncio.sleep(0)
+    loop.set_exception_handler(None)
+    assert flight.stats()["inflight"] == 0
+    assert unhandled == []
+
+
+def test_sync_calls_coalesce_across_threads():
+    flight = SingleFlight()
+    calls = 0
+    started = threading.Event()
+    release = threading.Event()
+
+    def work() -> str:
+        nonlocal calls
+        calls += 1
+        started.set()
+        release.wait(2)
+        return "done"
+
+    results: list[str] = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 2
+    while flight.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(2)
+    assert calls == 1
+    assert results == ["done"] * 4
+
+
+def test_fingerprint_keeps_prompts_differing_only_in_case_or_whitespace_apart():
+    base = _fingerprint("json", "sys", '{"Key": 1}', 100, 0.2)
+    assert base == _fingerprint("json", "sys", '{"Key": 1}', 100, 0.2)
+    assert base != _fingerprint("json", "sys", '{"key": 1}', 100, 0.2)
+    assert base != _fingerprint("json", "sys", '{"Key":  1}', 100, 0.2)
+    assert base != _fingerprint("text", "sys", '{"Key": 1}', 100, 0.2)
@@ -108,7 +108,28 @@ export default function AdminPage() {
       })
       if (!res.ok) throw new Error(await res.text())
       const data = await res.json()
-      setMessage({ type: "ok", text: `Created ${(data.draft_ids || []).length} draft(s)` })
+      const jobId: string | undefined = (data.job_ids || [])[0]
+      if (!jobId) throw new Error("No job id returned")
+      // Generation runs as a background job; poll until it finishes.
+      let seenDrafts = 0
+      for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, 2000))
+        const jobRes = await fetch(`${API_URL}/admin/curriculum/jobs/${jobId}`)
+        if (!jobRes.ok) throw new Error(await jobRes.text())
+        const job = await jobRes.json()
+        if (job.status === "failed") throw new Error(job.error || "Generation failed")
+        if (job.status === "succeeded") {
+          setMessage({ type: "ok", text: `Created ${(job.draft_ids || []).length} draft(s)` })
+          break
+        }
+        const saved = (job.draft_ids || []).length
+        if (saved > seenDrafts) {
+          // Drafts are saved as items complete; show them before the job finishes.
+          seenDrafts = saved
+          fetchDrafts()
+        }
+        setMessage({ type: "ok", text: `Generating (${job.stage}, ${saved} draft(s) so far)...` })
+      }
       fetchDrafts()
     } catch (e) {
       setMessage({ type: "err", text: String(e) })